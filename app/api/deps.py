@@ -1,4 +1,4 @@
-from typing import Generator
+from typing import Generator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
@@ -11,11 +11,15 @@ from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.schemas.token import TokenPayload
-from app.crud.crud_user import user as crud_user
+from app.services.principal_cache import principal_cache
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"/api/v1/login/access-token"
 )
+# Same scheme, but a missing token yields None instead of a 401
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl="/api/v1/login/access-token", auto_error=False
+)
 
 async def get_db() -> Generator:
     async with SessionLocal() as session:
@@ -39,8 +43,27 @@ async def get_current_user(
     # We now eagerly load the cognitive_profile relationship.
     # This ensures current_user.cognitive_profile can be accessed
     # anywhere without causing a lazy-loading database error.
-    user = await crud_user.get_by_email(db, email=token_data.sub)
+    # The loaded user is cached briefly, so most requests don't query at all.
+    user = await principal_cache.get(db, token_data)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_instructor(current_user: User = Depends(get_current_user)) -> User:
+    """The current user, if listed in INSTRUCTOR_EMAILS; anyone else gets a 403."""
+    instructors = {email.strip().lower() for email in settings.INSTRUCTOR_EMAILS}
+    if current_user.email.lower() not in instructors:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only instructors can do this.",
+        )
+    return current_user
+
+async def get_current_user_optional(
+    db: AsyncSession = Depends(get_db), token: Optional[str] = Depends(optional_oauth2)
+) -> Optional[User]:
+    """The current user when a token was sent, otherwise None."""
+    if token is None:
+        return None
+    return await get_current_user(db=db, token=token)
@@ -0,0 +1,39 @@
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """Formats one server-sent event."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+async def _event_stream(request: Request, tokens: AsyncIterator[str], done_payload: dict):
+    try:
+        async for token in tokens:
+            if await request.is_disconnected():
+                break
+            yield format_sse({"token": token})
+        else:
+            yield format_sse(done_payload, event="done")
+    except Exception as e:
+        print(f"Streaming response failed: {e}")
+        yield format_sse({"detail": "Failed to generate a response from the AI service."}, event="error")
+    finally:
+        # Closing the token generator closes the upstream LLM stream, so a
+        # disconnected client doesn't keep consuming tokens we'll never send.
+        await tokens.aclose()
+
+def sse_response(request: Request, tokens: AsyncIterator[str], done_payload: Optional[dict] = None) -> StreamingResponse:
+    """
+    Streams tokens as `data: {"token": ...}` events, followed by a final
+    `done` event carrying `done_payload`, or an `error` event.
+    """
+    return StreamingResponse(
+        _event_stream(request, tokens, done_payload or {}),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream, which would defeat the point
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
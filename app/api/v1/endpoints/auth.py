@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
 from app.core import security
+from app.core.config import settings
 from app.crud.crud_user import user as crud_user
-from app.schemas.user import UserCreate, User
+from app.models.user import User as UserModel
+from app.schemas.cognitive_profile import CognitiveProfileCreate
+from app.schemas.user import RosterRegistrationResult, UserCreate, User
 from app.schemas.token import Token
 
 router = APIRouter()
@@ -19,21 +28,65 @@ async def register_new_user(
     """
     Create a new student with their cognitive profile.
     """
-    user = await crud_user.get_by_email(db, email=user_in.email)
-    if user:
+    # One INSERT for user and profile; the response is built from what was written
+    new_user = await crud_user.create(db, obj_in=user_in)
+    if new_user is None:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-    
-    # Step 1: Create the user (Write operation)
-    await crud_user.create(db, obj_in=user_in)
-    
-    # Step 2: Fetch the complete user data for the response (Read operation)
-    new_user = await crud_user.get_by_email(db, email=user_in.email)
-    
     return new_user
 
+def _parse_roster(body: bytes, content_type: str) -> List[dict]:
+    """
+    Roster rows from a JSON array of registration objects, or from CSV with
+    `email` and `password` columns plus optional cognitive profile columns
+    (blank cells keep the defaults).
+    """
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        profile_fields = set(CognitiveProfileCreate.model_fields)
+        return [
+            {
+                "email": row.get("email"),
+                "password": row.get("password"),
+                "cognitive_profile": {k: v for k, v in row.items() if k in profile_fields and v},
+            }
+            for row in reader
+        ]
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of users.")
+    return [{"cognitive_profile": {}, **row} for row in rows]
+
+@router.post("/register/bulk", response_model=RosterRegistrationResult)
+async def register_roster(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: UserModel = Depends(deps.get_current_instructor),
+):
+    """
+    Registers a whole class roster in one transaction. Instructors only. Send either a JSON
+    array of /register bodies or a CSV file (Content-Type: text/csv).
+    Already registered emails are skipped and reported, not treated as errors.
+    """
+    try:
+        rows = _parse_roster(await request.body(), request.headers.get("content-type", ""))
+    except (ValueError, TypeError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse the roster: {e}")
+    if len(rows) > settings.ROSTER_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"A roster can have at most {settings.ROSTER_MAX_ROWS} students.")
+
+    users_in = []
+    for line, row in enumerate(rows, start=1):
+        try:
+            users_in.append(UserCreate.model_validate(row))
+        except (ValidationError, TypeError) as e:
+            raise HTTPException(status_code=422, detail=f"Roster entry {line}: {e}")
+
+    created, skipped = await crud_user.create_many(db, objs_in=users_in)
+    return {"created": created, "skipped": skipped}
+
 @router.post("/access-token", response_model=Token)
 async def login_for_access_token(
     db: AsyncSession = Depends(deps.get_db),
@@ -43,11 +96,20 @@ async def login_for_access_token(
     OAuth2 compatible token login, get an access token for future requests.
     """
     user = await crud_user.get_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await security.verify_password_async(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = security.create_access_token(subject=user.email)
+    if new_hash:
+        # Stored with outdated Argon2 parameters: upgrade it now that we know the password
+        await crud_user.update_changed(db, db_obj=user, obj_in={"hashed_password": new_hash})
+    access_token = security.create_access_token(
+        subject=user.email,
+        user_id=user.id if settings.AUTH_TOKEN_INCLUDE_UID else None,
+    )
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
+from app.api.streaming import sse_response
 from app.models.user import User
 from app.schemas.chat import ConversationRequest, ConversationResponse
 from app.services.chat_service import ConversationalChainService
@@ -20,4 +21,19 @@ async def handle_conversation(
     """
     chat_service = ConversationalChainService(db, current_user)
     response_content = await chat_service.generate_response(request)
-    return {"generated_response": response_content}
\ No newline at end of file
+    return {"generated_response": response_content}
+
+@router.post("/conversation/stream")
+async def stream_conversation(
+    request: ConversationRequest,
+    http_request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Same as /conversation, but streams the reply as server-sent events
+    (`data: {"token": ...}`) as the model produces it, ending with a `done` event.
+    """
+    chat_service = ConversationalChainService(db, current_user)
+    tokens = await chat_service.stream_response(request)
+    return sse_response(http_request, tokens)
@@ -1,11 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from neo4j import AsyncSession as Neo4jAsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api import deps
+from app.core.config import settings
+from app.crud.crud_progress import progress as crud_progress
 from app.db.neo4j_driver import get_neo4j_session
-from app.services.knowledge_graph import Neo4jKnowledgeGraphService
+from app.models.user import User
+from app.services.knowledge_graph import BUNDLE_FIELDS, Neo4jKnowledgeGraphService
+from app.services.recommendation_engine import recommendation_engine
+from app.services.write_behind import write_behind
 
 router = APIRouter()
 
+def _learning_path_body(concept_name: str, path: list) -> dict:
+    if not path:
+        return {"learning_path": [], "target_concept": concept_name}
+    return {
+        "learning_path": path,
+        "target_concept": concept_name,
+        "total_estimated_hours": sum(c.estimated_hours or 0 for c in path),
+    }
+
 # ... (existing /context, /next, and /learning-path endpoints remain the same)
 @router.get("/{concept_name}/context")
 async def get_concept_context(
@@ -30,25 +48,72 @@ async def recommend_next_concept(
 @router.get("/{concept_name}/learning-path")
 async def get_full_learning_path(
     concept_name: str,
+    max_depth: Optional[int] = Query(None, ge=1, description="Follow at most this many prerequisite hops."),
+    skip_mastered: bool = Query(False, description="Leave out concepts the student has already mastered (requires login)."),
+    strategy: Literal["closure", "shortest"] = Query("closure", description="'closure': every prerequisite in study order. 'shortest': every prerequisite, cheapest available first by estimated hours."),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Optional[User] = Depends(deps.get_current_user_optional),
     neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
 ):
+    mastered_ids = set()
+    if skip_mastered:
+        if current_user is None:
+            raise HTTPException(status_code=401, detail="Log in to skip mastered concepts.")
+        mastered = await crud_progress.get_mastered_concepts(
+            db,
+            user_id=current_user.id,
+            threshold=settings.MASTERY_THRESHOLD,
+            pending=write_behind.pending_progress(current_user.id),
+        )
+        mastered_ids = recommendation_engine.graph_ids(mastered)
+
     kg_service = Neo4jKnowledgeGraphService(neo4j_session)
-    path = await kg_service.get_learning_path(concept_name=concept_name)
-    if not path:
-        return {"learning_path": [], "target_concept": concept_name}
-    return {"learning_path": path, "target_concept": concept_name}
+    path = await kg_service.get_learning_path(
+        concept_name=concept_name,
+        max_depth=max_depth,
+        mastered_ids=mastered_ids,
+        strategy=strategy,
+    )
+    return _learning_path_body(concept_name, path)
+
+@router.get("/{concept_name}/bundle")
+async def get_concept_bundle(
+    concept_name: str,
+    fields: str = Query(",".join(BUNDLE_FIELDS), description="Comma-separated views to include: context, next, learning_path, analysis."),
+    neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
+):
+    """
+    The /context, /next, /learning-path and /analysis responses for one
+    concept in a single request. Each view has the same shape as its own endpoint.
+    """
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(selected) - set(BUNDLE_FIELDS)
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"fields must be a comma-separated subset of: {', '.join(BUNDLE_FIELDS)}")
+
+    kg_service = Neo4jKnowledgeGraphService(neo4j_session)
+    bundle = await kg_service.get_concept_bundle(concept_name=concept_name, fields=tuple(dict.fromkeys(selected)))
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="Concept not found in the Knowledge Graph")
+
+    if "next" in bundle:
+        bundle["next"] = {"recommendations": bundle["next"]}
+    if "learning_path" in bundle:
+        bundle["learning_path"] = _learning_path_body(concept_name, bundle["learning_path"])
+    return bundle
 
 # ------------------ NEW ENDPOINT ------------------
 @router.get("/{concept_name}/analysis")
 async def get_concept_analysis(
     concept_name: str,
+    limit: Optional[int] = Query(None, ge=1, description="Return at most this many concepts per relationship."),
     neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
 ):
     """
     Get a comprehensive analysis of a concept, including its various relationships.
     """
     kg_service = Neo4jKnowledgeGraphService(neo4j_session)
-    analysis = await kg_service.get_comprehensive_analysis(concept_name=concept_name)
+    analysis = await kg_service.get_comprehensive_analysis(concept_name=concept_name, limit=limit)
     if not analysis:
         raise HTTPException(status_code=404, detail="Concept not found for analysis.")
     
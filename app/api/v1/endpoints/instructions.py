@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from neo4j import AsyncSession as Neo4jAsyncSession
 
 from app.api import deps
+from app.api.streaming import sse_response
 from app.db.neo4j_driver import get_neo4j_session
 from app.models.user import User
 from app.crud.crud_progress import progress as crud_progress
-from app.schemas.progress import ProgressCreate, Progress as ProgressSchema
+from app.schemas.progress import ProgressBatch, ProgressCreate, ProgressSync, Progress as ProgressSchema
 from app.services.knowledge_graph import Neo4jKnowledgeGraphService
 from app.services.prompt_generator import build_llm_prompt
-# FIXED: Import the new function, not the old client object
-from app.services.gpt_client import generate_instruction
+from app.services.lesson_cache import lesson_cache
+from app.services.recommendation_engine import recommendation_engine
+from app.services.write_behind import write_behind
 
 router = APIRouter()
 
@@ -24,17 +30,78 @@ async def update_student_progress(
     """
     Update a student's mastery of a concept (stored in PostgreSQL).
     """
+    if write_behind.enabled:
+        if not await write_behind.concept_exists(db, progress_in.concept_id):
+            raise HTTPException(status_code=404, detail="Concept not found.")
+        recorded_at = write_behind.add_progress(current_user.id, progress_in.concept_id, progress_in.mastery_level)
+        recommendation_engine.on_progress(current_user.id, {progress_in.concept_id: progress_in.mastery_level})
+        return ProgressSchema(
+            user_id=current_user.id,
+            concept_id=progress_in.concept_id,
+            mastery_level=progress_in.mastery_level,
+            updated_at=recorded_at,
+        )
+
     progress = await crud_progress.get_by_user_and_concept(
         db, user_id=current_user.id, concept_id=progress_in.concept_id
     )
     if progress:
-        updated_progress = await crud_progress.update(db, db_obj=progress, obj_in=progress_in)
-        return updated_progress
+        progress = await crud_progress.update(db, db_obj=progress, obj_in=progress_in)
     else:
         new_progress_data = progress_in.model_dump()
         new_progress_data['user_id'] = current_user.id
-        new_progress = await crud_progress.create(db, obj_in=new_progress_data)
-        return new_progress
+        try:
+            progress = await crud_progress.create(db, obj_in=new_progress_data)
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=404, detail="Concept not found.")
+    recommendation_engine.on_progress(current_user.id, {progress.concept_id: progress.mastery_level or 0})
+    return progress
+
+async def _upsert_progress(db: AsyncSession, user_id: int, levels: dict, newer_only: bool = False):
+    try:
+        rows = await crud_progress.upsert_many(db, user_id=user_id, levels=levels, newer_only=newer_only)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="One or more concept ids do not exist.")
+    recommendation_engine.on_progress(user_id, {row.concept_id: row.mastery_level or 0 for row in rows})
+    return rows
+
+@router.post("/progress/batch", response_model=List[ProgressSchema])
+async def update_student_progress_batch(
+    batch: ProgressBatch,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Records many mastery levels at once (e.g. a whole quiz) in one statement and one commit.
+    """
+    now = datetime.now(timezone.utc)
+    levels = {item.concept_id: (item.mastery_level, now) for item in batch.items}
+    write_behind.discard_progress(current_user.id, levels)
+    return await _upsert_progress(db, current_user.id, levels)
+
+@router.post("/progress/sync", response_model=List[ProgressSchema])
+async def sync_student_progress(
+    sync: ProgressSync,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Merges progress recorded by an offline client: per concept, the most
+    recently recorded level wins, whether it is the client's or the server's.
+    Returns the merged state of every concept in the payload.
+    """
+    now = datetime.now(timezone.utc)
+    levels = {}
+    for item in sync.items:
+        recorded_at = item.recorded_at if item.recorded_at.tzinfo else item.recorded_at.replace(tzinfo=timezone.utc)
+        # A client clock running ahead must not pin its values above later updates
+        recorded_at = min(recorded_at, now)
+        current = levels.get(item.concept_id)
+        if current is None or recorded_at >= current[1]:
+            levels[item.concept_id] = (item.mastery_level, recorded_at)
+    return await _upsert_progress(db, current_user.id, levels, newer_only=True)
 
 # This endpoint now uses Neo4j to get context and generate instructions
 @router.post("/{concept_name}/generate")
@@ -57,8 +124,28 @@ async def generate_personalized_instruction(
     # Step 2: Build the sophisticated prompt using the analysis and the student's profile
     prompt = build_llm_prompt(user=current_user, analysis=analysis)
     
-    # Step 3: Send the prompt to the LLM and get the lesson
-    # FIXED: Call the new function directly
-    instruction = await generate_instruction(prompt)
+    # Step 3: Serve the lesson from the cache, or send the prompt to the LLM
+    instruction = await lesson_cache.get_or_generate(analysis, current_user.cognitive_profile, prompt)
     
-    return {"generated_instruction": instruction, "prompt_sent": prompt}
\ No newline at end of file
+    return {"generated_instruction": instruction, "prompt_sent": prompt}
+
+@router.post("/{concept_name}/generate/stream")
+async def stream_personalized_instruction(
+    concept_name: str,
+    request: Request,
+    neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Same as /generate, but streams the lesson as server-sent events
+    (`data: {"token": ...}`). The final `done` event carries `prompt_sent`.
+    """
+    kg_service = Neo4jKnowledgeGraphService(neo4j_session)
+    analysis = await kg_service.get_comprehensive_analysis(concept_name=concept_name)
+
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Concept not found in Knowledge Graph")
+
+    prompt = build_llm_prompt(user=current_user, analysis=analysis)
+    tokens = lesson_cache.stream(analysis, current_user.cognitive_profile, prompt)
+    return sse_response(request, tokens, done_payload={"prompt_sent": prompt})
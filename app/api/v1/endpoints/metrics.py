@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from app.core.security import password_executor
+from app.db.neo4j_driver import neo4j_driver
+from app.db.session import pool_monitor
+from app.services.cognitive_analyzer import inference_executor, ml_cognitive_analyzer_service
+from app.services.chat_service import chat_flight
+from app.services.gpt_client import lesson_flight
+from app.services.lesson_cache import lesson_cache
+from app.services.principal_cache import principal_cache
+from app.services.recommendation_engine import recommendation_engine
+from app.services.write_behind import write_behind
+
+router = APIRouter()
+
+@router.get("/")
+async def read_metrics():
+    """
+    In-process counters for this worker: inference pool load, cache
+    effectiveness, and Postgres and Neo4j connection pool usage.
+    """
+    return {
+        "cognitive_inference": inference_executor.stats(),
+        "analysis_cache": ml_cognitive_analyzer_service.cache.stats(),
+        "lesson_cache": lesson_cache.stats(),
+        "lesson_coalescing": lesson_flight.stats(),
+        "chat_coalescing": chat_flight.stats(),
+        "neo4j": neo4j_driver.stats(),
+        "postgres": pool_monitor.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": password_executor.stats(),
+        "write_behind": write_behind.stats(),
+        "recommendations": recommendation_engine.stats(),
+    }
@@ -0,0 +1,122 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from neo4j import AsyncSession as Neo4jAsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.crud.crud_progress import progress as crud_progress
+from app.db.neo4j_driver import get_neo4j_session
+from app.models.user import User
+from app.schemas.progress import (
+    ClassRecommendationRequest,
+    ConceptMasteryPage,
+    ProgressPage,
+    ProgressSummary,
+    StudentRecommendations,
+)
+from app.services.recommendation_engine import recommendation_engine
+from app.services.write_behind import write_behind
+
+router = APIRouter()
+
+@router.get("/me", response_model=ProgressPage)
+async def read_my_progress(
+    after: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    The current student's mastery per concept, ordered by concept id,
+    including updates still buffered by write-behind.
+    """
+    items, next_cursor = await crud_progress.get_page(
+        db, user_id=current_user.id, after=after, limit=limit, pending=write_behind.pending_progress(current_user.id)
+    )
+    return ProgressPage(items=items, next_cursor=next_cursor)
+
+@router.get("/me/summary", response_model=ProgressSummary)
+async def read_my_progress_summary(
+    target_concept_id: Optional[int] = Query(None, description="Also list the weakest prerequisites of this concept"),
+    weakest: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Dashboard summary for the current student: concepts started and
+    mastered, average mastery and a 10-bucket histogram, in one query.
+    Updates still buffered by write-behind are included.
+    """
+    return await crud_progress.get_summary(
+        db,
+        user_id=current_user.id,
+        threshold=settings.MASTERY_THRESHOLD,
+        target_concept_id=target_concept_id,
+        weakest_limit=weakest,
+        pending=write_behind.pending_progress(current_user.id),
+    )
+
+@router.get("/me/recommendations", response_model=StudentRecommendations)
+async def read_my_recommendations(
+    limit: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(deps.get_db),
+    neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """
+    Concepts the current student is ready to learn: not mastered yet, with
+    every direct prerequisite at or above the mastery threshold.
+    """
+    recommendations = await recommendation_engine.recommend(db, neo4j_session, current_user.id, limit)
+    if recommendations is None:
+        raise HTTPException(status_code=503, detail="The knowledge graph is not loaded yet.")
+    return StudentRecommendations(user_id=current_user.id, recommendations=recommendations)
+
+@router.post("/class/recommendations", response_model=List[StudentRecommendations])
+async def read_class_recommendations(
+    request: ClassRecommendationRequest,
+    limit: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(deps.get_db),
+    neo4j_session: Neo4jAsyncSession = Depends(get_neo4j_session),
+    current_user: User = Depends(deps.get_current_instructor),
+):
+    """
+    Ready-to-learn concepts for every listed student, computed in one batch.
+    Instructors only: it exposes each student's mastery.
+    """
+    recommendations = await recommendation_engine.recommend_many(db, neo4j_session, request.user_ids, limit)
+    if recommendations is None:
+        raise HTTPException(status_code=503, detail="The knowledge graph is not loaded yet.")
+    return [
+        StudentRecommendations(user_id=user_id, recommendations=items)
+        for user_id, items in recommendations.items()
+    ]
+
+@router.get("/class/concepts", response_model=ConceptMasteryPage)
+async def read_class_concept_stats(
+    after: int = Query(0, ge=0, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_instructor),
+):
+    """
+    Class-wide mastery statistics per concept, ordered by concept id. Instructors only. Served
+    from the trigger-maintained rollup when PROGRESS_ROLLUP_ENABLED is set.
+    """
+    # Buffered writes span many students; writing them out first is simpler than overlaying each
+    if write_behind.pending:
+        try:
+            await write_behind.flush()
+        except Exception as e:
+            # Requeued by the flush; serve what is stored
+            print(f"Write-behind flush before the class view failed: {e}")
+    items, next_cursor = await crud_progress.get_class_stats_page(
+        db,
+        threshold=settings.MASTERY_THRESHOLD,
+        after=after,
+        limit=limit,
+        use_rollup=settings.PROGRESS_ROLLUP_ENABLED,
+    )
+    return ConceptMasteryPage(items=items, next_cursor=next_cursor)
@@ -9,6 +9,8 @@ from app.schemas.cognitive_profile import CognitiveProfileUpdate
 from app.crud.crud_cognitive_profile import profile as crud_profile
 # Import the new ML-based analyzer service
 from app.services.cognitive_analyzer import ml_cognitive_analyzer_service
+from app.services.principal_cache import principal_cache
+from app.services.write_behind import write_behind
 
 # Define the request model for the new endpoint
 class AnalysisRequest(BaseModel):
@@ -32,12 +34,19 @@ async def update_current_user_profile(
     """
     Manually update the currently authenticated student's cognitive profile.
     """
-    await crud_profile.update(
+    # Drop the learned style scores so the analyzer re-seeds them from the
+    # styles chosen here instead of flipping them straight back.
+    update_data = profile_in.model_dump(exclude_unset=True)
+    update_data["style_scores"] = None
+    write_behind.discard_profile(current_user.cognitive_profile.id, update_data)
+    # Writes only the changed columns and updates the loaded profile in place,
+    # so no refresh is needed to build the response.
+    await crud_profile.update_changed(
         db, 
         db_obj=current_user.cognitive_profile, 
-        obj_in=profile_in
+        obj_in=update_data
     )
-    await db.refresh(current_user, attribute_names=['cognitive_profile'])
+    principal_cache.invalidate(current_user)
     return current_user
 
 # --- NEW ENDPOINT ---
@@ -50,8 +59,9 @@ async def preview_prompt_analysis(
     Analyzes a student's prompt and returns the inferred cognitive
     profile changes WITHOUT saving them to the database.
     """
-    # Run the prompt through the ML analyzer using the user's current profile
-    inferred_profile_update, confidence = ml_cognitive_analyzer_service.analyze_prompt(
+    # Run the prompt through the ML analyzer using the user's current profile.
+    # This runs on the inference pool, so it never blocks the event loop.
+    inferred_profile_update, confidence, _ = await ml_cognitive_analyzer_service.analyze_prompt_async(
         request.prompt, 
         current_profile=current_user.cognitive_profile
     )
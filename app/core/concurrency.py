@@ -0,0 +1,59 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+
+class BoundedExecutor:
+    """
+    Runs blocking, CPU-heavy callables on a fixed-size thread pool so they
+    never execute on the event loop. Once `max_workers + max_queue` calls are
+    in flight, new calls are rejected immediately with a 503 instead of
+    piling up behind the pool.
+    """
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _release(self, _future) -> None:
+        self._in_flight -= 1
+        self.completed += 1
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"The {self.name} service is busy. Please retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        # Release the slot when the thread actually finishes, not when the
+        # awaiting request is cancelled, so the bound reflects real pool load.
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -5,10 +7,62 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Adaptive Tutoring System"
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Put the user id in access tokens ("uid" claim) so requests load the
+    # user by primary key. Tokens without it still work, looked up by email.
+    AUTH_TOKEN_INCLUDE_UID: bool = True
+    # Authenticated users are cached per worker for this many seconds. Size 0 disables it.
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 1024
+    AUTH_PRINCIPAL_CACHE_TTL: int = 30
+    # Argon2 cost. Stored hashes made with other parameters are upgraded at the user's next login.
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 102400  # KiB
+    ARGON2_PARALLELISM: int = 8
+    # Hashing runs on its own thread pool; beyond workers + queue, logins get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+    # Bulk registration hashes in chunks of this many passwords, with at most
+    # PASSWORD_HASH_BULK_LANES chunks in flight, so logins keep getting workers
+    PASSWORD_HASH_BULK_CHUNK: int = 8
+    PASSWORD_HASH_BULK_LANES: int = 1
+    # Accounts allowed to manage classes (roster registration, class views).
+    # A JSON list in the environment, e.g. INSTRUCTOR_EMAILS='["teacher@school.edu"]'
+    INSTRUCTOR_EMAILS: List[str] = []
+    # Largest class roster /login/register/bulk accepts in one request
+    ROSTER_MAX_ROWS: int = 2000
+    # Buffer single progress updates and chat-driven profile changes in memory
+    # and write them in batches. Flushed every WRITE_BEHIND_FLUSH_SECONDS, when
+    # WRITE_BEHIND_MAX_PENDING rows are waiting, and at shutdown.
+    WRITE_BEHIND_ENABLED: bool = False
+    WRITE_BEHIND_MAX_PENDING: int = 500
+    WRITE_BEHIND_FLUSH_SECONDS: float = 2.0
+    # Maintain a per-concept rollup table (by trigger) for instructor class views
+    PROGRESS_ROLLUP_ENABLED: bool = False
 
     # --- PostgreSQL Connection String ---
     # This is the primary variable the application code uses.
     DATABASE_URL: str
+    # Connection pool, per worker process. Each process can hold up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so size it against the
+    # whole deployment: DB_PROCESSES (gunicorn workers per box x boxes, plus
+    # the model server or scripts if they connect) x (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW) must stay below Postgres max_connections minus
+    # superuser_reserved_connections. E.g. 4 workers on 2 boxes with 5 + 5
+    # uses 80 of the default 100. Startup warns when the sum doesn't fit.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_PROCESSES: int = 4
+    # Seconds a request waits for a free connection before failing
+    DB_POOL_TIMEOUT: float = 10.0
+    # Connections older than this many seconds are replaced on checkout. Keep
+    # it below any idle timeout of the server, proxies or load balancers.
+    DB_POOL_RECYCLE: int = 1800
+    # Ping each connection on checkout (one extra round trip). With recycling
+    # on, a connection dropped by a server restart only fails one query.
+    DB_POOL_PRE_PING: bool = False
+    # asyncpg prepared statements kept per connection; 0 behind PgBouncer transaction pooling
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # Queries slower than this are counted, logged and listed on /metrics
+    DB_SLOW_QUERY_MS: int = 200
 
     # --- Variables for Docker Compose ---
     # These are needed so Pydantic doesn't raise an error.
@@ -23,10 +77,72 @@ class Settings(BaseSettings):
     NEO4J_URI: str
     NEO4J_USER: str
     NEO4J_PASSWORD: str
+    # Empty uses the server's default database
+    NEO4J_DATABASE: str = ""
+    # Connection pool; see the Neo4j driver docs for each setting
+    NEO4J_MAX_POOL_SIZE: int = 100
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 60.0
+    NEO4J_CONNECTION_TIMEOUT: float = 30.0
+    NEO4J_MAX_CONNECTION_LIFETIME: int = 3600
+    # Pooled connections idle for longer than this many seconds are pinged
+    # before reuse. Keep it below any firewall/load-balancer idle timeout.
+    NEO4J_LIVENESS_CHECK_TIMEOUT: Optional[float] = 300.0
+    # Connections opened at startup so the first requests don't pay for them
+    NEO4J_WARMUP_CONNECTIONS: int = 4
+    # Also create a full-text index on concept names, used for fuzzy name lookups
+    KG_FULLTEXT_INDEX: bool = True
+    # Serve /concept/* and lesson analyses from an in-process copy of the graph.
+    # It is checked for changes every KG_SNAPSHOT_REFRESH_SECONDS.
+    KG_SNAPSHOT_ENABLED: bool = False
+    KG_SNAPSHOT_REFRESH_SECONDS: int = 60
+    # Progress at or above this mastery level (0-100) counts as "already learned"
+    MASTERY_THRESHOLD: int = 80
+    # Per-student readiness state kept by the recommendation engine. Other
+    # workers' progress writes show up once an entry expires.
+    RECOMMENDATION_STATE_CACHE_SIZE: int = 4096
+    RECOMMENDATION_STATE_TTL: int = 300
 
     # --- Groq API Key ---
     GORQ_API_KEY: str
 
+    # --- ML Inference Settings ---
+    # Cognitive analysis runs on a dedicated thread pool, off the event loop.
+    ML_INFERENCE_WORKERS: int = 1
+    # Requests allowed to wait for a free worker before we answer 503.
+    ML_INFERENCE_MAX_QUEUE: int = 8
+    # Torch intra-op threads per worker. 0 splits the CPU cores evenly
+    # between the inference workers so they don't oversubscribe the box.
+    ML_TORCH_THREADS: int = 0
+    # Unix socket of the shared model server (app/services/model_server.py).
+    # When set, API workers send prompts there instead of each loading a model copy.
+    ML_MODEL_SERVER_SOCKET: str = ""
+    ML_MODEL_SERVER_MAX_BATCH: int = 16
+    ML_MODEL_SERVER_MAX_WAIT_MS: int = 10
+    ML_MODEL_SERVER_TIMEOUT: float = 30.0
+    # Inference backend: "torch" (full precision), "torch-int8" (dynamic int8
+    # quantization at load time), "onnx" or "onnx-int8" (ONNX Runtime export
+    # produced by download_model.py into ML_ONNX_MODEL_DIR; needs
+    # requirements-onnx.txt, which the Docker build installs for those backends).
+    ML_BACKEND: str = "torch"
+    ML_ONNX_MODEL_DIR: str = "onnx_model"
+
+    # --- Cognitive Analysis Cache ---
+    # Raw classifier outputs keyed by normalized prompt. Size 0 disables it.
+    ML_ANALYSIS_CACHE_SIZE: int = 4096
+    ML_ANALYSIS_CACHE_TTL: int = 3600
+    # Optional SQLite file shared by all workers on the box, e.g. /tmp/analysis_cache.db
+    ML_ANALYSIS_CACHE_PATH: str = ""
+
+    # --- Lesson Cache ---
+    # Generated lessons keyed by concept, its graph neighborhood and the profile
+    # fields the prompt uses. Size 0 disables it.
+    LESSON_CACHE_SIZE: int = 1024
+    LESSON_CACHE_TTL: int = 86400
+    # After the TTL, a lesson is still served for this long while a fresh one is generated
+    LESSON_CACHE_STALE_TTL: int = 3600
+    # Optional SQLite file that keeps lessons across restarts and workers
+    LESSON_CACHE_PATH: str = ""
+
     class Config:
         env_file = ".env"
         # This allows extra variables in the .env that are not defined in the model
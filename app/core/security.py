@@ -1,16 +1,32 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, List, Optional, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
+from app.core.concurrency import BoundedExecutor
 from app.core.config import settings
 
 # UPDATED: Switched from bcrypt to the more modern argon2
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+# Argon2 is deliberately slow and memory-hard, so it never runs on the event
+# loop. The bound keeps a login storm from queueing without limit.
+password_executor = BoundedExecutor(
+    "password-hashing",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
 
 ALGORITHM = "HS256"
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: timedelta = None
+    subject: Union[str, Any], expires_delta: timedelta = None, user_id: int = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -18,7 +34,10 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # iat versions the token: a reissued token never matches a principal cached for an older one
+    to_encode = {"exp": expire, "iat": datetime.utcnow(), "sub": str(subject)}
+    if user_id is not None:
+        to_encode["uid"] = user_id
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -26,4 +45,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_executor.run(pwd_context.hash, password)
+
+def _hash_all(passwords: List[str]) -> List[str]:
+    return [pwd_context.hash(p) for p in passwords]
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    """
+    Hashes a batch in PASSWORD_HASH_BULK_CHUNK-sized tasks, at most
+    PASSWORD_HASH_BULK_LANES at a time. A roster never holds more than that
+    many workers, and each for one short chunk, so logins queued meanwhile
+    run in between instead of waiting for the whole batch.
+    """
+    size = max(1, settings.PASSWORD_HASH_BULK_CHUNK)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed: List[Optional[List[str]]] = [None] * len(chunks)
+    pending = iter(range(len(chunks)))
+
+    async def lane():
+        for i in pending:
+            hashed[i] = await password_executor.run(_hash_all, chunks[i])
+
+    lanes = max(1, min(settings.PASSWORD_HASH_BULK_LANES, len(chunks)))
+    await asyncio.gather(*(lane() for _ in range(lanes)))
+    return [h for chunk in hashed for h in chunk]
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies on the hashing pool. Also returns a replacement hash when the
+    stored one was made with outdated parameters (else None), for the caller to save.
+    """
+    return await password_executor.run(pwd_context.verify_and_update, plain_password, hashed_password)
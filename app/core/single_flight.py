@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+class _SharedStream:
+    """
+    One upstream token stream fanned out to any number of subscribers. Tokens
+    are buffered, so a subscriber that joins late still gets the whole stream.
+    The upstream is cancelled once every subscriber has gone away.
+    """
+    def __init__(self, source: AsyncIterator[str], on_done: Callable[[], None]):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._on_done = on_done
+        self._task = asyncio.create_task(self._pump(source))
+
+    def _notify(self) -> None:
+        event, self._changed = self._changed, asyncio.Event()
+        event.set()
+
+    async def _pump(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for token in source:
+                self.tokens.append(token)
+                self._notify()
+        except BaseException as e:
+            # Cancellation included: a stream cut short must never look complete
+            self.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.done = True
+            self._on_done()
+            self._notify()
+            await source.aclose()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self.tokens):
+                    yield self.tokens[index]
+                    index += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # Unregister first, so no new caller joins a stream that is being cancelled
+                self._on_done()
+                self._task.cancel()
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight,
+    further callers with the same key await that call instead of starting
+    their own. Streams are shared the same way, token by token.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.requests = 0
+        self.upstream_calls = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.upstream_calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded, so one caller being cancelled doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        self.requests += 1
+        shared = self._streams.get(key)
+        if shared is None:
+            self.upstream_calls += 1
+            shared = _SharedStream(fn(), on_done=lambda: self._drop_stream(key, shared))
+            self._streams[key] = shared
+        return shared.subscribe()
+
+    def _drop_stream(self, key: str, shared: _SharedStream) -> None:
+        # A newer stream may already be registered under the key; leave it alone
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+
+    def stats(self) -> dict:
+        coalesced = self.requests - self.upstream_calls
+        return {
+            "requests": self.requests,
+            "upstream_calls": self.upstream_calls,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / self.requests if self.requests else 0.0,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
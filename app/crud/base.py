@@ -1,7 +1,8 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.orm.attributes import set_committed_value
 from app.db.base_class import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -56,6 +57,51 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         await db.refresh(db_obj)
         return db_obj
 
+    def _differs(self, field: str, current: Any, new: Any) -> bool:
+        """Whether writing `new` over `current` would change the column. Subclasses can relax this per field."""
+        return current != new
+
+    def changes(self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        """The subset of `obj_in` that differs from the loaded row."""
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        return {
+            field: value for field, value in update_data.items()
+            if self._differs(field, getattr(db_obj, field), value)
+        }
+
+    async def update_changed(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Diff-aware update: compares the new values with the loaded row and issues
+        one targeted UPDATE for the changed columns only, without the refresh
+        round trip. Returns the changed columns; when nothing changed, no
+        statement is sent at all.
+        """
+        changed = self.changes(db_obj, obj_in)
+        if not changed:
+            return changed
+
+        await db.execute(
+            update(self.model)
+            .where(self.model.id == db_obj.id)
+            .values(**changed)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        # Mirror the written values on the loaded instance without marking it dirty
+        for field, value in changed.items():
+            set_committed_value(db_obj, field, value)
+        return changed
+
     async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
         result = await db.execute(select(self.model).filter(self.model.id == id))
         obj = result.scalars().first()
@@ -1,3 +1,7 @@
+from typing import Any
+
+import numpy as np
+
 from app.crud.base import CRUDBase
 from app.models.cognitive_profile import CognitiveProfile
 from app.schemas.cognitive_profile import CognitiveProfileUpdate
@@ -6,6 +10,12 @@ class CRUDCognitiveProfile(CRUDBase[CognitiveProfile, None, CognitiveProfileUpda
     """
     CRUD operations for the CognitiveProfile model.
     """
-    pass
+    # Style scores closer than this to the stored ones aren't worth a write
+    STYLE_SCORE_TOLERANCE = 1e-3
+
+    def _differs(self, field: str, current: Any, new: Any) -> bool:
+        if field == "style_scores" and current is not None and new is not None:
+            return len(current) != len(new) or not np.allclose(current, new, rtol=0, atol=self.STYLE_SCORE_TOLERANCE)
+        return super()._differs(field, current, new)
 
 profile = CRUDCognitiveProfile(CognitiveProfile)
\ No newline at end of file
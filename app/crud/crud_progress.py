@@ -1,9 +1,84 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.crud.base import CRUDBase
+from app.models.concept import Concept
 from app.models.progress import Progress
 from app.schemas.progress import ProgressCreate, ProgressUpdate
 
+HISTOGRAM_BUCKETS = 10
+
+# One statement for a student's whole summary. The prerequisite closure of
+# the target comes from concept_prerequisite (bounded by :max_depth, which
+# also stops cycles); the histogram buckets are 10 points wide, 100 in the last.
+# Everywhere in this module a NULL mastery_level counts as 0, as in the rollup.
+# :pending is a JSON object {concept_id: level} of buffered writes (see
+# write_behind); they replace the student's stored rows for those concepts.
+SUMMARY_QUERY = text("""
+WITH RECURSIVE prerequisites(concept_id, depth) AS (
+    SELECT prerequisite_id, 1 FROM concept_prerequisite WHERE concept_id = :target_id
+    UNION
+    SELECT cp.prerequisite_id, pr.depth + 1
+    FROM concept_prerequisite cp JOIN prerequisites pr ON cp.concept_id = pr.concept_id
+    WHERE pr.depth < :max_depth
+),
+pending AS (
+    SELECT key::int AS concept_id, value::int AS mastery_level FROM json_each_text(CAST(:pending AS json))
+),
+mine AS (
+    SELECT concept_id, coalesce(mastery_level, 0) AS mastery_level FROM progress
+    WHERE user_id = :user_id AND concept_id NOT IN (SELECT concept_id FROM pending)
+    UNION ALL
+    SELECT concept_id, mastery_level FROM pending
+)
+SELECT
+    (SELECT count(*) FROM mine) AS concepts_started,
+    (SELECT count(*) FROM mine WHERE mastery_level >= :threshold) AS mastered,
+    (SELECT round(avg(mastery_level), 1) FROM mine) AS average_mastery,
+    (
+        SELECT coalesce(json_object_agg(bucket, n), '{}')
+        FROM (SELECT LEAST(mastery_level / 10, 9) AS bucket, count(*) AS n FROM mine GROUP BY 1) buckets
+    ) AS histogram,
+    (
+        SELECT coalesce(json_agg(weakest), '[]')
+        FROM (
+            SELECT c.id AS concept_id, c.name AS concept, coalesce(m.mastery_level, 0) AS mastery_level
+            FROM (SELECT DISTINCT concept_id FROM prerequisites) pr
+            JOIN concepts c ON c.id = pr.concept_id
+            LEFT JOIN mine m ON m.concept_id = pr.concept_id
+            ORDER BY coalesce(m.mastery_level, 0), c.name
+            LIMIT :weakest_limit
+        ) weakest
+    ) AS weakest_prerequisites
+""")
+
+# Class statistics for one keyset page of concepts, as (concept, bucket) rows.
+# Without the rollup the page's progress rows are aggregated through
+# ix_progress_concept_mastery; with it, the rollup rows are read instead.
+CONCEPT_PAGE = "WITH page AS (SELECT id, name FROM concepts WHERE id > :after ORDER BY id LIMIT :limit)"
+CLASS_STATS_QUERY = text(CONCEPT_PAGE + """
+SELECT page.id AS concept_id, page.name AS concept, LEAST(coalesce(p.mastery_level, 0) / 10, 9) AS bucket,
+       count(p.concept_id) AS students, coalesce(sum(coalesce(p.mastery_level, 0)), 0) AS mastery_sum
+FROM page LEFT JOIN progress p ON p.concept_id = page.id
+GROUP BY 1, 2, 3 ORDER BY 1
+""")
+CLASS_STATS_ROLLUP_QUERY = text(CONCEPT_PAGE + """
+SELECT page.id AS concept_id, page.name AS concept, r.bucket,
+       coalesce(r.students, 0) AS students, coalesce(r.mastery_sum, 0) AS mastery_sum
+FROM page LEFT JOIN progress_rollup r ON r.concept_id = page.id AND r.students > 0
+ORDER BY 1
+""")
+
+def _histogram(counts: Dict[int, int]) -> List[dict]:
+    return [
+        {"low": b * 10, "high": 100 if b == HISTOGRAM_BUCKETS - 1 else b * 10 + 9, "count": counts.get(b, 0)}
+        for b in range(HISTOGRAM_BUCKETS)
+    ]
+
 class CRUDProgress(CRUDBase[Progress, ProgressCreate, ProgressUpdate]):
     async def get_by_user_and_concept(
         self, db: AsyncSession, *, user_id: int, concept_id: int
@@ -15,4 +90,186 @@ class CRUDProgress(CRUDBase[Progress, ProgressCreate, ProgressUpdate]):
         )
         return result.scalars().first()
 
+    async def get_mastered_concepts(
+        self, db: AsyncSession, *, user_id: int, threshold: int, pending: Optional[Dict[int, int]] = None
+    ) -> List[Tuple[int, str, Optional[str]]]:
+        """
+        (id, name, graph_id) of every mastered concept. `pending` maps concept
+        ids to levels not written yet; they take precedence over stored ones.
+        """
+        columns = (Concept.id, Concept.name, Concept.graph_id)
+        result = await db.execute(
+            select(*columns)
+            .join(Progress, Progress.concept_id == Concept.id)
+            .filter(and_(Progress.user_id == user_id, Progress.mastery_level >= threshold))
+        )
+        concepts = {row[0]: tuple(row) for row in result.all()}
+        if pending:
+            for concept_id, level in pending.items():
+                if level < threshold:
+                    concepts.pop(concept_id, None)
+            newly_mastered = [c for c, level in pending.items() if level >= threshold and c not in concepts]
+            if newly_mastered:
+                result = await db.execute(select(*columns).filter(Concept.id.in_(newly_mastered)))
+                concepts.update((row[0], tuple(row)) for row in result.all())
+        return list(concepts.values())
+
+    def upsert_statement(self, rows: List[dict], *, newer_only: bool = False):
+        """
+        One multi-row INSERT ... ON CONFLICT ON CONSTRAINT _user_concept_uc DO
+        UPDATE for rows of user_id, concept_id, mastery_level and updated_at.
+        (user_id, concept_id) pairs must be unique within `rows`.
+        """
+        statement = pg_insert(Progress).values(rows)
+        return statement.on_conflict_do_update(
+            constraint="_user_concept_uc",
+            set_={"mastery_level": statement.excluded.mastery_level, "updated_at": statement.excluded.updated_at},
+            where=(
+                Progress.updated_at.is_(None) | (Progress.updated_at < statement.excluded.updated_at)
+                if newer_only else None
+            ),
+        )
+
+    async def upsert_many(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        levels: Dict[int, Tuple[int, datetime]],
+        newer_only: bool = False,
+    ) -> List[Progress]:
+        """
+        Writes {concept_id: (mastery_level, recorded_at)} for one user with a
+        single INSERT ... ON CONFLICT ON CONSTRAINT _user_concept_uc DO UPDATE
+        and one commit. With `newer_only`, an existing row is only replaced
+        when the new value was recorded later (offline sync merge).
+        Returns the stored rows for every concept in `levels`.
+        """
+        await db.execute(self.upsert_statement(
+            [
+                {"user_id": user_id, "concept_id": concept_id, "mastery_level": level, "updated_at": recorded_at}
+                for concept_id, (level, recorded_at) in levels.items()
+            ],
+            newer_only=newer_only,
+        ))
+        result = await db.execute(
+            select(Progress).filter(
+                and_(Progress.user_id == user_id, Progress.concept_id.in_(list(levels)))
+            )
+        )
+        rows = list(result.scalars().all())
+        await db.commit()
+        return rows
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        after: Optional[int] = None,
+        limit: int = 50,
+        pending: Optional[Dict[int, int]] = None,
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        One page of a student's progress ordered by concept id, keyset-paginated
+        (`after` is the last concept id of the previous page), so every page is
+        an index range scan however far in it is. `pending` maps concept ids to
+        levels not written yet; they replace or add to the stored rows.
+        """
+        query = (
+            select(Progress.concept_id, Concept.name, Progress.mastery_level)
+            .join(Concept, Concept.id == Progress.concept_id)
+            .filter(Progress.user_id == user_id)
+        )
+        if after is not None:
+            query = query.filter(Progress.concept_id > after)
+        rows = (await db.execute(query.order_by(Progress.concept_id).limit(limit + 1))).all()
+        levels = {concept_id: (name, level or 0) for concept_id, name, level in rows}
+        if pending:
+            # Only pending concepts this page can contain: past `after` and, when
+            # more stored rows follow, not beyond the last one fetched
+            upper = rows[-1][0] if len(rows) > limit else None
+            in_range = {
+                concept_id: level for concept_id, level in pending.items()
+                if (after is None or concept_id > after) and (upper is None or concept_id <= upper)
+            }
+            unnamed = [concept_id for concept_id in in_range if concept_id not in levels]
+            if unnamed:
+                result = await db.execute(select(Concept.id, Concept.name).filter(Concept.id.in_(unnamed)))
+                levels.update((concept_id, (name, 0)) for concept_id, name in result.all())
+            for concept_id, level in in_range.items():
+                if concept_id in levels:
+                    levels[concept_id] = (levels[concept_id][0], level)
+        items = [
+            {"concept_id": concept_id, "concept": levels[concept_id][0], "mastery_level": levels[concept_id][1]}
+            for concept_id in sorted(levels)
+        ]
+        next_cursor = items[limit - 1]["concept_id"] if len(items) > limit else None
+        return items[:limit], next_cursor
+
+    async def get_summary(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        threshold: int,
+        target_concept_id: Optional[int] = None,
+        weakest_limit: int = 5,
+        max_depth: int = 10,
+        pending: Optional[Dict[int, int]] = None,
+    ) -> dict:
+        """
+        Mastery counts, average and histogram for a student, plus the weakest
+        prerequisites of a target concept. `pending` levels take precedence over stored ones.
+        """
+        row = (await db.execute(SUMMARY_QUERY, {
+            "user_id": user_id,
+            "pending": json.dumps({str(concept_id): level for concept_id, level in (pending or {}).items()}),
+            "threshold": threshold,
+            "target_id": target_concept_id,
+            "weakest_limit": weakest_limit,
+            "max_depth": max_depth,
+        })).one()
+        return {
+            "concepts_started": row.concepts_started,
+            "mastered": row.mastered,
+            "average_mastery": float(row.average_mastery) if row.average_mastery is not None else None,
+            "histogram": _histogram({int(b): n for b, n in row.histogram.items()}),
+            "weakest_prerequisites": row.weakest_prerequisites,
+        }
+
+    async def get_class_stats_page(
+        self, db: AsyncSession, *, threshold: int, after: int = 0, limit: int = 50, use_rollup: bool = False
+    ) -> Tuple[List[dict], Optional[int]]:
+        """
+        Per-concept class statistics (students, average, mastered, histogram)
+        for one keyset page of concepts. `mastered` counts whole buckets, so
+        it is exact when the threshold is a multiple of 10.
+        """
+        query = CLASS_STATS_ROLLUP_QUERY if use_rollup else CLASS_STATS_QUERY
+        # One concept more than asked for tells whether another page exists
+        rows = (await db.execute(query, {"after": after, "limit": limit + 1})).all()
+
+        stats: Dict[int, dict] = {}
+        for row in rows:
+            entry = stats.setdefault(row.concept_id, {
+                "concept_id": row.concept_id, "concept": row.concept, "students": 0, "total": 0, "buckets": {},
+            })
+            # Concepts no student has started come back with no bucket or 0 students
+            if row.bucket is not None and row.students:
+                entry["students"] += row.students
+                entry["total"] += row.mastery_sum
+                entry["buckets"][int(row.bucket)] = row.students
+
+        items = []
+        for entry in stats.values():
+            buckets = entry.pop("buckets")
+            total = entry.pop("total")
+            entry["average_mastery"] = round(total / entry["students"], 1) if entry["students"] else None
+            entry["mastered"] = sum(n for b, n in buckets.items() if b * 10 >= threshold)
+            entry["histogram"] = _histogram(buckets)
+            items.append(entry)
+        next_cursor = items[limit - 1]["concept_id"] if len(items) > limit else None
+        return items[:limit], next_cursor
+
 progress = CRUDProgress(Progress)
\ No newline at end of file
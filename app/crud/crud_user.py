@@ -1,13 +1,24 @@
+from typing import List, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import cast, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload # Make sure this is imported
 
 from app.crud.base import CRUDBase
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async, get_password_hashes_async
 from app.models.cognitive_profile import CognitiveProfile
 
+# Rows per multi-row INSERT, well under Postgres' bind parameter limit
+BULK_INSERT_CHUNK = 1000
+
+def _build_user(user_id: int, email: str, hashed_password: str, profile_id: int, profile_data: dict) -> User:
+    """The created user and profile as in-memory instances, so no reload is needed for the response."""
+    profile = CognitiveProfile(id=profile_id, user_id=user_id, style_scores=None, **profile_data)
+    return User(id=user_id, email=email, hashed_password=hashed_password, cognitive_profile=profile)
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def get_by_email(self, db: AsyncSession, *, email: str) -> User | None:
         # UPDATED: Always load the cognitive profile when getting a user by email
@@ -18,18 +29,102 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         )
         return result.scalars().first()
 
-    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+    async def get_with_profile(self, db: AsyncSession, *, id: int) -> User | None:
+        """Primary-key lookup with the cognitive profile loaded, for tokens carrying the user id."""
+        result = await db.execute(
+            select(User)
+            .options(selectinload(User.cognitive_profile))
+            .filter(User.id == id)
+        )
+        return result.scalars().first()
+
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User | None:
+        """
+        Inserts the user and its profile in a single statement (the user
+        INSERT ... RETURNING runs as a CTE feeding the profile INSERT).
+        Returns None when the email is already registered: the unique
+        constraint skips the row, so no pre-check SELECT is needed.
+        """
         cognitive_profile_data = obj_in.cognitive_profile.model_dump()
-        
-        db_obj = User(
-            email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
-            cognitive_profile=CognitiveProfile(**cognitive_profile_data)
+        hashed_password = await get_password_hash_async(obj_in.password)
+
+        new_user = (
+            pg_insert(User)
+            .values(email=obj_in.email, hashed_password=hashed_password)
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id)
+            .cte("new_user")
         )
-        db.add(db_obj)
+        profile_columns = CognitiveProfile.__table__.c
+        statement = (
+            insert(CognitiveProfile)
+            .from_select(
+                ["user_id", *cognitive_profile_data],
+                select(
+                    new_user.c.id,
+                    # INSERT ... SELECT doesn't infer parameter types from the target columns
+                    *(
+                        cast(literal(value, profile_columns[field].type), profile_columns[field].type)
+                        for field, value in cognitive_profile_data.items()
+                    ),
+                ),
+            )
+            .returning(CognitiveProfile.id, CognitiveProfile.user_id)
+        )
+        row = (await db.execute(statement)).first()
+        await db.commit()
+        if row is None:
+            return None
+        return _build_user(row.user_id, obj_in.email, hashed_password, row.id, cognitive_profile_data)
+
+    async def create_many(self, db: AsyncSession, *, objs_in: List[UserCreate]) -> Tuple[List[User], List[str]]:
+        """
+        Registers a whole roster in one transaction with multi-row INSERTs.
+        Returns the created users and the emails skipped because they were
+        already registered (or repeated in the roster).
+        """
+        unique = {}
+        for obj_in in objs_in:
+            unique.setdefault(obj_in.email, obj_in)
+        rows = list(unique.values())
+        hashed_passwords = await get_password_hashes_async([obj_in.password for obj_in in rows])
+
+        created = []
+        for offset in range(0, len(rows), BULK_INSERT_CHUNK):
+            chunk = rows[offset:offset + BULK_INSERT_CHUNK]
+            hashes = hashed_passwords[offset:offset + BULK_INSERT_CHUNK]
+            result = await db.execute(
+                pg_insert(User)
+                .values([{"email": obj_in.email, "hashed_password": h} for obj_in, h in zip(chunk, hashes)])
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id, User.email, User.hashed_password)
+            )
+            new_users = {row.email: row for row in result}
+            if not new_users:
+                continue
+
+            profiles = {
+                new_users[obj_in.email].id: obj_in.cognitive_profile.model_dump()
+                for obj_in in chunk if obj_in.email in new_users
+            }
+            result = await db.execute(
+                insert(CognitiveProfile)
+                .values([{"user_id": user_id, **data} for user_id, data in profiles.items()])
+                .returning(CognitiveProfile.id, CognitiveProfile.user_id)
+            )
+            profile_ids = {row.user_id: row.id for row in result}
+            created.extend(
+                _build_user(row.id, row.email, row.hashed_password, profile_ids[row.id], profiles[row.id])
+                for row in new_users.values()
+            )
         await db.commit()
-        # We need to refresh to get the relationships loaded correctly after creation
-        await db.refresh(db_obj, attribute_names=['cognitive_profile'])
-        return db_obj
 
-user = CRUDUser(User)
\ No newline at end of file
+        created_emails = {user.email for user in created}
+        skipped, seen = [], set()
+        for obj_in in objs_in:
+            if obj_in.email in seen or obj_in.email not in created_emails:
+                skipped.append(obj_in.email)
+            seen.add(obj_in.email)
+        return created, skipped
+
+user = CRUDUser(User)
@@ -1,13 +1,93 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # --- CORRECTED ---
 # This now imports the correctly named session factory.
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
 from app.crud.crud_concept import concept as crud_concept
 from app.schemas.concept import ConceptCreate
 
+# create_all() only creates missing tables, so columns added to existing
+# tables are applied here. Every statement must be idempotent.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE cognitive_profiles ADD COLUMN IF NOT EXISTS style_scores REAL[]",
+    "ALTER TABLE progress ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_progress_user_concept_mastery ON progress (user_id, concept_id) INCLUDE (mastery_level)",
+    "CREATE INDEX IF NOT EXISTS ix_progress_concept_mastery ON progress (concept_id, mastery_level)",
+    "ALTER TABLE concepts ADD COLUMN IF NOT EXISTS graph_id VARCHAR",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_concepts_graph_id ON concepts (graph_id)",
+]
+
+# Optional per-concept rollup for class views (PROGRESS_ROLLUP_ENABLED): student
+# count and mastery sum per (concept, 10-point bucket), kept current by a
+# trigger on progress, so class statistics never aggregate the progress table.
+ROLLUP_ENABLE = [
+    """
+    CREATE TABLE IF NOT EXISTS progress_rollup (
+        concept_id INTEGER NOT NULL REFERENCES concepts(id) ON DELETE CASCADE,
+        bucket SMALLINT NOT NULL,
+        students INTEGER NOT NULL DEFAULT 0,
+        mastery_sum BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (concept_id, bucket)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION progress_rollup_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE progress_rollup
+            SET students = students - 1, mastery_sum = mastery_sum - coalesce(OLD.mastery_level, 0)
+            WHERE concept_id = OLD.concept_id AND bucket = LEAST(coalesce(OLD.mastery_level, 0) / 10, 9);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO progress_rollup (concept_id, bucket, students, mastery_sum)
+            VALUES (NEW.concept_id, LEAST(coalesce(NEW.mastery_level, 0) / 10, 9), 1, coalesce(NEW.mastery_level, 0))
+            ON CONFLICT (concept_id, bucket) DO UPDATE
+            SET students = progress_rollup.students + 1,
+                mastery_sum = progress_rollup.mastery_sum + EXCLUDED.mastery_sum;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE TRIGGER progress_rollup_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF concept_id, mastery_level ON progress
+    FOR EACH ROW EXECUTE FUNCTION progress_rollup_apply()
+    """,
+    # Backfill once, in the same transaction that created the trigger
+    """
+    INSERT INTO progress_rollup (concept_id, bucket, students, mastery_sum)
+    SELECT concept_id, LEAST(coalesce(mastery_level, 0) / 10, 9), count(*), sum(coalesce(mastery_level, 0))
+    FROM progress
+    WHERE NOT EXISTS (SELECT 1 FROM progress_rollup)
+    GROUP BY 1, 2
+    """,
+]
+# Turning the rollup off drops it entirely, so re-enabling it backfills from scratch
+ROLLUP_DISABLE = [
+    "DROP TRIGGER IF EXISTS progress_rollup_trigger ON progress",
+    "DROP FUNCTION IF EXISTS progress_rollup_apply()",
+    "DROP TABLE IF EXISTS progress_rollup",
+]
+
+# Every gunicorn worker runs the upgrade at startup; this transaction-scoped
+# advisory lock makes them take turns, so concurrent DDL on the same function,
+# trigger or index can't fail with "tuple concurrently updated" or duplicates.
+SCHEMA_UPGRADE_LOCK_ID = 0x5C4E_0001
+
+async def upgrade_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": SCHEMA_UPGRADE_LOCK_ID})
+        for statement in SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
+        for statement in ROLLUP_ENABLE if settings.PROGRESS_ROLLUP_ENABLED else ROLLUP_DISABLE:
+            await conn.execute(text(statement))
+
 async def init_db() -> None:
     """Initializes the database with some basic concepts if they don't exist."""
+    await upgrade_schema()
     async with SessionLocal() as db:
         concepts = [
             ("Basic Arithmetic", "Fundamental operations like addition, subtraction, etc."),
@@ -1,9 +1,23 @@
-from neo4j import AsyncGraphDatabase, AsyncDriver
+import asyncio
+import time
+from typing import List, Optional
+
+from neo4j import AsyncGraphDatabase, AsyncDriver, AsyncSession, READ_ACCESS, WRITE_ACCESS, Record
 from app.core.config import settings
 
+HEALTH_QUERY = "RETURN 1 AS ok"
+
 class Neo4jDriver:
     _driver: AsyncDriver | None = None
 
+    def __init__(self):
+        self._sessions_active = 0
+        self._sessions_opened = 0
+        self._reads = 0
+        self._read_retries = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+
     def get_driver(self) -> AsyncDriver:
         """Returns the singleton AsyncDriver, creating it if necessary."""
         if self._driver is None:
@@ -11,7 +25,12 @@ class Neo4jDriver:
             try:
                 self._driver = AsyncGraphDatabase.driver(
                     settings.NEO4J_URI,
-                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+                    auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                    max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+                    connection_acquisition_timeout=settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
+                    max_connection_lifetime=settings.NEO4J_MAX_CONNECTION_LIFETIME,
+                    liveness_check_timeout=settings.NEO4J_LIVENESS_CHECK_TIMEOUT,
+                    connection_timeout=settings.NEO4J_CONNECTION_TIMEOUT,
                 )
                 print("Neo4j driver initialized.")
             except Exception as e:
@@ -19,6 +38,73 @@ class Neo4jDriver:
                 raise
         return self._driver
 
+    def session(self, access_mode: str) -> AsyncSession:
+        """
+        A session on NEO4J_DATABASE with the given default access mode. Every
+        session the app, its CLIs and background tasks open goes through here.
+        """
+        return self.get_driver().session(
+            default_access_mode=access_mode,
+            database=settings.NEO4J_DATABASE or None,
+        )
+
+    def read_session(self) -> AsyncSession:
+        """A session routed to any cluster member that can serve reads."""
+        return self.session(READ_ACCESS)
+
+    def write_session(self) -> AsyncSession:
+        """A session routed to the leader, for schema changes and graph writes."""
+        return self.session(WRITE_ACCESS)
+
+    async def warm_up(self) -> None:
+        """
+        Opens NEO4J_WARMUP_CONNECTIONS pooled connections up front by running
+        the health query on that many concurrent sessions, so the first burst
+        of requests doesn't pay for connection setup. Raises if Neo4j is unhealthy.
+        """
+        driver = self.get_driver()
+        await driver.verify_connectivity()
+
+        async def check():
+            async with self.read_session() as session:
+                record = await read_single(session, HEALTH_QUERY)
+                if not record or record["ok"] != 1:
+                    raise RuntimeError("Neo4j health query returned an unexpected result.")
+
+        await asyncio.gather(*(check() for _ in range(max(1, settings.NEO4J_WARMUP_CONNECTIONS))))
+        print(f"Neo4j connection pool warmed up with {settings.NEO4J_WARMUP_CONNECTIONS} connection(s).")
+
+    def _record_read(self, wait_ms: float, attempts: int) -> None:
+        self._reads += 1
+        self._read_retries += max(0, attempts - 1)
+        self._wait_ms_total += wait_ms
+        self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+
+    def stats(self) -> dict:
+        """
+        Session and read-transaction counters kept here, plus per-server
+        in-use/idle connection counts. The driver has no public pool metrics
+        API, so the latter are read from its pool on a best-effort basis.
+        """
+        pool = {}
+        try:
+            for address, connections in self._driver._pool.connections.items():
+                in_use = sum(1 for connection in connections if connection.in_use)
+                pool[str(address)] = {"in_use": in_use, "idle": len(connections) - in_use}
+        except Exception:
+            pool = None
+        return {
+            "max_pool_size": settings.NEO4J_MAX_POOL_SIZE,
+            "pool": pool,
+            "sessions_active": self._sessions_active,
+            "sessions_opened": self._sessions_opened,
+            "reads": self._reads,
+            "read_retries": self._read_retries,
+            # Time until a read transaction starts: connection acquisition plus BEGIN
+            "wait_ms_avg": round(self._wait_ms_total / self._reads, 3) if self._reads else 0.0,
+            "wait_ms_max": round(self._wait_ms_max, 3),
+        }
+
     async def close(self):
         """Closes the Neo4j driver connection."""
         if self._driver is not None and not self._driver.closed():
@@ -30,8 +116,44 @@ class Neo4jDriver:
 # Create a global instance of the driver
 neo4j_driver = Neo4jDriver()
 
-# Dependency for FastAPI to inject a session
+async def read_records(session: AsyncSession, query: str, **params) -> List[Record]:
+    """
+    Runs a read-only query as a managed read transaction: routed to readers
+    and retried by the driver on transient errors and leader changes.
+    """
+    started = time.perf_counter()
+    state = {"attempts": 0, "wait_ms": 0.0}
+
+    async def work(tx):
+        if state["attempts"] == 0:
+            state["wait_ms"] = (time.perf_counter() - started) * 1000
+        state["attempts"] += 1
+        result = await tx.run(query, **params)
+        return [record async for record in result]
+
+    records = await session.execute_read(work)
+    neo4j_driver._record_read(state["wait_ms"], state["attempts"])
+    return records
+
+async def read_single(session: AsyncSession, query: str, **params) -> Optional[Record]:
+    records = await read_records(session, query, **params)
+    return records[0] if records else None
+
+async def write_records(session: AsyncSession, query: str, **params) -> List[Record]:
+    """Runs a query as a managed write transaction, retried by the driver on transient errors."""
+    async def work(tx):
+        result = await tx.run(query, **params)
+        return [record async for record in result]
+
+    return await session.execute_write(work)
+
+# Dependency for FastAPI to inject a session.
+# Every request-path use of the graph is read-only, so sessions default to READ_ACCESS.
 async def get_neo4j_session():
-    driver = neo4j_driver.get_driver()
-    async with driver.session() as session:
-        yield session
\ No newline at end of file
+    neo4j_driver._sessions_active += 1
+    neo4j_driver._sessions_opened += 1
+    try:
+        async with neo4j_driver.read_session() as session:
+            yield session
+    finally:
+        neo4j_driver._sessions_active -= 1
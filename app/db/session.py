@@ -1,10 +1,138 @@
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import settings
 
+class PoolMonitor:
+    """
+    Connection pool and query counters for this worker, fed by SQLAlchemy
+    pool and cursor events. Exposed on the metrics endpoint.
+    """
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+        self.recent_slow = deque(maxlen=20)
+        self.budget: Optional[dict] = None
+        self._pool = None
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        # Checkouts served straight from the pool take microseconds; count only real waits
+        if seconds >= 0.001:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+        self.timeouts += timed_out
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.query_seconds += seconds
+        if seconds * 1000 >= settings.DB_SLOW_QUERY_MS:
+            self.slow_queries += 1
+            sql = " ".join(statement.split())[:300]
+            self.recent_slow.append({"ms": round(seconds * 1000, 1), "statement": sql})
+            print(f"Slow query ({seconds * 1000:.0f} ms): {sql}")
+
+    def attach(self, engine) -> None:
+        sync_engine = engine.sync_engine
+        pool = self._pool = sync_engine.pool
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(pool, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+        @event.listens_for(pool, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info["query_start"] = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.pop("query_start", None)
+            if started is not None:
+                self.record_query(statement, time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        pool = self._pool
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout() if pool is not None else 0,
+            "idle": pool.checkedin() if pool is not None else 0,
+            "overflow": pool.overflow() if pool is not None else 0,
+            "peak_checked_out": self.peak_checked_out,
+            "peak_overflow": self.peak_overflow,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "invalidations": self.invalidations,
+            "waits": self.waits,
+            "avg_wait_ms": round(self.wait_seconds / self.waits * 1000, 2) if self.waits else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "timeouts": self.timeouts,
+            "queries": self.queries,
+            "avg_query_ms": round(self.query_seconds / self.queries * 1000, 2) if self.queries else 0.0,
+            "slow_queries": self.slow_queries,
+            "recent_slow_queries": list(self.recent_slow),
+            "connection_budget": self.budget,
+        }
+
+pool_monitor = PoolMonitor()
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Times every checkout, since the pool has no event for waiting on a full pool."""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_monitor.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_monitor.record_wait(time.perf_counter() - started)
+        return connection
+
+def _connect_args() -> dict:
+    if make_url(settings.DATABASE_URL).get_driver_name() != "asyncpg":
+        return {}
+    # Prepared statements cached per connection. Must be 0 behind PgBouncer in transaction mode.
+    return {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+
 # Create the asynchronous engine for connecting to the database
-engine = create_async_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    poolclass=MonitoredQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=_connect_args(),
+)
+pool_monitor.attach(engine)
 
 # --- CORRECTED ---
 # This is the single, authoritative session factory for the entire application.
@@ -14,4 +142,30 @@ SessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
-)
\ No newline at end of file
+)
+
+async def check_connection_budget() -> dict:
+    """
+    Compares the connections every process may open (DB_PROCESSES pools of
+    DB_POOL_SIZE + DB_MAX_OVERFLOW) with what the server accepts, and warns
+    at startup when the pools could exhaust max_connections.
+    """
+    async with engine.connect() as conn:
+        max_connections = int((await conn.execute(text("SHOW max_connections"))).scalar())
+        reserved = int((await conn.execute(text("SHOW superuser_reserved_connections"))).scalar())
+    per_process = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    budget = {
+        "max_connections": max_connections,
+        "available": max_connections - reserved,
+        "processes": settings.DB_PROCESSES,
+        "per_process": per_process,
+        "required": per_process * settings.DB_PROCESSES,
+    }
+    if budget["required"] > budget["available"]:
+        print(
+            f"Warning: {settings.DB_PROCESSES} processes x {per_process} connections = {budget['required']} "
+            f"exceeds the {budget['available']} Postgres connections available. Lower DB_POOL_SIZE/"
+            f"DB_MAX_OVERFLOW or raise max_connections, or checkouts will fail under load."
+        )
+    pool_monitor.budget = budget
+    return budget
@@ -4,11 +4,16 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.security import password_executor
 from app.api.v1.api import api_router
-from app.db.session import engine
+from app.db.session import check_connection_budget, engine
 from app.db.base_class import Base
 from app.db.init_db import init_db
 from app.db.neo4j_driver import neo4j_driver
+from app.services.cognitive_analyzer import inference_executor
+from app.services.concept_resolver import bootstrap_concept_schema, concept_resolver
+from app.services.graph_snapshot import graph_snapshot
+from app.services.write_behind import write_behind
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,10 +21,36 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     await init_db()
-    neo4j_driver.get_driver()
+    try:
+        await check_connection_budget()
+    except Exception as e:
+        print(f"Could not check the Postgres connection budget: {e}")
+    write_behind.start()
+    try:
+        await neo4j_driver.warm_up()
+    except Exception as e:
+        # The driver reconnects on demand; requests just pay the connection cost
+        print(f"Neo4j warm-up failed: {e}")
+    try:
+        async with neo4j_driver.write_session() as session:
+            await bootstrap_concept_schema(session)
+        async with neo4j_driver.read_session() as session:
+            await concept_resolver.load(session)
+            if settings.KG_SNAPSHOT_ENABLED:
+                await graph_snapshot.refresh(session)
+    except Exception as e:
+        # Concept lookups fall back to the graph until the resolver can load
+        print(f"Failed to prepare concept resolution: {e}")
+    if settings.KG_SNAPSHOT_ENABLED:
+        # Also retries the initial load if Neo4j wasn't reachable at startup
+        graph_snapshot.start()
     yield
     print("--- Application Shutting Down ---")
+    await write_behind.stop()
+    await graph_snapshot.stop()
     await neo4j_driver.close()
+    inference_executor.shutdown()
+    password_executor.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
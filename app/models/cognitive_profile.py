@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY, REAL
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from app.schemas.cognitive_profile import (
@@ -21,4 +22,8 @@ class CognitiveProfile(Base):
     feedback_preference = Column(Enum(FeedbackPreference), default=FeedbackPreference.delayed)
     complexity_tolerance = Column(Enum(ComplexityTolerance), default=ComplexityTolerance.high)
 
+    # Continuous per-option scores behind the analyzed enums above, flattened in
+    # ANALYZED_DIMENSIONS order. NULL until the analyzer first runs for this user.
+    style_scores = Column(ARRAY(REAL), nullable=True)
+
     user = relationship("User", back_populates="cognitive_profile")
\ No newline at end of file
@@ -14,6 +14,8 @@ class Concept(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False, unique=True)
     description = Column(String)
+    # Id of the matching Neo4j Concept node; concepts without one are matched by name
+    graph_id = Column(String, index=True, unique=True, nullable=True)
 
     prerequisites = relationship(
         "Concept",
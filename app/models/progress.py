@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, DateTime, Index, Integer, ForeignKey, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -9,8 +9,16 @@ class Progress(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     concept_id = Column(Integer, ForeignKey("concepts.id"), nullable=False)
     mastery_level = Column(Integer, default=0) # Scale of 0-100
+    # When the mastery level was recorded; offline syncs keep the newest value
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="progress")
     concept = relationship("Concept")
 
-    __table_args__ = (UniqueConstraint('user_id', 'concept_id', name='_user_concept_uc'),)
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint('user_id', 'concept_id', name='_user_concept_uc'),
+        # Per-student listing and summaries read only this index (index-only scans)
+        Index('ix_progress_user_concept_mastery', 'user_id', 'concept_id', postgresql_include=['mastery_level']),
+        # Class-wide statistics for a range of concepts
+        Index('ix_progress_concept_mastery', 'concept_id', 'mastery_level'),
+    )
\ No newline at end of file
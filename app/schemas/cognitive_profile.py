@@ -33,6 +33,14 @@ class ComplexityTolerance(str, Enum):
     high = "high"
     low = "low"
 
+# The dimensions the ML cognitive analyzer infers from prompts, mapped to their Enum options.
+ANALYZED_DIMENSIONS = {
+    'instruction_flow': list(InstructionFlow),
+    'input_preference': list(InputPreference),
+    'learning_autonomy': list(LearningAutonomy),
+    'complexity_tolerance': list(ComplexityTolerance),
+}
+
 
 class CognitiveProfileBase(BaseModel):
     instruction_flow: InstructionFlow = InstructionFlow.sequential
@@ -1,5 +1,15 @@
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
+from app.schemas.concept import Neo4jConcept
+
+# Items accepted per batch or sync request
+MAX_PROGRESS_ITEMS = 500
+# Students per class recommendation request
+MAX_CLASS_SIZE = 500
+
 class ProgressBase(BaseModel):
     mastery_level: int = Field(..., ge=0, le=100)
 
@@ -9,10 +19,24 @@ class ProgressCreate(ProgressBase):
 class ProgressUpdate(ProgressBase):
     pass
 
+class ProgressBatch(BaseModel):
+    # Repeated concept ids: the last item wins
+    items: List[ProgressCreate] = Field(..., min_length=1, max_length=MAX_PROGRESS_ITEMS)
+
+class ProgressSyncItem(ProgressCreate):
+    # When the client recorded this level. Naive timestamps are taken as UTC.
+    recorded_at: datetime
+
+class ProgressSync(BaseModel):
+    # Each item only replaces the stored level if it was recorded later
+    items: List[ProgressSyncItem] = Field(..., min_length=1, max_length=MAX_PROGRESS_ITEMS)
+
 class Progress(ProgressBase):
-    id: int
+    # None while the write is still buffered (WRITE_BEHIND_ENABLED)
+    id: Optional[int] = None
     user_id: int
     concept_id: int
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -20,4 +44,47 @@ class Progress(ProgressBase):
 class ConceptProgress(BaseModel):
     concept: str
     concept_id: int
-    mastery_level: int
\ No newline at end of file
+    mastery_level: int
+
+class ProgressPage(BaseModel):
+    items: List[ConceptProgress]
+    # Pass as `after` to get the next page; None on the last page
+    next_cursor: Optional[int] = None
+
+class HistogramBucket(BaseModel):
+    low: int
+    high: int
+    count: int
+
+class ProgressSummary(BaseModel):
+    concepts_started: int
+    mastered: int
+    average_mastery: Optional[float] = None
+    histogram: List[HistogramBucket]
+    # Prerequisites of the requested target, lowest mastery first (0 if never started)
+    weakest_prerequisites: List[ConceptProgress] = []
+
+class ConceptMasteryStats(BaseModel):
+    concept_id: int
+    concept: str
+    students: int
+    average_mastery: Optional[float] = None
+    mastered: int
+    histogram: List[HistogramBucket]
+
+class ConceptMasteryPage(BaseModel):
+    items: List[ConceptMasteryStats]
+    next_cursor: Optional[int] = None
+
+class ConceptRecommendation(BaseModel):
+    concept: Neo4jConcept
+    # Postgres concepts.id; None when the graph node has no matching concept row
+    concept_id: Optional[int] = None
+    mastery_level: int
+
+class StudentRecommendations(BaseModel):
+    user_id: int
+    recommendations: List[ConceptRecommendation]
+
+class ClassRecommendationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=MAX_CLASS_SIZE)
@@ -6,4 +6,6 @@ class Token(BaseModel):
     token_type: str
 
 class TokenPayload(BaseModel):
-    sub: Optional[str] = None
\ No newline at end of file
+    sub: Optional[str] = None
+    uid: Optional[int] = None
+    iat: Optional[int] = None
\ No newline at end of file
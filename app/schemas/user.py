@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from app.schemas.cognitive_profile import CognitiveProfileCreate, CognitiveProfile
 
 class UserBase(BaseModel):
@@ -19,4 +19,9 @@ class User(BaseModel):
     cognitive_profile: CognitiveProfile
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class RosterRegistrationResult(BaseModel):
+    created: List[User]
+    # Emails already registered, or repeated within the roster
+    skipped: List[str]
\ No newline at end of file
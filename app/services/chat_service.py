@@ -1,3 +1,6 @@
+import hashlib
+from typing import AsyncIterator
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnablePassthrough
@@ -6,9 +9,13 @@ from langchain_groq import ChatGroq
 
 from app.models.user import User
 from app.schemas.chat import ConversationRequest
+from app.schemas.cognitive_profile import ANALYZED_DIMENSIONS
 from app.services.cognitive_analyzer import ml_cognitive_analyzer_service
+from app.services.principal_cache import principal_cache
+from app.services.write_behind import write_behind
 from app.crud.crud_cognitive_profile import profile as crud_profile
 from app.core.config import settings # <-- Import settings
+from app.core.single_flight import SingleFlight
 
 # --- STABILITY FIX ---
 # Explicitly pass the API key from our validated settings object.
@@ -19,6 +26,16 @@ chat_llm = ChatGroq(
     temperature=0.7
 )
 
+# Conversation turns the model sees. The window memory keeps k exchanges,
+# i.e. the last 2 * k messages.
+MEMORY_TURNS = 5
+
+def coalescing_key(history, enriched_input: str, model_name: str, turns: int = MEMORY_TURNS) -> str:
+    """Hash of exactly what reaches the model: the windowed history and the enriched input."""
+    window = history[-2 * turns:] if turns > 0 else []
+    parts = "|".join(f"{msg.role}:{msg.content}" for msg in window)
+    return hashlib.sha256(f"{model_name}|{parts}|{enriched_input}".encode()).hexdigest()
+
 # This prompt template includes placeholders for the chat history and the final user input.
 prompt_template = ChatPromptTemplate.from_messages(
     [
@@ -28,6 +45,9 @@ prompt_template = ChatPromptTemplate.from_messages(
     ]
 )
 
+# Identical in-flight turns (same history, input and profile context) share one LLM call
+chat_flight = SingleFlight("chat")
+
 class ConversationalChainService:
     def __init__(
         self,
@@ -38,20 +58,27 @@ class ConversationalChainService:
         self.current_user = current_user
 
     async def _update_cognitive_profile(self, user_input: str) -> dict:
-        inferred_update, _ = ml_cognitive_analyzer_service.analyze_prompt(
-            user_input, 
-            current_profile=self.current_user.cognitive_profile
+        profile = self.current_user.cognitive_profile
+        inferred_update, _, style_scores = await ml_cognitive_analyzer_service.analyze_prompt_async(
+            user_input,
+            current_profile=profile
         )
-        if inferred_update.model_dump(exclude_unset=True):
-            current_profile_dict = self.current_user.cognitive_profile.__dict__
-            update_data = inferred_update.model_dump(exclude_unset=True)
-            current_profile_dict.update(update_data)
-            await crud_profile.update(
-                self.db,
-                db_obj=self.current_user.cognitive_profile,
-                obj_in=current_profile_dict
-            )
-        return {}
+        # Only columns that actually changed are written, in one targeted
+        # UPDATE; enum columns only change when a dominant style flips.
+        update_data = inferred_update.model_dump(include=set(ANALYZED_DIMENSIONS))
+        update_data["style_scores"] = style_scores
+        if write_behind.enabled:
+            # Applied to the cached profile now, written at the next flush, which
+            # also drops this worker's cached principal (see PrincipalCache)
+            return write_behind.update_profile(profile, update_data)
+        changed = await crud_profile.update_changed(
+            self.db,
+            db_obj=profile,
+            obj_in=update_data
+        )
+        if changed:
+            principal_cache.invalidate(self.current_user)
+        return changed
 
     def get_full_prompt(self, user_input: str) -> str:
         profile = self.current_user.cognitive_profile
@@ -61,10 +88,9 @@ class ConversationalChainService:
         )
         return profile_context + user_input
 
-    async def generate_response(self, request: ConversationRequest) -> str:
-        await self._update_cognitive_profile(request.prompt)
+    def _build_chain(self, request: ConversationRequest):
         memory = ConversationBufferWindowMemory(
-            k=5, return_messages=True, memory_key="history"
+            k=MEMORY_TURNS, return_messages=True, memory_key="history"
         )
         for msg in request.conversation_history:
             if msg.role == "user":
@@ -72,14 +98,43 @@ class ConversationalChainService:
             else:
                 memory.chat_memory.add_ai_message(msg.content)
 
-        conversational_chain = (
+        return (
             RunnablePassthrough.assign(
                 history=lambda x: memory.load_memory_variables(x)["history"]
             )
             | prompt_template
             | chat_llm
         )
-        
+
+    def _fingerprint(self, request: ConversationRequest, enriched_input: str) -> str:
+        return coalescing_key(request.conversation_history, enriched_input, chat_llm.model_name)
+
+    async def generate_response(self, request: ConversationRequest) -> str:
+        await self._update_cognitive_profile(request.prompt)
+        conversational_chain = self._build_chain(request)
+
+        enriched_input = self.get_full_prompt(request.prompt)
+        response = await chat_flight.do(
+            self._fingerprint(request, enriched_input),
+            lambda: conversational_chain.ainvoke({"input": enriched_input}),
+        )
+        return response.content
+
+    async def stream_response(self, request: ConversationRequest) -> AsyncIterator[str]:
+        """
+        Updates the cognitive profile right away (while the request's DB session
+        is still open), then returns an iterator over the reply's tokens.
+        """
+        await self._update_cognitive_profile(request.prompt)
+        conversational_chain = self._build_chain(request)
         enriched_input = self.get_full_prompt(request.prompt)
-        response = await conversational_chain.ainvoke({"input": enriched_input})
-        return response.content
\ No newline at end of file
+        return chat_flight.stream(
+            self._fingerprint(request, enriched_input),
+            lambda: self._stream_tokens(conversational_chain, enriched_input),
+        )
+
+    async def _stream_tokens(self, conversational_chain, enriched_input: str) -> AsyncIterator[str]:
+        # Closing this generator closes the chain's stream and the Groq request under it
+        async for chunk in conversational_chain.astream({"input": enriched_input}):
+            if chunk.content:
+                yield chunk.content
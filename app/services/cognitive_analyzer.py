@@ -1,69 +1,156 @@
-from transformers import pipeline
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import hashlib
+import re
 import numpy as np
-import torch
 
-from app.schemas.cognitive_profile import CognitiveProfileUpdate, InstructionFlow, InputPreference, LearningAutonomy, ComplexityTolerance
+from app.core.config import settings
+from app.core.cache import LRUTTLCache, SQLiteCacheStore, TieredCache
+from app.core.concurrency import BoundedExecutor
+from app.schemas.cognitive_profile import CognitiveProfileUpdate, ANALYZED_DIMENSIONS
 from app.models.cognitive_profile import CognitiveProfile # Import the DB model
+from app.services.model_server import ModelServerClient
+
+def _build_classifier():
+    """
+    Uses the shared model server when one is configured. Otherwise this process
+    loads its own model; the import is deferred so client-only workers never
+    pull in torch.
+    """
+    if settings.ML_MODEL_SERVER_SOCKET:
+        print(f"Using the shared model server at {settings.ML_MODEL_SERVER_SOCKET}.")
+        return ModelServerClient(settings.ML_MODEL_SERVER_SOCKET, timeout=settings.ML_MODEL_SERVER_TIMEOUT)
+    from app.services.zero_shot_classifier import ZeroShotClassifier
+    return ZeroShotClassifier(workers=settings.ML_INFERENCE_WORKERS)
+
+def _build_cache() -> TieredCache:
+    local = LRUTTLCache(settings.ML_ANALYSIS_CACHE_SIZE, settings.ML_ANALYSIS_CACHE_TTL)
+    shared = None
+    # Size 0 disables the cache, shared tier included
+    if settings.ML_ANALYSIS_CACHE_PATH and settings.ML_ANALYSIS_CACHE_SIZE > 0:
+        shared = SQLiteCacheStore(
+            settings.ML_ANALYSIS_CACHE_PATH,
+            ttl_seconds=settings.ML_ANALYSIS_CACHE_TTL,
+            max_rows=settings.ML_ANALYSIS_CACHE_SIZE * 4,
+        )
+    return TieredCache(local, shared)
 
 class MLCognitiveAnalyzerService:
     def __init__(self, adaptation_rate=0.1, decay_rate=0.05):
         self.adaptation_rate = adaptation_rate
         self.decay_rate = decay_rate
-        self.classifier = pipeline(
-            "zero-shot-classification", 
-            model="MoritzLaurer/deberta-v3-base-zeroshot-v1"
-        )
+        self.classifier = _build_classifier()
+        self.cache = _build_cache()
         self.dimensions = self._define_dimensions()
+        self._build_score_layout()
 
     def _define_dimensions(self) -> Dict[str, List]:
         """Maps our internal dimension names to the Enum options."""
-        return {
-            'instruction_flow': list(InstructionFlow),
-            'input_preference': list(InputPreference),
-            'learning_autonomy': list(LearningAutonomy),
-            'complexity_tolerance': list(ComplexityTolerance),
-        }
+        return ANALYZED_DIMENSIONS
+
+    def _build_score_layout(self):
+        """
+        Every option of every dimension gets a fixed slot in one flat score
+        vector (the layout of CognitiveProfile.style_scores). `_option_matrix`
+        holds each dimension's slots as a row, padded with the sentinel slot
+        at the end, so per-dimension argmax is a single vectorized call.
+        """
+        self._slot = {}
+        self._options = []
+        for dim, options in self.dimensions.items():
+            for opt in options:
+                self._slot[(dim, opt.value)] = len(self._options)
+                self._options.append(opt)
+        self.num_scores = len(self._options)
+
+        width = max(len(options) for options in self.dimensions.values())
+        self._option_matrix = np.full((len(self.dimensions), width), self.num_scores)
+        for row, (dim, options) in enumerate(self.dimensions.items()):
+            self._option_matrix[row, :len(options)] = [self._slot[(dim, opt.value)] for opt in options]
+
+    def _initial_scores(self, current_profile: CognitiveProfile) -> np.ndarray:
+        """
+        Loads the stored scores, or seeds a flat 0.5 prior that slightly favours
+        the profile's current styles, so the first analysis doesn't flip them on its own.
+        """
+        stored = current_profile.style_scores if current_profile is not None else None
+        if stored is not None and len(stored) == self.num_scores:
+            return np.asarray(stored, dtype=np.float32)
+
+        scores = np.full(self.num_scores, 0.5, dtype=np.float32)
+        if current_profile is not None:
+            for dim in self.dimensions:
+                current = getattr(current_profile, dim, None)
+                if current is not None:
+                    scores[self._slot[(dim, current.value)]] += 0.05
+        return scores
 
-    def analyze_prompt(self, prompt: str, current_profile: CognitiveProfile) -> (CognitiveProfileUpdate, float):
+    def _cache_key(self, prompt: str) -> str:
+        """
+        Near-identical prompts ("Explain again." vs "explain  again") share a key.
+        The backend is part of the key since backends score slightly differently.
+        """
+        normalized = re.sub(r"\s+", " ", prompt.lower()).strip(" .!?")
+        digest = hashlib.sha256(normalized.encode()).hexdigest()
+        return f"analysis:{settings.ML_BACKEND}:{digest}"
+
+    def classify(self, prompt: str) -> dict:
+        """Returns the raw per-dimension (label, confidence) output, from the cache when possible."""
+        key = self._cache_key(prompt)
+        classification = self.cache.get(key)
+        if classification is None:
+            classification = self.classifier.classify(prompt)
+            self.cache.set(key, classification)
+        return classification
+
+    def analyze_prompt(self, prompt: str, current_profile: CognitiveProfile) -> Tuple[CognitiveProfileUpdate, float, List[float]]:
         """
         Analyzes a prompt using the ML model against a provided cognitive profile.
-        This method is now stateless.
+        Returns the dominant styles, the overall confidence and the updated
+        style scores to persist on the profile. The profile itself is not modified.
         """
         prompt = prompt.strip()
-        
-        # Create a mutable dictionary of the user's current profile scores.
-        # This simulates the ML-based profile scores, starting from the DB state.
-        # A more advanced version could store these scores in the DB.
-        profile_scores = {
-            dim: {opt.value: 0.5 for opt in options} for dim, options in self.dimensions.items()
-        }
-        
-        dominant_styles = {}
-        confidence_scores = []
+        return self._adapt_profile(self.classify(prompt), current_profile)
 
-        for dim, options in self.dimensions.items():
-            option_labels = [opt.value for opt in options]
-            result = self.classifier(prompt, option_labels, multi_label=False)
-            
-            top_label = result['labels'][0]
-            confidence = result['scores'][0]
-            
-            # Apply decay to all scores in the dimension
-            for opt in profile_scores[dim]:
-                profile_scores[dim][opt] = max(0.0, profile_scores[dim][opt] * (1 - self.decay_rate))
-
-            # Adapt the top-scoring label
-            profile_scores[dim][top_label] = min(1.0, profile_scores[dim][top_label] + confidence * self.adaptation_rate)
-
-            # Determine the new dominant style for this dimension
-            dominant_style = max(profile_scores[dim], key=profile_scores[dim].get)
-            dominant_styles[dim] = dominant_style
-            confidence_scores.append(profile_scores[dim][dominant_style])
+    def _adapt_profile(self, classification: dict, current_profile: CognitiveProfile) -> Tuple[CognitiveProfileUpdate, float, List[float]]:
+        """Applies the decay/adaptation math for one user on top of a (possibly cached) classification."""
+        scores = self._initial_scores(current_profile)
+
+        top_slots = np.array([self._slot[(dim, classification[dim][0])] for dim in self.dimensions])
+        confidences = np.array([classification[dim][1] for dim in self.dimensions], dtype=np.float32)
 
+        # Decay every score, then reinforce each dimension's top label
+        scores *= (1 - self.decay_rate)
+        scores[top_slots] = np.minimum(1.0, scores[top_slots] + confidences * self.adaptation_rate)
+
+        # Dominant style per dimension; the padded sentinel slot scores -inf
+        padded = np.append(scores, -np.inf)
+        dominant_slots = self._option_matrix[np.arange(len(self.dimensions)), padded[self._option_matrix].argmax(axis=1)]
+
+        dominant_styles = {
+            dim: self._options[slot] for dim, slot in zip(self.dimensions, dominant_slots)
+        }
         update_schema = CognitiveProfileUpdate(**dominant_styles)
-        overall_confidence = np.mean(confidence_scores)
+        overall_confidence = float(scores[dominant_slots].mean())
+
+        return update_schema, overall_confidence, scores.tolist()
 
-        return update_schema, overall_confidence
+    async def analyze_prompt_async(self, prompt: str, current_profile: CognitiveProfile) -> Tuple[CognitiveProfileUpdate, float, List[float]]:
+        """
+        Runs the model on the inference pool so the event loop keeps serving
+        other requests. Raises a 503 HTTPException when the pool's queue is full.
+        Cache hits skip the pool entirely.
+        """
+        prompt = prompt.strip()
+        key = self._cache_key(prompt)
+        classification = self.cache.get(key)
+        if classification is None:
+            classification = await inference_executor.run(self.classifier.classify, prompt)
+            self.cache.set(key, classification)
+        return self._adapt_profile(classification, current_profile)
 
-ml_cognitive_analyzer_service = MLCognitiveAnalyzerService()
\ No newline at end of file
+inference_executor = BoundedExecutor(
+    "cognitive-inference",
+    max_workers=settings.ML_INFERENCE_WORKERS,
+    max_queue=settings.ML_INFERENCE_MAX_QUEUE,
+)
+ml_cognitive_analyzer_service = MLCognitiveAnalyzerService()
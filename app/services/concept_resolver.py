@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import difflib
+import re
+from typing import Dict, List, Optional
+
+from neo4j import AsyncSession as Neo4jAsyncSession
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.db.neo4j_driver import read_records, read_single, write_records
+
+FULLTEXT_INDEX = "concept_name_fulltext"
+
+# Every Topic/Subtopic also gets a shared :Concept label and a normalized name,
+# so one id index and one name index cover both labels. The resolver, the
+# knowledge-graph queries, the snapshot and the prerequisite index only see
+# nodes that have both. bootstrap_concept_schema backfills them at startup;
+# concepts created later must be written with upsert_concept, or normalized
+# after a bulk import with:
+#     python -m app.services.concept_resolver --normalize
+NORMALIZE_STATEMENT = """
+    MATCH (c)
+    WHERE (c:Topic OR c:Subtopic)
+      AND (NOT c:Concept OR c.name_normalized IS NULL OR c.name_normalized <> toLower(trim(c.name)))
+    SET c:Concept, c.name_normalized = toLower(trim(c.name))
+    RETURN count(c) AS normalized
+"""
+SCHEMA_STATEMENTS = [
+    NORMALIZE_STATEMENT,
+    "CREATE INDEX concept_id IF NOT EXISTS FOR (c:Concept) ON (c.id)",
+    "CREATE INDEX concept_name_normalized IF NOT EXISTS FOR (c:Concept) ON (c.name_normalized)",
+    # Text index: serves CONTAINS lookups on the normalized name
+    "CREATE TEXT INDEX concept_name_normalized_text IF NOT EXISTS FOR (c:Concept) ON (c.name_normalized)",
+]
+FULLTEXT_STATEMENT = f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS FOR (c:Concept) ON EACH [c.name]"
+
+# difflib is O(n) per lookup; past this many names we rely on the full-text index instead
+MAX_IN_PROCESS_FUZZY_NAMES = 5000
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"\s+", " ", name.strip().lower())
+
+# Labels can't be query parameters, so there is one statement per concept label.
+# Bumping GraphMeta.version makes the graph snapshots reload.
+UPSERT_CONCEPT_QUERIES = {
+    label: f"""
+    MERGE (c:Concept {{id: $id}})
+    SET c:{label}, c += $properties
+    SET c.name_normalized = toLower(trim(c.name))
+    WITH c
+    MERGE (m:GraphMeta)
+    SET m.version = coalesce(m.version, 0) + 1
+    RETURN c.id AS id
+    """
+    for label in ("Topic", "Subtopic")
+}
+
+async def upsert_concept(session: Neo4jAsyncSession, concept_id: str, label: str, properties: dict) -> str:
+    """
+    Creates or updates a Topic/Subtopic with the :Concept label and normalized
+    name everything else relies on. The one supported way to write concepts.
+    """
+    if label not in UPSERT_CONCEPT_QUERIES:
+        raise ValueError(f"Concept label must be one of {sorted(UPSERT_CONCEPT_QUERIES)}, not {label!r}.")
+    name = properties.get("name")
+    if not name or not name.strip():
+        raise ValueError("A concept needs a non-empty name.")
+    properties = {key: value for key, value in properties.items() if key != "id"}
+
+    async def work(tx):
+        result = await tx.run(UPSERT_CONCEPT_QUERIES[label], id=concept_id, properties=properties)
+        return (await result.single())["id"]
+
+    return await session.execute_write(work)
+
+async def normalize_concepts(session: Neo4jAsyncSession) -> int:
+    """Labels and normalizes Topic/Subtopic nodes written around upsert_concept. Returns how many changed."""
+    async def work(tx):
+        count = (await (await tx.run(NORMALIZE_STATEMENT)).single())["normalized"]
+        if count:
+            await (await tx.run("MERGE (m:GraphMeta) SET m.version = coalesce(m.version, 0) + 1")).consume()
+        return count
+
+    return await session.execute_write(work)
+
+async def bootstrap_concept_schema(session: Neo4jAsyncSession) -> None:
+    """Creates the normalized-name property and the indexes concept resolution relies on. Idempotent."""
+    statements = SCHEMA_STATEMENTS + ([FULLTEXT_STATEMENT] if settings.KG_FULLTEXT_INDEX else [])
+    for statement in statements:
+        await write_records(session, statement)
+
+class ConceptResolver:
+    """
+    Resolves the free-text concept names in URLs to node ids, in process.
+    Order: exact normalized name, then substring match (the old CONTAINS
+    behaviour, preferring the shortest matching name), then fuzzy matching.
+    Without a graph snapshot the names may be stale, so resolve_with_graph
+    checks for an exact match in Neo4j before any approximate one. Only
+    labelled, normalized concepts are found (see upsert_concept).
+    """
+    def __init__(self):
+        self._by_name: Dict[str, str] = {}
+        self._names: List[str] = []
+        self._memo = LRUTTLCache(max_size=4096, ttl_seconds=3600)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._by_name)
+
+    def load_names(self, rows) -> None:
+        """Rebuilds the index from (id, name) pairs."""
+        by_name = {}
+        for concept_id, name in rows:
+            if concept_id is not None and name:
+                by_name.setdefault(normalize_name(name), concept_id)
+        self._by_name = by_name
+        # Shortest first, so a substring scan finds the closest match first
+        self._names = sorted(by_name, key=len)
+        self._memo.clear()
+
+    async def load(self, session: Neo4jAsyncSession) -> None:
+        records = await read_records(session, "MATCH (c:Concept) RETURN c.id AS id, c.name AS name")
+        self.load_names([(record["id"], record["name"]) for record in records])
+        print(f"Concept resolver loaded {len(self._by_name)} concept names.")
+
+    def lookup_exact(self, concept_name: str) -> Optional[str]:
+        """Exact normalized-name match only, for mapping names from other systems."""
+        return self._by_name.get(normalize_name(concept_name))
+
+    def resolve(self, concept_name: str) -> Optional[str]:
+        """In process only: exact normalized name, then the approximate matches."""
+        name = normalize_name(concept_name)
+        if not name:
+            return None
+        concept_id = self._by_name.get(name)
+        if concept_id is not None:
+            return concept_id
+        return self._resolve_approximate(name)
+
+    def _resolve_approximate(self, name: str) -> Optional[str]:
+        concept_id = self._memo.get(name)
+        if concept_id is not None:
+            return concept_id
+
+        match = next((candidate for candidate in self._names if name in candidate), None)
+        if match is None and len(self._names) <= MAX_IN_PROCESS_FUZZY_NAMES:
+            close = difflib.get_close_matches(name, self._names, n=1, cutoff=0.8)
+            match = close[0] if close else None
+        if match is None:
+            return None
+
+        concept_id = self._by_name[match]
+        self._memo.set(name, concept_id)
+        return concept_id
+
+    async def resolve_with_graph(self, session: Neo4jAsyncSession, concept_name: str) -> Optional[str]:
+        """
+        For when the in-process names may be out of date (no graph snapshot):
+        an exact match in Neo4j wins over any approximate in-process match,
+        so a concept added since startup (through upsert_concept) isn't
+        resolved to a similar older name.
+        """
+        name = normalize_name(concept_name)
+        if not name:
+            return None
+        concept_id = self._by_name.get(name)
+        if concept_id is not None:
+            return concept_id
+
+        record = await read_single(
+            session,
+            "MATCH (c:Concept {name_normalized: $name}) RETURN c.id AS id, c.name AS name LIMIT 1",
+            name=name,
+        )
+        if record and record["id"] is not None:
+            self._learn(record["name"], record["id"])
+            return record["id"]
+
+        concept_id = self._resolve_approximate(name)
+        if concept_id is not None:
+            return concept_id
+        return await self.resolve_in_graph(session, concept_name)
+
+    def _learn(self, name: str, concept_id: str) -> None:
+        """Adds a concept found in the graph and drops memoized matches it could supersede."""
+        normalized = normalize_name(name)
+        if normalized not in self._by_name:
+            self._by_name[normalized] = concept_id
+            self._names = sorted(self._by_name, key=len)
+            self._memo.clear()
+
+    async def resolve_in_graph(self, session: Neo4jAsyncSession, concept_name: str) -> Optional[str]:
+        """Indexed fallback for names the in-process index doesn't know (e.g. added since startup)."""
+        name = normalize_name(concept_name)
+        if not name:
+            return None
+
+        queries = [
+            ("MATCH (c:Concept {name_normalized: $name}) RETURN c.id AS id, c.name AS name LIMIT 1", {"name": name}),
+            (
+                "MATCH (c:Concept) WHERE c.name_normalized CONTAINS $name "
+                "RETURN c.id AS id, c.name AS name ORDER BY size(c.name_normalized) LIMIT 1",
+                {"name": name},
+            ),
+        ]
+        if settings.KG_FULLTEXT_INDEX:
+            # Lucene fuzzy match on every term, e.g. "dijkstra~ algoritm~"
+            fuzzy = " ".join(f"{re.sub(r'[^0-9a-z]', '', term)}~" for term in name.split() if re.sub(r'[^0-9a-z]', '', term))
+            if fuzzy:
+                queries.append((
+                    "CALL db.index.fulltext.queryNodes($index, $search) YIELD node "
+                    "RETURN node.id AS id, node.name AS name LIMIT 1",
+                    {"index": FULLTEXT_INDEX, "search": fuzzy},
+                ))
+
+        for query, params in queries:
+            record = await read_single(session, query, **params)
+            if record and record["id"] is not None:
+                self._learn(record["name"], record["id"])
+                self._memo.set(name, record["id"])
+                return record["id"]
+        return None
+
+concept_resolver = ConceptResolver()
+
+async def main(args):
+    from app.db.neo4j_driver import neo4j_driver
+
+    async with neo4j_driver.write_session() as session:
+        if args.normalize:
+            count = await normalize_concepts(session)
+            print(f"Labelled and normalized {count} concept(s).")
+    await neo4j_driver.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--normalize", action="store_true",
+        help="Add the :Concept label and name_normalized to Topic/Subtopic nodes missing them",
+    )
+    asyncio.run(main(parser.parse_args()))
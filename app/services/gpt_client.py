@@ -1,5 +1,9 @@
+import hashlib
+from typing import AsyncIterator
+
 from groq import AsyncGroq
 from app.core.config import settings
+from app.core.single_flight import SingleFlight
 
 # Initialize the async Groq client once when the module is loaded
 # It will automatically pick up the API key from the environment via our settings
@@ -10,34 +14,87 @@ except Exception as e:
     print(f"Failed to initialize AsyncGroq client: {e}")
     async_groq_client = None
 
-async def generate_instruction(prompt: str) -> str:
+LESSON_MODEL = "openai/gpt-oss-20b"
+LESSON_TEMPERATURE = 0.7
+GENERATION_ERROR_MESSAGE = "Error: Failed to generate instruction from the AI service."
+
+# A class opening the same lesson at once sends identical prompts; only one
+# of them goes to Groq and the rest share its result.
+lesson_flight = SingleFlight("lesson")
+
+def _fingerprint(prompt: str) -> str:
+    return hashlib.sha256(f"{LESSON_MODEL}|{LESSON_TEMPERATURE}|{prompt}".encode()).hexdigest()
+
+def _completion_args(prompt: str) -> dict:
+    """The request shared by the blocking and the streaming lesson calls."""
+    return dict(
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert tutor for Data Structures and Algorithms, providing clear, personalized lessons."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model=LESSON_MODEL,
+        temperature=LESSON_TEMPERATURE,
+        max_tokens=1024,
+        top_p=1,
+    )
+
+async def _create_completion(prompt: str) -> str:
+    # Use a non-streaming call, as our endpoint returns a single JSON object
+    chat_completion = await async_groq_client.chat.completions.create(
+        **_completion_args(prompt),
+        stream=False, # We want the full response at once
+    )
+    return chat_completion.choices[0].message.content
+
+async def request_instruction(prompt: str) -> str:
     """
     Sends a prompt to the Groq API using the official Python SDK.
+    Raises on failure, so callers (e.g. the lesson cache) can tell errors from lessons.
+    Identical prompts already in flight share one upstream call.
+    """
+    if not async_groq_client:
+        raise RuntimeError("Groq client is not initialized. Please check your API key.")
+
+    return await lesson_flight.do(_fingerprint(prompt), lambda: _create_completion(prompt))
+
+async def generate_instruction(prompt: str) -> str:
+    """
+    Like request_instruction, but returns an error message instead of raising.
     """
     if not async_groq_client:
         return "Error: Groq client is not initialized. Please check your API key."
 
     try:
-        # Use a non-streaming call, as our endpoint returns a single JSON object
-        chat_completion = await async_groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert tutor for Data Structures and Algorithms, providing clear, personalized lessons."
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="openai/gpt-oss-20b", 
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1,
-            stream=False, # We want the full response at once
-        )
-        return chat_completion.choices[0].message.content
-
+        return await request_instruction(prompt)
     except Exception as e:
         print(f"An error occurred while communicating with Groq API: {e}")
-        return "Error: Failed to generate instruction from the AI service."
\ No newline at end of file
+        return GENERATION_ERROR_MESSAGE
+
+async def _stream_completion(prompt: str) -> AsyncIterator[str]:
+    stream = await async_groq_client.chat.completions.create(
+        **_completion_args(prompt),
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+def stream_instruction(prompt: str) -> AsyncIterator[str]:
+    """
+    Streams the lesson's tokens as Groq produces them. Identical prompts in
+    flight share one upstream stream. Once every consumer has closed its
+    iterator (e.g. all clients disconnected), the upstream request is closed too.
+    """
+    if not async_groq_client:
+        raise RuntimeError("Groq client is not initialized. Please check your API key.")
+
+    return lesson_flight.stream(_fingerprint(prompt), lambda: _stream_completion(prompt))
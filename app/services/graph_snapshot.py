@@ -0,0 +1,179 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from neo4j import AsyncSession as Neo4jAsyncSession
+
+from app.core.config import settings
+from app.db.neo4j_driver import neo4j_driver, read_records, read_single
+from app.schemas.concept import Neo4jConcept
+from app.services.concept_resolver import concept_resolver
+from app.services.prerequisite_index import PrerequisiteIndex
+
+EDGE_TYPES = ("PREREQUISITE_FOR", "HAS_SUBTOPIC", "USED_WITH", "EASIER_THAN")
+
+NODES_QUERY = "MATCH (c:Concept) RETURN c.id AS id, 'Subtopic' IN labels(c) AS is_subtopic, properties(c) AS props"
+EDGES_QUERY = """
+MATCH (a:Concept)-[r:PREREQUISITE_FOR|HAS_SUBTOPIC|USED_WITH|EASIER_THAN]->(b:Concept)
+RETURN a.id AS src, type(r) AS type, b.id AS dst
+"""
+# Cheap change detection: the relationship counts come from the count store.
+# An optional (:GraphMeta {version}) node lets graph editors force a reload.
+VERSION_QUERY = """
+CALL { MATCH (c:Concept) RETURN count(c) AS nodes, max(c.updated_at) AS updated_at }
+CALL { MATCH ()-[r:PREREQUISITE_FOR]->() RETURN count(r) AS prerequisite_for }
+CALL { MATCH ()-[r:HAS_SUBTOPIC]->() RETURN count(r) AS has_subtopic }
+CALL { MATCH ()-[r:USED_WITH]->() RETURN count(r) AS used_with }
+CALL { MATCH ()-[r:EASIER_THAN]->() RETURN count(r) AS easier_than }
+OPTIONAL MATCH (m:GraphMeta)
+RETURN nodes, updated_at, prerequisite_for, has_subtopic, used_with, easier_than, max(m.version) AS meta_version
+"""
+
+def _csr(num_nodes: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Compressed adjacency: the neighbours of node i are targets[offsets[i]:offsets[i + 1]]."""
+    order = np.argsort(src, kind="stable")
+    offsets = np.zeros(num_nodes + 1, dtype=np.int32)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=offsets[1:])
+    return offsets, dst[order].astype(np.int32)
+
+class GraphSnapshot:
+    """
+    Immutable in-memory copy of the Topic/Subtopic graph. Nodes are validated
+    into Neo4jConcept once, at load time. Each edge type is stored as
+    compressed adjacency arrays in both directions.
+    """
+    def __init__(self, rows: List[dict], edges: List[dict], version: tuple):
+        self.version = version
+        rows = [row for row in rows if row["id"] is not None]
+        self.ids: List[str] = [row["id"] for row in rows]
+        self.index_of: Dict[str, int] = {concept_id: i for i, concept_id in enumerate(self.ids)}
+        self.concepts: List[Neo4jConcept] = [Neo4jConcept.model_validate(row["props"]) for row in rows]
+        self.is_subtopic = np.array([row["is_subtopic"] for row in rows], dtype=bool)
+
+        n = len(self.ids)
+        self._out: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._in: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for edge_type in EDGE_TYPES:
+            pairs = [
+                (self.index_of[e["src"]], self.index_of[e["dst"]]) for e in edges
+                if e["type"] == edge_type and e["src"] in self.index_of and e["dst"] in self.index_of
+            ]
+            src = np.array([p[0] for p in pairs], dtype=np.int64)
+            dst = np.array([p[1] for p in pairs], dtype=np.int64)
+            self._out[edge_type] = _csr(n, src, dst)
+            self._in[edge_type] = _csr(n, dst, src)
+
+        self.prerequisites = PrerequisiteIndex(
+            self.ids, [self.predecessors("PREREQUISITE_FOR", i).tolist() for i in range(n)]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def successors(self, edge_type: str, index: int) -> np.ndarray:
+        offsets, targets = self._out[edge_type]
+        return targets[offsets[index]:offsets[index + 1]]
+
+    def predecessors(self, edge_type: str, index: int) -> np.ndarray:
+        offsets, targets = self._in[edge_type]
+        return targets[offsets[index]:offsets[index + 1]]
+
+    def to_concepts(self, indices, subtopics_only: bool = False) -> List[Neo4jConcept]:
+        """Distinct concepts for the given node indices, in first-seen order."""
+        seen = set()
+        concepts = []
+        for index in indices:
+            index = int(index)
+            if index in seen or (subtopics_only and not self.is_subtopic[index]):
+                continue
+            seen.add(index)
+            concepts.append(self.concepts[index])
+        return concepts
+
+    # --- Same return shapes as Neo4jKnowledgeGraphService ---
+
+    def learning_context(self, index: int) -> dict:
+        return {
+            "current_concept": self.concepts[index],
+            "prerequisites": self.to_concepts(self.predecessors("PREREQUISITE_FOR", index), subtopics_only=True),
+        }
+
+    def recommend_next(self, index: int) -> List[Neo4jConcept]:
+        return self.to_concepts(self.prerequisites.next_positions(index), subtopics_only=True)
+
+    def learning_path(self, index: int) -> List[Neo4jConcept]:
+        """The full prerequisite closure in study order (level, name, id), target last; [] without prerequisites."""
+        level = self.prerequisites.level
+        positions = sorted(
+            self.prerequisites.prerequisite_positions(index),
+            key=lambda p: (level[p], self.concepts[p].name, self.ids[p]),
+        )
+        return self.to_concepts(positions + [index]) if positions else []
+
+    def comprehensive_analysis(self, index: int, limit: Optional[int] = None) -> dict:
+        def first(concepts):
+            return sorted(concepts, key=lambda c: c.name)[:limit] if limit is not None else concepts
+
+        return {
+            "target_concept": self.concepts[index],
+            "prerequisites": first(self.to_concepts(self.predecessors("PREREQUISITE_FOR", index))),
+            "subtopics": first(self.to_concepts(self.successors("HAS_SUBTOPIC", index))),
+            "related_concepts": first(self.to_concepts(self.successors("USED_WITH", index))),
+            "easier_alternatives": first(self.to_concepts(self.predecessors("EASIER_THAN", index))),
+        }
+
+class GraphSnapshotManager:
+    """Holds the current snapshot and swaps in a new one when the graph's version changes."""
+    def __init__(self):
+        self.current: Optional[GraphSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> Optional[GraphSnapshot]:
+        """The snapshot to answer from, or None when disabled or not loaded yet."""
+        return self.current if settings.KG_SNAPSHOT_ENABLED else None
+
+    @property
+    def running(self) -> bool:
+        """Whether the refresh loop keeps `current` up to date."""
+        return self._task is not None
+
+    async def _version(self, session: Neo4jAsyncSession) -> tuple:
+        record = await read_single(session, VERSION_QUERY)
+        return tuple(record.values())
+
+    async def refresh(self, session: Neo4jAsyncSession) -> bool:
+        """Reloads the snapshot if the graph changed since the last load. Returns True on reload."""
+        version = await self._version(session)
+        if self.current is not None and self.current.version == version:
+            return False
+
+        rows = [record.data() for record in await read_records(session, NODES_QUERY)]
+        edges = [record.data() for record in await read_records(session, EDGES_QUERY)]
+        snapshot = GraphSnapshot(rows, edges, version)
+        # Swap atomically; requests already holding the old snapshot finish on it
+        self.current = snapshot
+        concept_resolver.load_names(zip(snapshot.ids, (c.name for c in snapshot.concepts)))
+        print(f"Knowledge graph snapshot loaded: {len(snapshot)} concepts.")
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(settings.KG_SNAPSHOT_REFRESH_SECONDS)
+            try:
+                async with neo4j_driver.read_session() as session:
+                    await self.refresh(session)
+            except Exception as e:
+                # Keep serving the last good snapshot while Neo4j is unavailable
+                print(f"Knowledge graph snapshot refresh failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+graph_snapshot = GraphSnapshotManager()
@@ -1,21 +1,106 @@
+from typing import Optional, Set
+
 from neo4j import AsyncSession as Neo4jAsyncSession
+from app.db.neo4j_driver import read_records, read_single
 from app.schemas.concept import Neo4jConcept
+from app.services.concept_resolver import concept_resolver
+from app.services.graph_snapshot import graph_snapshot
+from app.services.learning_path import PrerequisiteGraph
+from app.services.prerequisite_index import INDEX_FRESHNESS, warn_stale_index
+
+BUNDLE_FIELDS = ("context", "next", "learning_path", "analysis")
+
+# Only the properties Neo4jConcept reads; anything else stored on the nodes
+# (including the prerequisite index arrays) stays in the database
+CONCEPT_PROJECTION = "{" + ", ".join(f".{field}" for field in Neo4jConcept.model_fields) + "}"
+
+ANALYSIS_RELATIONSHIPS = {
+    "prerequisites": "(n)-[:PREREQUISITE_FOR]->(c)",
+    "subtopics": "(c)-[:HAS_SUBTOPIC]->(n)",
+    "related_concepts": "(c)-[:USED_WITH]->(n)",
+    "easier_alternatives": "(n)-[:EASIER_THAN]->(c)",
+}
+
+def analysis_subqueries(limit: Optional[int] = None) -> str:
+    """
+    One CALL subquery per relationship, each collecting its distinct
+    neighbours independently, so a hub node costs the sum of its fan-outs
+    rather than their product.
+    """
+    limit_clause = f" ORDER BY n.name LIMIT {int(limit)}" if limit is not None else ""
+    return "".join(
+        f"""
+    CALL {{ WITH c OPTIONAL MATCH {pattern} WITH DISTINCT n{limit_clause} RETURN collect(n {CONCEPT_PROJECTION}) AS {column} }}"""
+        for column, pattern in ANALYSIS_RELATIONSHIPS.items()
+    ) + "\n    "
+
+# One CALL subquery per collection: each aggregates on its own, so they never
+# multiply into each other, and only the requested views run at all.
+BUNDLE_SUBQUERIES = {
+    "context": """
+    CALL { WITH c OPTIONAL MATCH (p:Subtopic)-[:PREREQUISITE_FOR]->(c) RETURN collect(DISTINCT p) AS context_prerequisites }
+    """,
+    "next": """
+    CALL {
+        WITH c, index_fresh OPTIONAL MATCH (c)-[:PREREQUISITE_FOR]->(n:Subtopic)
+        WHERE NOT index_fresh OR c.next_ids IS NULL OR n.id IN c.next_ids
+        RETURN collect(DISTINCT n) AS next_concepts
+    }
+    """,
+    "learning_path": """
+    CALL {
+        WITH c OPTIONAL MATCH (p:Concept) WHERE p.id IN c.prereq_ids
+        WITH p ORDER BY p.prereq_level, p.name, p.id
+        RETURN collect(p) AS path_prerequisites
+    }
+    """,
+    "analysis": analysis_subqueries(),
+}
+
+def _to_models(nodes) -> list[Neo4jConcept]:
+    return [Neo4jConcept.model_validate(node) for node in nodes]
 
 class Neo4jKnowledgeGraphService:
     def __init__(self, session: Neo4jAsyncSession):
         self.session = session
 
+    async def _resolve_concept_id(self, concept_name: str) -> Optional[str]:
+        """
+        Resolves a concept name to its node id: in process when possible,
+        otherwise through the indexed lookups in Neo4j. Every query below then
+        starts from an index seek on :Concept(id) instead of a full scan.
+        """
+        # With a snapshot loaded the resolver's names are current, so a miss is
+        # final and Neo4j isn't touched at all. Without one they were loaded at
+        # startup and an exact match in the graph has to win over fuzzy ones.
+        if graph_snapshot.active is not None:
+            return concept_resolver.resolve(concept_name)
+        return await concept_resolver.resolve_with_graph(self.session, concept_name)
+
+    async def _resolve_in_snapshot(self, concept_name: str):
+        """Returns (snapshot, node index) when the in-memory snapshot can answer, else (None, None)."""
+        snapshot = graph_snapshot.active
+        if snapshot is None:
+            return None, None
+        concept_id = await self._resolve_concept_id(concept_name)
+        return snapshot, snapshot.index_of.get(concept_id)
+
     # ... (existing get_learning_context and recommend_next_concept methods remain the same)
     async def get_learning_context(self, concept_name: str) -> dict:
+        snapshot, index = await self._resolve_in_snapshot(concept_name)
+        if snapshot is not None:
+            return snapshot.learning_context(index) if index is not None else None
+
+        concept_id = await self._resolve_concept_id(concept_name)
+        if concept_id is None:
+            return None
         query = """
-        MATCH (c)
-        WHERE (c:Topic OR c:Subtopic) AND toLower(c.name) CONTAINS toLower($concept_name)
+        MATCH (c:Concept {id: $concept_id})
         WITH c LIMIT 1
         OPTIONAL MATCH (p:Subtopic)-[:PREREQUISITE_FOR]->(c)
         RETURN c as concept, collect(p) as prerequisites
         """
-        result = await self.session.run(query, concept_name=concept_name)
-        record = await result.single()
+        record = await read_single(self.session, query, concept_id=concept_id)
         if not record or not record["concept"]:
             return None
         concept_node = record["concept"]
@@ -27,111 +112,185 @@ class Neo4jKnowledgeGraphService:
         }
 
     async def recommend_next_concept(self, concept_name: str) -> list[Neo4jConcept]:
+        snapshot, index = await self._resolve_in_snapshot(concept_name)
+        if snapshot is not None:
+            return snapshot.recommend_next(index) if index is not None else []
+
+        concept_id = await self._resolve_concept_id(concept_name)
+        if concept_id is None:
+            return []
         query = """
-        MATCH (c)
-        WHERE (c:Topic OR c:Subtopic) AND toLower(c.name) CONTAINS toLower($concept_name)
+        MATCH (c:Concept {id: $concept_id})
         WITH c LIMIT 1
+        """ + INDEX_FRESHNESS + """
         MATCH (c)-[:PREREQUISITE_FOR]->(next_concept:Subtopic)
-        RETURN next_concept
+        WHERE NOT index_fresh OR c.next_ids IS NULL OR next_concept.id IN c.next_ids
+        RETURN next_concept, c.next_ids IS NOT NULL AND NOT index_fresh AS stale
         """
-        result = await self.session.run(query, concept_name=concept_name)
-        records = await result.data()
+        records = await read_records(self.session, query, concept_id=concept_id)
+        if records and records[0]["stale"]:
+            warn_stale_index()
         recommendations = [Neo4jConcept.model_validate(record['next_concept']) for record in records]
         return recommendations
 
-    async def get_learning_path(self, concept_name: str) -> list[Neo4jConcept]:
-        query = """
-        MATCH (target)
-        WHERE (target:Topic OR target:Subtopic) AND toLower(target.name) CONTAINS toLower($concept_name)
-        WITH target LIMIT 1
-        MATCH p = (start)-[:PREREQUISITE_FOR*1..]->(target)
-        UNWIND nodes(p) as concept
-        RETURN DISTINCT concept
+    async def get_learning_path(
+        self,
+        concept_name: str,
+        max_depth: Optional[int] = None,
+        mastered_ids: Set[str] = frozenset(),
+        strategy: str = "closure",
+    ) -> list[Neo4jConcept]:
         """
-        result = await self.session.run(query, concept_name=concept_name)
-        records = await result.data()
-        learning_path = [Neo4jConcept.model_validate(record['concept']) for record in records]
-        return learning_path
+        The target's prerequisites, each exactly once, in topological order
+        (prerequisites first, target last). `max_depth` bounds how many
+        prerequisite hops are followed. Concepts in `mastered_ids` are left
+        out, along with anything only needed for them. With strategy="shortest",
+        the same concepts are ordered cheapest-first by estimated_hours
+        wherever their prerequisites allow.
+        """
+        # The full closure is precomputed; only bounded, mastery-pruned or
+        # cost-based paths still need a traversal
+        use_index = max_depth is None and not mastered_ids and strategy == "closure"
+        snapshot, index = await self._resolve_in_snapshot(concept_name)
+        if snapshot is not None:
+            if index is None:
+                return []
+            if use_index:
+                return snapshot.learning_path(index)
+            graph = PrerequisiteGraph.from_snapshot(snapshot, index, max_depth, mastered_ids)
+        else:
+            concept_id = await self._resolve_concept_id(concept_name)
+            if concept_id is None:
+                return []
+            if use_index:
+                path = await self._indexed_learning_path(concept_id)
+                if path is not None:
+                    return path
+            graph = await PrerequisiteGraph.from_neo4j(self.session, concept_id, max_depth, mastered_ids)
+            if graph is None:
+                return []
 
-    # ------------------ NEW METHOD ------------------
+        # A concept without prerequisites has no learning path
+        if len(graph.concepts) == 1:
+            return []
+        if strategy == "shortest":
+            return graph.shortest_study_plan()
+        return graph.topological_order()
 
-    async def get_comprehensive_analysis(self, concept_name: str) -> dict:
+    async def _indexed_learning_path(self, concept_id: str) -> Optional[list[Neo4jConcept]]:
         """
-        Performs a full analysis of a concept, fetching data from multiple relationships.
+        Reads the closure stored by `python -m app.services.prerequisite_index`.
+        Returns None when it hasn't been built for this concept yet.
         """
         query = """
-        MATCH (c)
-        WHERE (c:Topic OR c:Subtopic) AND toLower(c.name) CONTAINS toLower($concept_name)
+        MATCH (c:Concept {id: $concept_id})
         WITH c LIMIT 1
-        OPTIONAL MATCH (p)-[:PREREQUISITE_FOR]->(c)
-        OPTIONAL MATCH (c)-[:HAS_SUBTOPIC]->(sub)
-        OPTIONAL MATCH (c)-[:USED_WITH]->(related)
-        OPTIONAL MATCH (easier)-[:EASIER_THAN]->(c)
-        
-        RETURN c as concept,
-               collect(DISTINCT p) as prerequisites,
-               collect(DISTINCT sub) as subtopics,
-               collect(DISTINCT related) as related_concepts,
-               collect(DISTINCT easier) as easier_alternatives
+        """ + INDEX_FRESHNESS + """
+        OPTIONAL MATCH (p:Concept) WHERE p.id IN c.prereq_ids
+        WITH c, index_fresh, p ORDER BY p.prereq_level, p.name, p.id
+        RETURN c AS target, c.prereq_ids IS NOT NULL AS indexed, index_fresh, collect(p) AS prerequisites
         """
-        result = await self.session.run(query, concept_name=concept_name)
-        record = await result.single()
+        record = await read_single(self.session, query, concept_id=concept_id)
+        if not record or not record["indexed"]:
+            return None
+        if not record["index_fresh"]:
+            warn_stale_index()
+            return None
+        if not record["prerequisites"]:
+            return []
+        nodes = record["prerequisites"] + [record["target"]]
+        return [Neo4jConcept.model_validate(node) for node in nodes]
 
-        if not record or not record["concept"]:
+    async def get_concept_bundle(self, concept_name: str, fields=BUNDLE_FIELDS) -> Optional[dict]:
+        """
+        The context, next, learning-path and analysis views of one concept,
+        restricted to `fields`, from a single name resolution: one snapshot
+        lookup, or one Cypher query in this session. Only when the learning
+        path's closure hasn't been precomputed does a traversal follow.
+        Returns None when the concept doesn't exist.
+        """
+        snapshot, index = await self._resolve_in_snapshot(concept_name)
+        if snapshot is not None:
+            if index is None:
+                return None
+            views = {
+                "context": lambda: snapshot.learning_context(index),
+                "next": lambda: snapshot.recommend_next(index),
+                "learning_path": lambda: snapshot.learning_path(index),
+                "analysis": lambda: snapshot.comprehensive_analysis(index),
+            }
+            return {field: views[field]() for field in fields}
+
+        concept_id = await self._resolve_concept_id(concept_name)
+        if concept_id is None:
+            return None
+        query = (
+            "MATCH (c:Concept {id: $concept_id}) WITH c LIMIT 1"
+            + INDEX_FRESHNESS
+            + "".join(BUNDLE_SUBQUERIES[field] for field in fields)
+            + "RETURN *, c.prereq_ids IS NOT NULL AND index_fresh AS path_indexed, "
+            + "c.prereq_ids IS NOT NULL AND NOT index_fresh AS index_stale"
+        )
+        record = await read_single(self.session, query, concept_id=concept_id)
+        if not record:
             return None
 
-        def to_model_list(nodes):
-            # FIXED: Add deduplication based on the unique 'id' property of the nodes
-            seen_ids = set()
-            unique_nodes = []
-            for node in nodes:
-                node_id = node.get("id")
-                if node_id not in seen_ids:
-                    unique_nodes.append(Neo4jConcept.model_validate(node))
-                    seen_ids.add(node_id)
-            return unique_nodes
+        if record["index_stale"]:
+            warn_stale_index()
+        concept = Neo4jConcept.model_validate(record["c"])
+        bundle = {}
+        if "context" in fields:
+            bundle["context"] = {
+                "current_concept": concept,
+                "prerequisites": _to_models(record["context_prerequisites"]),
+            }
+        if "next" in fields:
+            bundle["next"] = _to_models(record["next_concepts"])
+        if "learning_path" in fields:
+            if record["path_indexed"]:
+                prerequisites = _to_models(record["path_prerequisites"])
+                bundle["learning_path"] = prerequisites + [concept] if prerequisites else []
+            else:
+                graph = await PrerequisiteGraph.from_neo4j(self.session, concept_id)
+                bundle["learning_path"] = graph.topological_order() if graph and len(graph.concepts) > 1 else []
+        if "analysis" in fields:
+            bundle["analysis"] = {
+                "target_concept": concept,
+                "prerequisites": _to_models(record["prerequisites"]),
+                "subtopics": _to_models(record["subtopics"]),
+                "related_concepts": _to_models(record["related_concepts"]),
+                "easier_alternatives": _to_models(record["easier_alternatives"]),
+            }
+        return bundle
 
-        return {
-            "target_concept": Neo4jConcept.model_validate(record["concept"]),
-            "prerequisites": to_model_list(record["prerequisites"]),
-            "subtopics": to_model_list(record["subtopics"]),
-            "related_concepts": to_model_list(record["related_concepts"]),
-            "easier_alternatives": to_model_list(record["easier_alternatives"]),
-        }
+    # ------------------ NEW METHOD ------------------
+
+    async def get_comprehensive_analysis(self, concept_name: str, limit: Optional[int] = None) -> dict:
         """
         Performs a full analysis of a concept, fetching data from multiple relationships.
+        `limit` caps how many concepts are returned per relationship.
         """
-        # This single, efficient query uses OPTIONAL MATCH for each relationship type.
-        query = """
-        MATCH (c)
-        WHERE (c:Topic OR c:Subtopic) AND toLower(c.name) CONTAINS toLower($concept_name)
-        WITH c LIMIT 1
-        // Gather all related nodes into collections
-        OPTIONAL MATCH (p)-[:PREREQUISITE_FOR]->(c)
-        OPTIONAL MATCH (c)-[:HAS_SUBTOPIC]->(sub)
-        OPTIONAL MATCH (c)-[:USED_WITH]->(related)
-        OPTIONAL MATCH (easier)-[:EASIER_THAN]->(c)
-        
-        RETURN c as concept,
-               collect(DISTINCT p) as prerequisites,
-               collect(DISTINCT sub) as subtopics,
-               collect(DISTINCT related) as related_concepts,
-               collect(DISTINCT easier) as easier_alternatives
-        """
-        result = await self.session.run(query, concept_name=concept_name)
-        record = await result.single()
+        snapshot, index = await self._resolve_in_snapshot(concept_name)
+        if snapshot is not None:
+            return snapshot.comprehensive_analysis(index, limit) if index is not None else None
 
-        if not record or not record["concept"]:
+        concept_id = await self._resolve_concept_id(concept_name)
+        if concept_id is None:
             return None
+        query = (
+            "MATCH (c:Concept {id: $concept_id}) WITH c LIMIT 1"
+            + analysis_subqueries(limit)
+            + f"RETURN c {CONCEPT_PROJECTION} AS concept, prerequisites, subtopics, related_concepts, easier_alternatives"
+        )
+        record = await read_single(self.session, query, concept_id=concept_id)
 
-        # Helper to convert a list of nodes to a list of Pydantic models
-        def to_model_list(nodes):
-            return [Neo4jConcept.model_validate(node) for node in nodes]
+        if not record or not record["concept"]:
+            return None
 
         return {
             "target_concept": Neo4jConcept.model_validate(record["concept"]),
-            "prerequisites": to_model_list(record["prerequisites"]),
-            "subtopics": to_model_list(record["subtopics"]),
-            "related_concepts": to_model_list(record["related_concepts"]),
-            "easier_alternatives": to_model_list(record["easier_alternatives"]),
-        }
\ No newline at end of file
+            "prerequisites": _to_models(record["prerequisites"]),
+            "subtopics": _to_models(record["subtopics"]),
+            "related_concepts": _to_models(record["related_concepts"]),
+            "easier_alternatives": _to_models(record["easier_alternatives"]),
+        }
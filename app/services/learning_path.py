@@ -0,0 +1,140 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Set
+
+from neo4j import AsyncSession as Neo4jAsyncSession
+
+from app.db.neo4j_driver import read_records, read_single
+from app.schemas.concept import Neo4jConcept
+
+# One query per depth level: every concept is fetched once, however many
+# prerequisite paths lead to it.
+PARENTS_QUERY = """
+MATCH (parent)-[:PREREQUISITE_FOR]->(child:Concept)
+WHERE child.id IN $frontier
+RETURN child.id AS child, parent
+"""
+TARGET_QUERY = "MATCH (c:Concept {id: $concept_id}) RETURN c LIMIT 1"
+
+class PrerequisiteGraph:
+    """
+    The prerequisite closure of one target concept: every concept reachable
+    backwards over PREREQUISITE_FOR, each visited exactly once, with its
+    direct prerequisites and its depth (hops from the target).
+
+    Mastered concepts are left out, and so are prerequisites that are only
+    needed for them.
+    """
+    def __init__(self, target: Neo4jConcept):
+        self.target_id = target.id
+        self.concepts: Dict[str, Neo4jConcept] = {target.id: target}
+        self.parents: Dict[str, List[str]] = {target.id: []}
+        self.depth: Dict[str, int] = {target.id: 0}
+
+    def _expand(self, frontier: Iterable[str], parent_rows, depth: int, mastered: Set[str]) -> List[str]:
+        """Adds one BFS level from (child id, parent concept) rows; returns the next frontier."""
+        next_frontier = []
+        for child_id, parent in parent_rows:
+            if parent.id in mastered:
+                continue
+            self.parents[child_id].append(parent.id)
+            if parent.id not in self.depth:
+                self.depth[parent.id] = depth
+                self.concepts[parent.id] = parent
+                self.parents[parent.id] = []
+                next_frontier.append(parent.id)
+        return next_frontier
+
+    @classmethod
+    def from_snapshot(cls, snapshot, index: int, max_depth: Optional[int] = None, mastered: Set[str] = frozenset()):
+        graph = cls(snapshot.concepts[index])
+        frontier, depth = [graph.target_id], 1
+        while frontier and (max_depth is None or depth <= max_depth):
+            rows = [
+                (child_id, snapshot.concepts[parent])
+                for child_id in frontier
+                for parent in snapshot.predecessors("PREREQUISITE_FOR", snapshot.index_of[child_id]).tolist()
+            ]
+            frontier = graph._expand(frontier, rows, depth, mastered)
+            depth += 1
+        return graph
+
+    @classmethod
+    async def from_neo4j(cls, session: Neo4jAsyncSession, concept_id: str, max_depth: Optional[int] = None, mastered: Set[str] = frozenset()):
+        record = await read_single(session, TARGET_QUERY, concept_id=concept_id)
+        if not record:
+            return None
+        graph = cls(Neo4jConcept.model_validate(record["c"]))
+        frontier, depth = [graph.target_id], 1
+        while frontier and (max_depth is None or depth <= max_depth):
+            records = await read_records(session, PARENTS_QUERY, frontier=frontier)
+            rows = [(r["child"], Neo4jConcept.model_validate(r["parent"])) for r in records]
+            frontier = graph._expand(frontier, rows, depth, mastered)
+            depth += 1
+        return graph
+
+    def topological_order(self) -> List[Neo4jConcept]:
+        """
+        Study order, ending with the target: concepts sorted by level (the
+        longest prerequisite chain below them within this graph), then name,
+        then id. Every concept comes after all of its prerequisites. The
+        snapshot and the stored index use the same rule, so the order
+        doesn't depend on which one answered.
+        """
+        children: Dict[str, List[str]] = {concept_id: [] for concept_id in self.concepts}
+        pending = {concept_id: len(set(parents)) for concept_id, parents in self.parents.items()}
+        for child_id, parents in self.parents.items():
+            for parent_id in set(parents):
+                children[parent_id].append(child_id)
+
+        # Kahn's algorithm, assigning levels on the way
+        level = {c: 0 for c, count in pending.items() if count == 0}
+        queue = list(level)
+        while queue:
+            concept_id = queue.pop()
+            for child_id in children[concept_id]:
+                level[child_id] = max(level.get(child_id, 0), level[concept_id] + 1)
+                pending[child_id] -= 1
+                if pending[child_id] == 0:
+                    queue.append(child_id)
+        # A prerequisite cycle leaves nodes pending; they can't be ordered, so they are dropped
+        ordered = sorted(
+            (c for c, count in pending.items() if count == 0),
+            key=lambda c: (level[c], self.concepts[c].name, c),
+        )
+        return [self.concepts[c] for c in ordered]
+
+    def shortest_study_plan(self, default_hours: float = 1.0) -> List[Neo4jConcept]:
+        """
+        Every concept in the closure, ending with the target, ordered to get
+        through the cheap material first: of the concepts whose prerequisites
+        are all planned, the one with the fewest estimated_hours comes next
+        (then name, then id). All prerequisites are required, so the total
+        is the same as for topological_order; only the order differs.
+        """
+        def hours(concept_id: str) -> float:
+            value = self.concepts[concept_id].estimated_hours
+            return float(value) if value is not None else default_hours
+
+        children: Dict[str, List[str]] = {concept_id: [] for concept_id in self.concepts}
+        pending = {concept_id: len(set(parents)) for concept_id, parents in self.parents.items()}
+        for child_id, parents in self.parents.items():
+            for parent_id in set(parents):
+                children[parent_id].append(child_id)
+
+        def entry(concept_id: str):
+            return (hours(concept_id), self.concepts[concept_id].name, concept_id)
+
+        # Kahn's algorithm with the ready set kept as a heap; the target is
+        # only ready once everything else is planned, so it comes last
+        ready = [entry(c) for c, count in pending.items() if count == 0]
+        heapq.heapify(ready)
+        plan = []
+        while ready:
+            concept_id = heapq.heappop(ready)[2]
+            plan.append(self.concepts[concept_id])
+            for child_id in children[concept_id]:
+                pending[child_id] -= 1
+                if pending[child_id] == 0:
+                    heapq.heappush(ready, entry(child_id))
+        # As in topological_order, concepts on a prerequisite cycle are dropped
+        return plan
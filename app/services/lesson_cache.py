@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Dict
+
+from app.core.config import settings
+from app.core.cache import LRUTTLCache, SQLiteCacheStore, TieredCache
+from app.models.cognitive_profile import CognitiveProfile
+from app.services.gpt_client import (
+    GENERATION_ERROR_MESSAGE, LESSON_MODEL, LESSON_TEMPERATURE, request_instruction, stream_instruction,
+)
+
+# The profile fields build_llm_prompt reads; nothing else about the student affects the lesson.
+PROMPT_PROFILE_FIELDS = ("instruction_flow", "input_preference", "engagement_style", "complexity_tolerance")
+
+def _neighborhood_digest(analysis: dict) -> str:
+    """
+    Fingerprint of everything in the concept analysis the prompt depends on.
+    When the concept's graph neighborhood changes, the key changes with it.
+    """
+    target = analysis["target_concept"]
+    parts = [target.name, str(target.type), str(target.complexity), ",".join(target.practical_applications or [])]
+    for relation in ("prerequisites", "subtopics", "related_concepts", "easier_alternatives"):
+        parts.append(",".join(sorted(f"{c.id}:{c.name}" for c in analysis[relation])))
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+class LessonCache:
+    """
+    Caches generated lessons with a TTL, LRU eviction and stale-while-revalidate:
+    for LESSON_CACHE_STALE_TTL after expiry, the old lesson is still served while
+    one background task generates its replacement.
+    """
+    def __init__(self):
+        # Entries are kept for TTL + stale window; freshness is checked against created_at.
+        lifetime = settings.LESSON_CACHE_TTL + settings.LESSON_CACHE_STALE_TTL
+        shared = None
+        if settings.LESSON_CACHE_PATH and settings.LESSON_CACHE_SIZE > 0:
+            shared = SQLiteCacheStore(settings.LESSON_CACHE_PATH, ttl_seconds=lifetime, max_rows=settings.LESSON_CACHE_SIZE * 4)
+        self.cache = TieredCache(LRUTTLCache(settings.LESSON_CACHE_SIZE, lifetime), shared)
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.stale_served = 0
+
+    def key_for(self, analysis: dict, profile: CognitiveProfile) -> str:
+        """
+        Invalidation is by key: any change to the concept or its neighborhood
+        that the prompt reads changes the digest, on every worker alike.
+        """
+        concept_id = analysis["target_concept"].id
+        profile_part = ",".join(getattr(profile, field).value for field in PROMPT_PROFILE_FIELDS)
+        return (
+            f"lesson:{concept_id}:{_neighborhood_digest(analysis)}:"
+            f"{profile_part}:{LESSON_MODEL}:{LESSON_TEMPERATURE}"
+        )
+
+    def _lookup(self, key: str):
+        """Returns (lesson, is_fresh), or (None, False) on a miss."""
+        if settings.LESSON_CACHE_SIZE <= 0:
+            return None, False
+        entry = self.cache.get(key)
+        if entry is None:
+            return None, False
+        return entry["instruction"], time.time() - entry["created_at"] < settings.LESSON_CACHE_TTL
+
+    def _store(self, key: str, instruction: str) -> None:
+        if settings.LESSON_CACHE_SIZE <= 0:
+            return
+        self.cache.set(key, {"instruction": instruction, "created_at": time.time()})
+
+    def _revalidate(self, key: str, prompt: str) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self._store(key, await request_instruction(prompt))
+            except Exception as e:
+                print(f"Background lesson refresh failed: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    async def get_or_generate(self, analysis: dict, profile: CognitiveProfile, prompt: str) -> str:
+        key = self.key_for(analysis, profile)
+        instruction, fresh = self._lookup(key)
+        if instruction is not None:
+            if not fresh:
+                self.stale_served += 1
+                self._revalidate(key, prompt)
+            return instruction
+
+        try:
+            instruction = await request_instruction(prompt)
+        except Exception as e:
+            print(f"An error occurred while communicating with Groq API: {e}")
+            return GENERATION_ERROR_MESSAGE
+        self._store(key, instruction)
+        return instruction
+
+    async def stream(self, analysis: dict, profile: CognitiveProfile, prompt: str) -> AsyncIterator[str]:
+        """
+        Streaming variant: a cached lesson is sent as a single chunk; otherwise
+        tokens are forwarded as they arrive and the lesson is cached once complete.
+        """
+        key = self.key_for(analysis, profile)
+        instruction, fresh = self._lookup(key)
+        if instruction is not None:
+            if not fresh:
+                self.stale_served += 1
+                self._revalidate(key, prompt)
+            yield instruction
+            return
+
+        chunks = []
+        tokens = stream_instruction(prompt)
+        try:
+            async for token in tokens:
+                chunks.append(token)
+                yield token
+        finally:
+            await tokens.aclose()
+        # Only reached when the upstream ran to its end: a disconnect stops at the
+        # yield, and upstream errors or cancellation are re-raised by the shared stream.
+        # Either way a partial lesson is never cached.
+        self._store(key, "".join(chunks))
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "stale_served": self.stale_served,
+            "refreshing": len(self._refreshing),
+        }
+
+lesson_cache = LessonCache()
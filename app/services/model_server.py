@@ -0,0 +1,201 @@
+"""
+Shared model server for the cognitive classifier.
+
+One process owns the zero-shot model; every API worker on the box sends it
+prompts over a Unix socket instead of loading its own copy. Prompts from all
+workers are micro-batched into single forward passes.
+
+Start it before the API workers:
+    python -m app.services.model_server
+"""
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.core.config import settings
+
+# Every message is a 4-byte big-endian length followed by a UTF-8 JSON body.
+_HEADER = struct.Struct(">I")
+
+DEFAULT_SOCKET_PATH = "/tmp/adaptive-tutor-model.sock"
+
+def _encode(payload: dict) -> bytes:
+    body = json.dumps(payload).encode()
+    return _HEADER.pack(len(body)) + body
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionResetError("Model server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+class ModelServerUnavailable(RuntimeError):
+    pass
+
+class ModelServerClient:
+    """
+    Client side of the model server. Exposes the same classify/classify_batch
+    calls as ZeroShotClassifier, so the analyzer works with either. Each
+    calling thread keeps its own connection open between requests.
+    """
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                sock.close()
+                # The server only binds its socket once the model is loaded,
+                # so keep retrying for a while right after boot.
+                if time.monotonic() >= deadline:
+                    raise ModelServerUnavailable(f"Model server at {self.socket_path} is not reachable: {e}") from e
+                time.sleep(0.2)
+
+    def _request(self, payload: dict) -> dict:
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                sock.sendall(_encode(payload))
+                (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+                return json.loads(_recv_exact(sock, size))
+            except socket.timeout as e:
+                sock.close()
+                self._local.sock = None
+                raise ModelServerUnavailable("Model server timed out") from e
+            except ConnectionError as e:
+                # A kept-alive connection may have gone stale; reconnect once.
+                sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise ModelServerUnavailable(f"Lost connection to the model server: {e}") from e
+
+    def classify_batch(self, prompts: List[str]) -> List[dict]:
+        response = self._request({"prompts": prompts})
+        if "error" in response:
+            raise RuntimeError(f"Model server failed to classify: {response['error']}")
+        return [
+            {dim: tuple(value) for dim, value in result.items()}
+            for result in response["results"]
+        ]
+
+    def classify(self, prompt: str) -> dict:
+        return self.classify_batch([prompt])[0]
+
+class ModelServer:
+    """
+    Collects prompts from every connected worker and runs them through the
+    classifier in micro-batches: a batch closes when it reaches
+    `max_batch_size` prompts or `max_wait_ms` after its first prompt arrived.
+    """
+    def __init__(self, classifier, max_batch_size: int, max_wait_ms: int):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # The model runs on one dedicated thread so the loop keeps accepting prompts meanwhile.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-server")
+        self.batches = 0
+        self.prompts = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                request = json.loads(await reader.readexactly(size))
+                futures = []
+                for prompt in request["prompts"]:
+                    future = loop.create_future()
+                    self._queue.put_nowait((prompt, future))
+                    futures.append(future)
+                try:
+                    response = {"results": await asyncio.gather(*futures)}
+                except Exception as e:
+                    response = {"error": str(e)}
+                writer.write(_encode(response))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _next_batch(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            prompts = [prompt for prompt, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.classifier.classify_batch, prompts)
+            except Exception as e:
+                print(f"Model server batch of {len(prompts)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.prompts += len(prompts)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+async def serve(socket_path: str, max_batch_size: int, max_wait_ms: int):
+    from app.services.zero_shot_classifier import ZeroShotClassifier
+
+    print("Loading the zero-shot model for the shared model server...")
+    # Batches run one at a time, so a single inference "worker" gets all the cores.
+    server = ModelServer(ZeroShotClassifier(workers=1), max_batch_size, max_wait_ms)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    unix_server = await asyncio.start_unix_server(server.handle_client, path=socket_path)
+    batcher = asyncio.create_task(server.batch_loop())
+    print(f"Model server listening on {socket_path} (max batch {max_batch_size}, max wait {max_wait_ms} ms).")
+    try:
+        async with unix_server:
+            await unix_server.serve_forever()
+    finally:
+        batcher.cancel()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+if __name__ == "__main__":
+    asyncio.run(serve(
+        settings.ML_MODEL_SERVER_SOCKET or DEFAULT_SOCKET_PATH,
+        max_batch_size=settings.ML_MODEL_SERVER_MAX_BATCH,
+        max_wait_ms=settings.ML_MODEL_SERVER_MAX_WAIT_MS,
+    ))
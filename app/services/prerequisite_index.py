@@ -0,0 +1,281 @@
+"""
+Precomputed prerequisite closure and transitive reduction for every concept.
+
+For each concept we keep its full transitive prerequisite set, its level
+(length of the longest prerequisite chain below it, so level order is a valid
+study order) and its direct successors with shortcut edges removed (B is not
+"next" after A when A -> X -> B also exists). In memory, sets are Python int
+bitsets over node positions. In Neo4j they are stored on each concept as the
+sorted id arrays `prereq_ids` and `next_ids` plus `prereq_level`.
+
+Full rebuild, or apply one edge change and rewrite only the affected nodes:
+    python -m app.services.prerequisite_index
+    python -m app.services.prerequisite_index --add-edge <prereq id> <concept id>
+    python -m app.services.prerequisite_index --remove-edge <prereq id> <concept id>
+
+Readers trust the stored arrays only while GraphMeta.prereq_version matches
+the version they were built from (see INDEX_FRESHNESS), so anything else
+that writes PREREQUISITE_FOR edges has to bump it.
+"""
+import argparse
+import asyncio
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+from neo4j import AsyncSession as Neo4jAsyncSession
+
+from app.db.neo4j_driver import read_records, read_single, write_records
+
+STRUCTURE_NODES_QUERY = "MATCH (c:Concept) RETURN c.id AS id"
+STRUCTURE_EDGES_QUERY = "MATCH (a:Concept)-[:PREREQUISITE_FOR]->(b:Concept) RETURN a.id AS src, b.id AS dst"
+WRITE_QUERY = """
+UNWIND $rows AS row
+MATCH (c:Concept {id: row.id})
+SET c.prereq_ids = row.prereq_ids, c.next_ids = row.next_ids, c.prereq_level = row.level
+"""
+# Every PREREQUISITE_FOR write must bump GraphMeta.prereq_version in the same
+# statement, as apply_edge_change does; so must edits made outside this CLI.
+ADD_EDGE_QUERY = "MATCH (a:Concept {id: $src}), (b:Concept {id: $dst}) MERGE (a)-[:PREREQUISITE_FOR]->(b)"
+REMOVE_EDGE_QUERY = "MATCH (:Concept {id: $src})-[r:PREREQUISITE_FOR]->(:Concept {id: $dst}) DELETE r"
+EDGE_VERSION_BUMP = """
+WITH count(*) AS written
+MERGE (m:GraphMeta)
+SET m.prereq_version = coalesce(m.prereq_version, 0) + 1
+"""
+PREREQ_VERSION_QUERY = "OPTIONAL MATCH (m:GraphMeta) RETURN max(coalesce(m.prereq_version, 0)) AS prereq_version"
+# Lets the in-process graph snapshots notice the change on their next check, and
+# stamps the edge version and count the index was built from (see INDEX_FRESHNESS)
+BUMP_VERSION_QUERY = """
+MATCH ()-[r:PREREQUISITE_FOR]->()
+WITH count(r) AS edges
+MERGE (m:GraphMeta)
+SET m.version = coalesce(m.version, 0) + 1, m.prereq_edges = edges, m.indexed_prereq_version = $prereq_version
+"""
+# Cypher fragment defining `index_fresh`: the stored arrays are trusted only
+# while GraphMeta.prereq_version still equals the version they were built
+# from, so any edge write that bumps it (adding one edge and removing another
+# included) makes them stale. The PREREQUISITE_FOR count (from the count
+# store, so constant time) must match too, which also catches writers that
+# change the number of edges without bumping the version. Stale readers fall
+# back to traversing the edges.
+INDEX_FRESHNESS = """
+    CALL { MATCH ()-[r:PREREQUISITE_FOR]->() RETURN count(r) AS prereq_edges }
+    CALL {
+        OPTIONAL MATCH (m:GraphMeta)
+        RETURN max(m.prereq_edges) AS indexed_edges, max(coalesce(m.prereq_version, 0)) AS prereq_version,
+               max(m.indexed_prereq_version) AS indexed_prereq_version
+    }
+    WITH *, coalesce(indexed_edges = prereq_edges AND indexed_prereq_version = prereq_version, false) AS index_fresh
+"""
+_stale_warned = False
+
+def warn_stale_index() -> None:
+    """Logs, once per process, that the stored index no longer matches the graph."""
+    global _stale_warned
+    if not _stale_warned:
+        _stale_warned = True
+        print(
+            "Prerequisite index is out of date with the PREREQUISITE_FOR edges; serving from "
+            "traversals until `python -m app.services.prerequisite_index` is re-run."
+        )
+
+class PrerequisiteIndex:
+    def __init__(self, ids: List[str], parents: List[Iterable[int]]):
+        self.ids = list(ids)
+        self.position: Dict[str, int] = {concept_id: i for i, concept_id in enumerate(self.ids)}
+        self.parents: List[Set[int]] = [set(p) for p in parents]
+        self.children: List[Set[int]] = [set() for _ in self.ids]
+        for child, node_parents in enumerate(self.parents):
+            for parent in node_parents:
+                self.children[parent].add(child)
+        self.closure: List[int] = [0] * len(self.ids)
+        self.level: List[int] = [0] * len(self.ids)
+        self._recompute(range(len(self.ids)))
+
+    @classmethod
+    def from_edges(cls, ids: List[str], edges: Iterable[tuple]) -> "PrerequisiteIndex":
+        position = {concept_id: i for i, concept_id in enumerate(ids)}
+        parents = [set() for _ in ids]
+        for src, dst in edges:
+            if src in position and dst in position:
+                parents[position[dst]].add(position[src])
+        return cls(ids, parents)
+
+    def _recompute(self, nodes: Iterable[int]) -> List[int]:
+        """
+        Recomputes closure and level for `nodes` in topological order (Kahn's
+        algorithm over just that subset) and returns the nodes whose values
+        changed. Nodes on a prerequisite cycle keep the union of what could
+        be resolved.
+        """
+        nodes = set(nodes)
+        pending = {n: len(self.parents[n] & nodes) for n in nodes}
+        queue = deque(n for n, count in pending.items() if count == 0)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for child in self.children[node]:
+                if child in pending:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        queue.append(child)
+        order.extend(n for n, count in pending.items() if count > 0)
+
+        changed = []
+        for node in order:
+            closure = 0
+            level = 0
+            for parent in self.parents[node]:
+                closure |= self.closure[parent] | (1 << parent)
+                level = max(level, self.level[parent] + 1)
+            if closure != self.closure[node] or level != self.level[node]:
+                self.closure[node] = closure
+                self.level[node] = level
+                changed.append(node)
+        return changed
+
+    def _descendants(self, node: int) -> Set[int]:
+        seen = {node}
+        queue = deque([node])
+        while queue:
+            for child in self.children[queue.popleft()]:
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        return seen
+
+    def _affected(self, src: int, dst: int) -> List[str]:
+        """
+        Recomputes the subgraph an edge change can reach: closures of dst and
+        its dependents, and the reduced successors of their direct
+        prerequisites (src included). Returns the ids that need rewriting.
+        """
+        descendants = self._descendants(dst)
+        self._recompute(descendants)
+        affected = set(descendants)
+        affected.add(src)
+        for node in descendants:
+            affected.update(self.parents[node])
+        return [self.ids[n] for n in sorted(affected)]
+
+    def _positions(self, *concept_ids: str) -> List[int]:
+        unknown = [c for c in concept_ids if c not in self.position]
+        if unknown:
+            raise ValueError(f"Unknown concept id(s): {', '.join(unknown)}")
+        return [self.position[c] for c in concept_ids]
+
+    def add_edge(self, src_id: str, dst_id: str) -> List[str]:
+        """Adds src PREREQUISITE_FOR dst; returns the ids whose stored values need rewriting."""
+        src, dst = self._positions(src_id, dst_id)
+        self.parents[dst].add(src)
+        self.children[src].add(dst)
+        return self._affected(src, dst)
+
+    def remove_edge(self, src_id: str, dst_id: str) -> List[str]:
+        src, dst = self._positions(src_id, dst_id)
+        self.parents[dst].discard(src)
+        self.children[src].discard(dst)
+        return self._affected(src, dst)
+
+    def next_positions(self, node: int) -> List[int]:
+        """Direct successors, minus those also reachable through another of their prerequisites."""
+        bit = 1 << node
+        return sorted(
+            child for child in self.children[node]
+            if not any(self.closure[other] & bit for other in self.parents[child] if other != node)
+        )
+
+    def prerequisite_positions(self, node: int) -> List[int]:
+        """Positions of every transitive prerequisite, ordered by level (a valid study order), then position."""
+        bits = self.closure[node]
+        positions = []
+        while bits:
+            low = bits & -bits
+            positions.append(low.bit_length() - 1)
+            bits ^= low
+        return sorted(positions, key=lambda p: (self.level[p], p))
+
+    def prerequisite_ids(self, concept_id: str) -> List[str]:
+        return sorted(self.ids[p] for p in self.prerequisite_positions(self.position[concept_id]))
+
+    def rows(self, concept_ids: Iterable[str]) -> List[dict]:
+        return [
+            {
+                "id": c,
+                "prereq_ids": self.prerequisite_ids(c),
+                "next_ids": sorted(self.ids[n] for n in self.next_positions(self.position[c])),
+                "level": self.level[self.position[c]],
+            }
+            for c in concept_ids
+        ]
+
+async def load_index(session: Neo4jAsyncSession) -> PrerequisiteIndex:
+    ids = [r["id"] for r in await read_records(session, STRUCTURE_NODES_QUERY) if r["id"] is not None]
+    edges = [(r["src"], r["dst"]) for r in await read_records(session, STRUCTURE_EDGES_QUERY)]
+    return PrerequisiteIndex.from_edges(ids, edges)
+
+async def read_prereq_version(session: Neo4jAsyncSession) -> int:
+    record = await read_single(session, PREREQ_VERSION_QUERY)
+    return record["prereq_version"]
+
+async def write_rows(session: Neo4jAsyncSession, rows: List[dict], prereq_version: int, batch_size: int = 1000) -> None:
+    """Writes the rows, then stamps `prereq_version` as the edge version they reflect."""
+    for offset in range(0, len(rows), batch_size):
+        await write_records(session, WRITE_QUERY, rows=rows[offset:offset + batch_size])
+    await write_records(session, BUMP_VERSION_QUERY, prereq_version=prereq_version)
+
+async def rebuild(session: Neo4jAsyncSession) -> int:
+    # Read before the edges: a write landing in between leaves the index stale, not wrongly fresh
+    prereq_version = await read_prereq_version(session)
+    index = await load_index(session)
+    await write_rows(session, index.rows(index.ids), prereq_version)
+    return len(index.ids)
+
+async def apply_edge_change(session: Neo4jAsyncSession, src_id: str, dst_id: str, add: bool) -> List[str]:
+    """
+    Creates or deletes one PREREQUISITE_FOR edge and rewrites the stored
+    values only for the concepts it affects: the edge's target, its
+    dependents, and their direct prerequisites.
+
+    The writes are incremental, but the reads are not: `load_index` fetches
+    every concept and edge, so each call is O(graph) in reads. Batch many
+    edits into one `rebuild` instead. Raises ValueError, before writing
+    anything, if either id is not a concept.
+    """
+    prereq_version = await read_prereq_version(session)
+    index = await load_index(session)
+    if add:
+        query = ADD_EDGE_QUERY
+        changed = index.add_edge(src_id, dst_id)
+    else:
+        query = REMOVE_EDGE_QUERY
+        changed = index.remove_edge(src_id, dst_id)
+    await write_records(session, query + EDGE_VERSION_BUMP, src=src_id, dst=dst_id)
+    # The bump above is the only one expected; any concurrent edge write leaves the index stale
+    await write_rows(session, index.rows(changed), prereq_version + 1)
+    return changed
+
+async def main(args):
+    from app.db.neo4j_driver import neo4j_driver
+
+    async with neo4j_driver.write_session() as session:
+        if args.add_edge or args.remove_edge:
+            src, dst = args.add_edge or args.remove_edge
+            try:
+                changed = await apply_edge_change(session, src, dst, add=bool(args.add_edge))
+            except ValueError as e:
+                print(f"Prerequisite index not updated: {e}")
+            else:
+                print(f"Prerequisite index updated for {len(changed)} concept(s).")
+        else:
+            count = await rebuild(session)
+            print(f"Prerequisite index rebuilt for {count} concept(s).")
+    await neo4j_driver.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--add-edge", nargs=2, metavar=("PREREQ_ID", "CONCEPT_ID"))
+    group.add_argument("--remove-edge", nargs=2, metavar=("PREREQ_ID", "CONCEPT_ID"))
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.crud.crud_user import user as crud_user
+from app.models.cognitive_profile import CognitiveProfile
+from app.models.user import User
+from app.schemas.token import TokenPayload
+from app.services.write_behind import write_behind
+
+def _column_values(instance) -> Dict[str, Any]:
+    values = {}
+    for attr in inspect(instance).mapper.column_attrs:
+        value = getattr(instance, attr.key)
+        values[attr.key] = list(value) if isinstance(value, list) else value
+    return values
+
+def _detached(model, values: Dict[str, Any]):
+    """A fresh detached instance, as if just loaded, that no other request shares."""
+    instance = model(**{key: list(v) if isinstance(v, list) else v for key, v in values.items()})
+    make_transient_to_detached(instance)
+    return instance
+
+class PrincipalCache:
+    """
+    Authenticated users, with their cognitive profile loaded, kept for a
+    short TTL so most requests skip the user lookup entirely. Entries are
+    keyed by the token's subject and issue time (iat), so a reissued token
+    always reloads. Only column values are cached: every request gets its
+    own detached User and profile, free to modify.
+
+    Entries live per worker: a profile write invalidates this worker's entries
+    immediately, other workers see it within AUTH_PRINCIPAL_CACHE_TTL. Buffered
+    profile writes invalidate them once flushed; until then the overlay applies.
+    """
+    def __init__(self):
+        self.cache = LRUTTLCache(settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_PRINCIPAL_CACHE_TTL)
+        # profile id -> (user id, email) of cached users, to find their entries after a flush
+        self._owners: Dict[int, Tuple[int, str]] = {}
+        write_behind.on_profiles_flushed(self.invalidate_profiles)
+
+    @staticmethod
+    def key_for(token_data: TokenPayload) -> str:
+        subject = f"uid:{token_data.uid}" if token_data.uid is not None else f"sub:{token_data.sub}"
+        return f"{subject}:{token_data.iat or 0}"
+
+    async def get(self, db: AsyncSession, token_data: TokenPayload) -> Optional[User]:
+        key = self.key_for(token_data)
+        entry: Optional[Tuple[dict, Optional[dict]]] = self.cache.get(key)
+        if entry is None:
+            if token_data.uid is not None:
+                user = await crud_user.get_with_profile(db, id=token_data.uid)
+                # The id must still belong to the account the token was issued for
+                if user is not None and user.email != token_data.sub:
+                    user = None
+            else:
+                user = await crud_user.get_by_email(db, email=token_data.sub)
+            if user is None:
+                return None
+            profile = user.cognitive_profile
+            entry = (_column_values(user), _column_values(profile) if profile is not None else None)
+            # The request works on a copy; keep the session from holding a second instance of the same rows
+            db.expunge(user)
+            self.cache.set(key, entry)
+            if profile is not None:
+                self._owners[profile.id] = (user.id, user.email)
+        return self._materialize(entry)
+
+    @staticmethod
+    def _materialize(entry: Tuple[dict, Optional[dict]]) -> User:
+        user_values, profile_values = entry
+        user = _detached(User, user_values)
+        profile = _detached(CognitiveProfile, profile_values) if profile_values is not None else None
+        # Unflushed write-behind values are applied per request, so they never go stale in the cache
+        write_behind.apply_profile_overlay(profile)
+        set_committed_value(user, "cognitive_profile", profile)
+        return user
+
+    def invalidate(self, user: User) -> None:
+        """Drops the user's entries for every token, under both key forms, so the next request reloads it."""
+        self._invalidate(user.id, user.email)
+
+    def invalidate_profiles(self, profile_ids) -> None:
+        """Drops the entries of the users owning these profiles, e.g. after a write-behind flush."""
+        for profile_id in profile_ids:
+            owner = self._owners.pop(profile_id, None)
+            if owner is not None:
+                self._invalidate(*owner)
+
+    def _invalidate(self, user_id: int, email: str) -> None:
+        self.cache.delete_prefix(f"uid:{user_id}:")
+        self.cache.delete_prefix(f"sub:{email}:")
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,304 @@
+"""
+Mastery-aware "ready to learn" recommendations.
+
+A concept is ready for a student when every direct prerequisite is at or
+above MASTERY_THRESHOLD and the concept itself is not. Readiness is computed
+with NumPy over the whole graph at once: one gather over the prerequisite
+edges and one segmented sum per concept, for a single student or a class
+matrix. Per-student state is cached and adjusted in place when a progress
+row changes, touching only the dependents of that concept.
+
+Postgres concepts (int ids) are matched to graph nodes (str ids) by
+concepts.graph_id when set, otherwise by normalized name. Persist the name
+matches into graph_id with:
+    python -m app.services.recommendation_engine --reconcile
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from neo4j import AsyncSession as Neo4jAsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUTTLCache
+from app.core.config import settings
+from app.models.concept import Concept
+from app.models.progress import Progress
+from app.services.concept_resolver import concept_resolver, normalize_name
+from app.services.graph_snapshot import GraphSnapshot, graph_snapshot
+from app.services.write_behind import write_behind
+
+class ConceptIdMap:
+    """Postgres concepts.id <-> snapshot position, from (id, name, graph_id) rows."""
+    def __init__(self, snapshot: GraphSnapshot, rows: Iterable[Tuple[int, str, Optional[str]]]):
+        by_name: Dict[str, int] = {}
+        for position, concept in enumerate(snapshot.concepts):
+            by_name.setdefault(normalize_name(concept.name), position)
+
+        self.position_of: Dict[int, int] = {}
+        # Name matches not recorded in graph_id yet, for reconcile_graph_ids
+        self.name_matches: Dict[int, str] = {}
+        self.unmatched = 0
+        for pg_id, name, graph_id in rows:
+            position = snapshot.index_of.get(graph_id) if graph_id else None
+            if position is None:
+                position = by_name.get(normalize_name(name or ""))
+                if position is None:
+                    self.unmatched += 1
+                    continue
+                self.name_matches[pg_id] = snapshot.ids[position]
+            self.position_of[pg_id] = position
+
+        self.pg_id = np.full(len(snapshot), -1, dtype=np.int64)
+        for pg_id, position in self.position_of.items():
+            self.pg_id[position] = pg_id
+        # Dense lookup table so a whole column of progress rows maps in one step
+        size = max(self.position_of, default=-1) + 1
+        self._positions = np.full(size, -1, dtype=np.int64)
+        for pg_id, position in self.position_of.items():
+            self._positions[pg_id] = position
+
+    def positions(self, pg_ids: np.ndarray) -> np.ndarray:
+        """Snapshot positions for an array of Postgres ids; -1 where unmatched."""
+        inside = (pg_ids >= 0) & (pg_ids < len(self._positions))
+        positions = np.full(len(pg_ids), -1, dtype=np.int64)
+        positions[inside] = self._positions[pg_ids[inside]]
+        return positions
+
+class StudentState:
+    """Mastery per snapshot position and, per concept, how many direct prerequisites are still below threshold."""
+    __slots__ = ("mastery", "unmet")
+
+    def __init__(self, mastery: np.ndarray, unmet: np.ndarray):
+        self.mastery = mastery
+        self.unmet = unmet
+
+class ReadinessModel:
+    """Prerequisite edges of one snapshot as flat arrays, grouped by dependent concept."""
+    def __init__(self, snapshot: GraphSnapshot, id_map: ConceptIdMap, threshold: int):
+        self.snapshot = snapshot
+        self.id_map = id_map
+        self.threshold = threshold
+
+        index = snapshot.prerequisites
+        n = len(snapshot)
+        # Deduplicated parents, so repeated relationships don't count twice
+        parents = [sorted(p) for p in index.parents]
+        self.prereq_count = np.array([len(p) for p in parents], dtype=np.int32)
+        self.prereq_src = np.array([p for node_parents in parents for p in node_parents], dtype=np.int64)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.prereq_count, out=offsets[1:])
+        self.with_prereqs = np.flatnonzero(self.prereq_count)
+        self.segment_starts = offsets[:-1][self.with_prereqs]
+
+        self.dependents: List[np.ndarray] = [np.array(sorted(c), dtype=np.int64) for c in index.children]
+        self.level = np.array(index.level, dtype=np.int32)
+        self.unlocks = np.array([len(c) for c in index.children], dtype=np.int32)
+        # Only Subtopics are recommended, as in recommend_next
+        self.candidate = snapshot.is_subtopic if snapshot.is_subtopic.any() else np.ones(n, dtype=bool)
+
+    def unmet_counts(self, mastery: np.ndarray) -> np.ndarray:
+        """(students, concepts) mastery matrix -> unmet direct prerequisites per student and concept."""
+        unmet = np.zeros(mastery.shape, dtype=np.int32)
+        if len(self.prereq_src):
+            missing = (mastery[:, self.prereq_src] < self.threshold).astype(np.int32)
+            unmet[:, self.with_prereqs] = np.add.reduceat(missing, self.segment_starts, axis=1)
+        return unmet
+
+    def apply(self, state: StudentState, position: int, level: int) -> None:
+        """One progress change: only the concept's direct dependents can change readiness."""
+        was_met = state.mastery[position] >= self.threshold
+        state.mastery[position] = level
+        is_met = level >= self.threshold
+        if was_met != is_met and len(self.dependents[position]):
+            state.unmet[self.dependents[position]] += -1 if is_met else 1
+
+    def rank(self, state: StudentState, limit: int) -> np.ndarray:
+        """
+        Ready positions, best first: concepts already started, then the
+        shallowest (lowest prerequisite level), then those unlocking the most.
+        """
+        ready = np.flatnonzero((state.unmet == 0) & (state.mastery < self.threshold) & self.candidate)
+        order = np.lexsort((
+            ready,
+            -self.unlocks[ready],
+            self.level[ready],
+            state.mastery[ready] == 0,
+        ))
+        return ready[order][:limit]
+
+    def recommendations(self, state: StudentState, limit: int) -> List[dict]:
+        return [
+            {
+                "concept": self.snapshot.concepts[position],
+                "concept_id": int(self.id_map.pg_id[position]) if self.id_map.pg_id[position] >= 0 else None,
+                "mastery_level": int(state.mastery[position]),
+            }
+            for position in self.rank(state, limit).tolist()
+        ]
+
+class RecommendationEngine:
+    def __init__(self):
+        self._model: Optional[ReadinessModel] = None
+        self._states = LRUTTLCache(
+            max_size=settings.RECOMMENDATION_STATE_CACHE_SIZE,
+            ttl_seconds=settings.RECOMMENDATION_STATE_TTL,
+        )
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self.incremental_updates = 0
+        self.states_loaded = 0
+
+    async def model(self, db: AsyncSession, neo4j_session: Neo4jAsyncSession) -> Optional[ReadinessModel]:
+        """The model for the current graph snapshot, rebuilt when the snapshot changes."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Without the snapshot refresh loop, check the graph version ourselves
+            stale = time.monotonic() - self._checked_at > settings.KG_SNAPSHOT_REFRESH_SECONDS
+            if graph_snapshot.current is None or (not graph_snapshot.running and stale):
+                await graph_snapshot.refresh(neo4j_session)
+                self._checked_at = time.monotonic()
+            snapshot = graph_snapshot.current
+            if snapshot is None:
+                return None
+            if self._model is None or self._model.snapshot is not snapshot:
+                rows = (await db.execute(select(Concept.id, Concept.name, Concept.graph_id))).all()
+                self._model = ReadinessModel(snapshot, ConceptIdMap(snapshot, rows), settings.MASTERY_THRESHOLD)
+                self._states.clear()
+            return self._model
+
+    async def _load_states(self, db: AsyncSession, model: ReadinessModel, user_ids: List[int]) -> Dict[int, StudentState]:
+        """Builds states for many students from one progress query and one vectorized readiness pass."""
+        row_of = {user_id: i for i, user_id in enumerate(user_ids)}
+        mastery = np.zeros((len(user_ids), len(model.snapshot)), dtype=np.float32)
+        result = await db.execute(
+            select(Progress.user_id, Progress.concept_id, Progress.mastery_level)
+            .filter(Progress.user_id.in_(user_ids))
+        )
+        rows = result.all()
+        if rows:
+            users, concepts, levels = zip(*rows)
+            positions = model.id_map.positions(np.array(concepts, dtype=np.int64))
+            found = positions >= 0
+            student_rows = np.array([row_of[u] for u in users], dtype=np.int64)
+            levels = np.array([level or 0 for level in levels], dtype=np.float32)
+            mastery[student_rows[found], positions[found]] = levels[found]
+        for user_id in user_ids:
+            pending = write_behind.pending_progress(user_id)
+            for concept_id, level in pending.items():
+                position = model.id_map.position_of.get(concept_id)
+                if position is not None:
+                    mastery[row_of[user_id], position] = level
+
+        unmet = model.unmet_counts(mastery)
+        self.states_loaded += len(user_ids)
+        return {user_id: StudentState(mastery[i], unmet[i]) for user_id, i in row_of.items()}
+
+    async def recommend_many(
+        self, db: AsyncSession, neo4j_session: Neo4jAsyncSession, user_ids: List[int], limit: int = 5
+    ) -> Optional[Dict[int, List[dict]]]:
+        """Ready concepts for each student, loading every uncached student in one batch. None if the graph isn't loaded."""
+        model = await self.model(db, neo4j_session)
+        if model is None:
+            return None
+        user_ids = list(dict.fromkeys(user_ids))
+        states = {}
+        for user_id in user_ids:
+            state = self._states.get(str(user_id))
+            if state is not None:
+                states[user_id] = state
+        missing = [user_id for user_id in user_ids if user_id not in states]
+        if missing:
+            loaded = await self._load_states(db, model, missing)
+            for user_id, state in loaded.items():
+                self._states.set(str(user_id), state)
+            states.update(loaded)
+        return {user_id: model.recommendations(states[user_id], limit) for user_id in user_ids}
+
+    async def recommend(
+        self, db: AsyncSession, neo4j_session: Neo4jAsyncSession, user_id: int, limit: int = 5
+    ) -> Optional[List[dict]]:
+        recommendations = await self.recommend_many(db, neo4j_session, [user_id], limit)
+        return recommendations[user_id] if recommendations is not None else None
+
+    def on_progress(self, user_id: int, levels: Dict[int, int]) -> None:
+        """
+        Applies {concept_id: mastery_level} writes to this worker's cached
+        state, if any. Other workers catch up within RECOMMENDATION_STATE_TTL.
+        """
+        model = self._model
+        state = self._states.get(str(user_id)) if model is not None else None
+        if state is None:
+            return
+        for concept_id, level in levels.items():
+            position = model.id_map.position_of.get(concept_id)
+            if position is not None:
+                model.apply(state, position, level)
+                self.incremental_updates += 1
+
+    def graph_ids(self, rows: Iterable[Tuple[int, str, Optional[str]]]) -> Set[str]:
+        """
+        Graph ids for (id, name, graph_id) concept rows, through the same
+        reconciliation the recommendations use: the loaded ID map when it
+        matches the current snapshot, otherwise graph_id, then exact name.
+        """
+        model = self._model
+        if model is not None and model.snapshot is graph_snapshot.current:
+            return {
+                model.snapshot.ids[model.id_map.position_of[pg_id]]
+                for pg_id, _, _ in rows if pg_id in model.id_map.position_of
+            }
+        graph_ids = {graph_id or concept_resolver.lookup_exact(name) for _, name, graph_id in rows}
+        return graph_ids - {None}
+
+    def stats(self) -> dict:
+        model = self._model
+        return {
+            "concepts": len(model.snapshot) if model is not None else 0,
+            "unmatched_postgres_concepts": model.id_map.unmatched if model is not None else 0,
+            "cached_students": self._states.stats(),
+            "states_loaded": self.states_loaded,
+            "incremental_updates": self.incremental_updates,
+        }
+
+recommendation_engine = RecommendationEngine()
+
+async def reconcile_graph_ids(db: AsyncSession, snapshot: GraphSnapshot) -> int:
+    """Stores name-based matches in concepts.graph_id. Returns the number of concepts updated."""
+    rows = (await db.execute(select(Concept.id, Concept.name, Concept.graph_id))).all()
+    taken = {graph_id for _, _, graph_id in rows if graph_id}
+    id_map = ConceptIdMap(snapshot, rows)
+    updates = []
+    for pg_id, graph_id in id_map.name_matches.items():
+        # graph_id is unique; leave ambiguous names for manual review
+        if graph_id not in taken:
+            taken.add(graph_id)
+            updates.append({"id": pg_id, "graph_id": graph_id})
+    if updates:
+        await db.execute(update(Concept), updates)
+        await db.commit()
+    print(f"Matched {len(updates)} concepts by name; {id_map.unmatched} have no graph node.")
+    return len(updates)
+
+async def main(args):
+    from app.db.neo4j_driver import neo4j_driver
+    from app.db.session import SessionLocal
+
+    if not args.reconcile:
+        return
+    try:
+        async with neo4j_driver.read_session() as session:
+            await graph_snapshot.refresh(session)
+        async with SessionLocal() as db:
+            await reconcile_graph_ids(db, graph_snapshot.current)
+    finally:
+        await neo4j_driver.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reconcile", action="store_true", help="Write name matches into concepts.graph_id.")
+    asyncio.run(main(parser.parse_args()))
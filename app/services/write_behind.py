@@ -0,0 +1,235 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.crud.crud_cognitive_profile import profile as crud_profile
+from app.crud.crud_progress import progress as crud_progress
+from app.db.session import SessionLocal
+from app.models.cognitive_profile import CognitiveProfile
+from app.models.concept import Concept
+
+class WriteBehindBuffer:
+    """
+    Collects progress and profile writes in memory and flushes them to
+    Postgres in batched transactions, every WRITE_BEHIND_FLUSH_SECONDS or
+    as soon as WRITE_BEHIND_MAX_PENDING rows are waiting, and on shutdown.
+
+    Repeated writes to the same row merge: progress keeps the most recently
+    recorded level per (user, concept), profiles keep the latest value per
+    column. Pending values are visible to this worker through the overlay
+    methods; other workers see them once flushed.
+    """
+    def __init__(self):
+        self._progress: Dict[Tuple[int, int], Tuple[int, datetime]] = {}
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._concept_ids: Set[int] = set()
+        self._profile_listeners: List[Callable[[Set[int]], None]] = []
+        self.enqueued = 0
+        self.merged = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.WRITE_BEHIND_ENABLED
+
+    @property
+    def pending(self) -> int:
+        return len(self._progress) + len(self._profiles)
+
+    def _enqueued(self, merged: bool) -> None:
+        self.enqueued += 1
+        self.merged += merged
+        if self.pending >= settings.WRITE_BEHIND_MAX_PENDING and self._wakeup is not None:
+            self._wakeup.set()
+
+    def on_profiles_flushed(self, listener: Callable[[Set[int]], None]) -> None:
+        """
+        Registers a callback that gets the ids of the profiles each flush wrote,
+        once they are committed, e.g. to drop cached copies loaded before then.
+        """
+        self._profile_listeners.append(listener)
+
+    # --- Writes ---
+
+    async def concept_exists(self, db: AsyncSession, concept_id: int) -> bool:
+        """
+        Validates a concept id before a progress write is buffered, so a bad id
+        is rejected like the synchronous paths do instead of dropped at flush.
+        Known ids are remembered; an unknown one costs one primary-key lookup.
+        """
+        if concept_id in self._concept_ids:
+            return True
+        found = (await db.execute(select(Concept.id).filter(Concept.id == concept_id))).scalar() is not None
+        if found:
+            self._concept_ids.add(concept_id)
+        return found
+
+    def add_progress(self, user_id: int, concept_id: int, mastery_level: int, recorded_at: Optional[datetime] = None) -> datetime:
+        recorded_at = recorded_at or datetime.now(timezone.utc)
+        key = (user_id, concept_id)
+        current = self._progress.get(key)
+        if current is None or recorded_at >= current[1]:
+            self._progress[key] = (mastery_level, recorded_at)
+        self._enqueued(merged=current is not None)
+        return recorded_at
+
+    def update_profile(self, profile: CognitiveProfile, obj_in: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Deferred counterpart of crud_profile.update_changed: the changed columns
+        are mirrored on the loaded profile right away and written at the next flush.
+        """
+        changed = crud_profile.changes(profile, obj_in)
+        if not changed:
+            return changed
+        for field, value in changed.items():
+            set_committed_value(profile, field, value)
+        merged = profile.id in self._profiles
+        self._profiles.setdefault(profile.id, {}).update(changed)
+        self._enqueued(merged)
+        return changed
+
+    def discard_progress(self, user_id: int, concept_ids) -> None:
+        """Drops pending levels superseded by a synchronous write."""
+        for concept_id in concept_ids:
+            self._progress.pop((user_id, concept_id), None)
+
+    def discard_profile(self, profile_id: int, fields) -> None:
+        """Drops pending columns superseded by a synchronous write, so the flush can't restore older values."""
+        pending = self._profiles.get(profile_id)
+        if pending is None:
+            return
+        for field in fields:
+            pending.pop(field, None)
+        if not pending:
+            del self._profiles[profile_id]
+
+    # --- Read-your-writes overlay ---
+
+    def pending_progress(self, user_id: int) -> Dict[int, int]:
+        """{concept_id: mastery_level} not flushed yet for this user."""
+        return {concept_id: level for (uid, concept_id), (level, _) in self._progress.items() if uid == user_id}
+
+    def apply_profile_overlay(self, profile: Optional[CognitiveProfile]) -> None:
+        """Puts unflushed column values onto a profile freshly loaded from the database."""
+        if profile is None:
+            return
+        for field, value in self._profiles.get(profile.id, {}).items():
+            set_committed_value(profile, field, value)
+
+    # --- Flushing ---
+
+    async def flush(self) -> int:
+        """Writes everything pending in one transaction. Returns the number of rows written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            progress, self._progress = self._progress, {}
+            profiles, self._profiles = self._profiles, {}
+            if not progress and not profiles:
+                return 0
+
+            progress_rows = [
+                {"user_id": user_id, "concept_id": concept_id, "mastery_level": level, "updated_at": recorded_at}
+                for (user_id, concept_id), (level, recorded_at) in progress.items()
+            ]
+            profile_rows = [{"id": profile_id, **values} for profile_id, values in profiles.items()]
+            try:
+                try:
+                    async with SessionLocal() as db:
+                        if progress_rows:
+                            # Timestamped merge, so a late flush never overwrites a newer synchronous write
+                            await db.execute(crud_progress.upsert_statement(progress_rows, newer_only=True))
+                        if profile_rows:
+                            # Executemany UPDATE by primary key, grouped by column set
+                            await db.execute(update(CognitiveProfile), profile_rows)
+                        await db.commit()
+                except IntegrityError:
+                    # Typically a progress row for a concept that doesn't exist. Retry
+                    # row by row so one bad row doesn't hold back the rest.
+                    await self._flush_rows_individually(progress_rows, profile_rows)
+            except BaseException:
+                # Including failures of the row-by-row retry and cancellation at
+                # shutdown, so stop() can still write these. Rows the retry already
+                # committed are rewritten harmlessly: the timestamped merge skips them.
+                self._requeue(progress, profiles)
+                raise
+            self.flushes += 1
+            self.rows_written += len(progress_rows) + len(profile_rows)
+            if profiles:
+                for listener in self._profile_listeners:
+                    listener(set(profiles))
+            return len(progress_rows) + len(profile_rows)
+
+    async def _flush_rows_individually(self, progress_rows, profile_rows) -> None:
+        async with SessionLocal() as db:
+            for row in progress_rows:
+                try:
+                    await db.execute(crud_progress.upsert_statement([row], newer_only=True))
+                    await db.commit()
+                except IntegrityError as e:
+                    await db.rollback()
+                    self.dropped += 1
+                    print(f"Write-behind dropped progress row {row}: {e.orig}")
+            if profile_rows:
+                await db.execute(update(CognitiveProfile), profile_rows)
+                await db.commit()
+
+    def _requeue(self, progress, profiles) -> None:
+        """Puts a failed flush back without overwriting anything written since."""
+        for key, value in progress.items():
+            current = self._progress.get(key)
+            if current is None or value[1] > current[1]:
+                self._progress[key] = value
+        for profile_id, values in profiles.items():
+            self._profiles[profile_id] = {**values, **self._profiles.get(profile_id, {})}
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.WRITE_BEHIND_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Pending writes were requeued; try again on the next tick
+                print(f"Write-behind flush failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None and self.enabled:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stops the flush loop and writes whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.pending:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "enqueued": self.enqueued,
+            "merged": self.merged,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "dropped": self.dropped,
+        }
+
+write_behind = WriteBehindBuffer()
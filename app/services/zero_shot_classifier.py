@@ -0,0 +1,149 @@
+from transformers import AutoTokenizer, pipeline
+from typing import Dict, List, Tuple
+import os
+import numpy as np
+import torch
+
+from app.core.config import settings
+from app.schemas.cognitive_profile import ANALYZED_DIMENSIONS
+
+# Raw classifier output for one prompt: dimension -> (top label, confidence)
+Classification = Dict[str, Tuple[str, float]]
+
+def configure_torch_threads(workers: int) -> None:
+    """Caps torch's intra-op threads so `workers` concurrent inferences don't oversubscribe the CPU."""
+    threads = settings.ML_TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once per process, before any parallel work has run.
+        pass
+
+class ZeroShotClassifier:
+    """
+    Owns the zero-shot model and classifies prompts against every cognitive
+    dimension at once.
+    """
+    MODEL_NAME = "MoritzLaurer/deberta-v3-base-zeroshot-v1"
+    # Same template the zero-shot pipeline uses by default, so results match.
+    HYPOTHESIS_TEMPLATE = "This example is {}."
+    BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+    # File names written by download_model.py inside ML_ONNX_MODEL_DIR
+    ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_quantized.onnx"}
+
+    def __init__(self, dimensions: Dict[str, List] = ANALYZED_DIMENSIONS, workers: int = 1, backend: str = None):
+        configure_torch_threads(workers)
+        self.dimensions = dimensions
+        self.backend = backend or settings.ML_BACKEND
+        self.pipeline = self._load_pipeline(self.backend)
+        self._prepare_hypotheses()
+
+    def _load_pipeline(self, backend: str):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown ML_BACKEND {backend!r}; expected one of {', '.join(self.BACKENDS)}")
+        print(f"Loading the zero-shot classifier with the {backend!r} backend...")
+
+        if backend.startswith("onnx"):
+            # Optional dependency, only needed for the ONNX Runtime backends
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+
+            model = ORTModelForSequenceClassification.from_pretrained(
+                settings.ML_ONNX_MODEL_DIR, file_name=self.ONNX_FILES[backend]
+            )
+            tokenizer = AutoTokenizer.from_pretrained(settings.ML_ONNX_MODEL_DIR)
+            return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+        classifier = pipeline("zero-shot-classification", model=self.MODEL_NAME)
+        if backend == "torch-int8":
+            # Dynamic quantization: Linear weights stored as int8, activations
+            # quantized on the fly. Roughly quarters the weight memory on CPU.
+            classifier.model = torch.quantization.quantize_dynamic(
+                classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return classifier
+
+    def _prepare_hypotheses(self):
+        """
+        Tokenizes every candidate-label hypothesis once. The labels never change,
+        so only the prompt needs tokenizing per request.
+        """
+        tokenizer = self.pipeline.tokenizer
+        self._hypothesis_ids = []
+        self._dimension_slices = {}
+        for dim, options in self.dimensions.items():
+            start = len(self._hypothesis_ids)
+            for opt in options:
+                hypothesis = self.HYPOTHESIS_TEMPLATE.format(opt.value)
+                self._hypothesis_ids.append(
+                    tokenizer(hypothesis, add_special_tokens=False)["input_ids"]
+                )
+            labels = [opt.value for opt in options]
+            self._dimension_slices[dim] = (start, len(self._hypothesis_ids), labels)
+
+        self._entailment_id = self.pipeline.entailment_id
+        self._max_length = min(tokenizer.model_max_length, 512)
+        self._pair_special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+        self._uses_token_type_ids = "token_type_ids" in tokenizer.model_input_names
+
+    def _build_features(self, prompt: str) -> List[dict]:
+        """Builds one (prompt, hypothesis) model input per candidate label, reusing the prompt's token ids."""
+        tokenizer = self.pipeline.tokenizer
+        prompt_ids = tokenizer(prompt, add_special_tokens=False)["input_ids"]
+
+        features = []
+        for hypothesis_ids in self._hypothesis_ids:
+            # Truncate only the prompt, like the pipeline's truncation="only_first"
+            budget = self._max_length - self._pair_special_tokens - len(hypothesis_ids)
+            first = prompt_ids[:budget]
+            input_ids = tokenizer.build_inputs_with_special_tokens(first, hypothesis_ids)
+            feature = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if self._uses_token_type_ids:
+                feature["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(first, hypothesis_ids)
+            features.append(feature)
+        return features
+
+    def classify_batch(self, prompts: List[str]) -> List[Classification]:
+        """
+        Classifies every prompt against every dimension in a single padded
+        forward pass. Scores are a softmax over the entailment logits of each
+        dimension's labels, i.e. the pipeline's multi_label=False behaviour.
+        """
+        if not prompts:
+            return []
+
+        features = []
+        for prompt in prompts:
+            features.extend(self._build_features(prompt))
+
+        model = self.pipeline.model
+        batch = self.pipeline.tokenizer.pad(features, padding=True, return_tensors="pt")
+        batch = {name: tensor.to(model.device) for name, tensor in batch.items()}
+        with torch.inference_mode():
+            logits = model(**batch).logits
+
+        entailment_logits = logits[:, self._entailment_id].reshape(len(prompts), -1).float().cpu().numpy()
+
+        results = []
+        for row in entailment_logits:
+            classification = {}
+            for dim, (start, end, labels) in self._dimension_slices.items():
+                dim_logits = row[start:end]
+                exp_logits = np.exp(dim_logits - dim_logits.max())
+                scores = exp_logits / exp_logits.sum()
+                top = int(scores.argmax())
+                classification[dim] = (labels[top], float(scores[top]))
+            results.append(classification)
+        return results
+
+    def classify(self, prompt: str) -> Classification:
+        return self.classify_batch([prompt])[0]
+
+    def classify_with_pipeline(self, prompt: str) -> Classification:
+        """The original one-pipeline-call-per-dimension path. Kept for benchmarking and parity checks."""
+        classification = {}
+        for dim, options in self.dimensions.items():
+            option_labels = [opt.value for opt in options]
+            result = self.pipeline(prompt, option_labels, multi_label=False)
+            classification[dim] = (result['labels'][0], result['scores'][0])
+        return classification
@@ -0,0 +1,67 @@
+"""
+Compares the original per-dimension pipeline loop against the single batched
+forward pass in ZeroShotClassifier.
+
+Run from the repository root:
+    python -m benchmarks.bench_cognitive_analyzer --runs 20
+"""
+import argparse
+import statistics
+import time
+
+from app.services.zero_shot_classifier import ZeroShotClassifier
+
+PROMPTS = [
+    "Can you explain how a binary search tree works step by step?",
+    "Show me a diagram of how quicksort partitions the array.",
+    "I just want the big picture of dynamic programming, skip the details.",
+    "Give me a simple example of a stack, I'm new to this.",
+    "Let me try implementing Dijkstra myself first, just give me hints.",
+    "What is the time complexity of inserting into a heap and why?",
+    "Explain again, but with a picture this time.",
+    "Walk me through the proof that merge sort is O(n log n).",
+]
+
+def time_path(classify, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        for prompt in PROMPTS:
+            start = time.perf_counter()
+            classify(prompt)
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print("Loading model and warming up...")
+    classifier = ZeroShotClassifier()
+    for prompt in PROMPTS[:2]:
+        classifier.classify_with_pipeline(prompt)
+        classifier.classify(prompt)
+
+    mismatches = 0
+    for prompt in PROMPTS:
+        looped = classifier.classify_with_pipeline(prompt)
+        batched = classifier.classify(prompt)
+        for dim, (label, score) in looped.items():
+            if batched[dim][0] != label or abs(batched[dim][1] - score) > 1e-3:
+                mismatches += 1
+                print(f"  mismatch on {dim!r} for {prompt!r}: {looped[dim]} vs {batched[dim]}")
+    print(f"Parity check: {mismatches} mismatching dimension(s)")
+
+    looped = time_path(classifier.classify_with_pipeline, args.runs)
+    batched = time_path(classifier.classify, args.runs)
+
+    for name, timings in (("pipeline loop", looped), ("batched", batched)):
+        print(
+            f"{name:>14}: mean {statistics.mean(timings):7.1f} ms  "
+            f"p50 {statistics.median(timings):7.1f} ms  "
+            f"p95 {statistics.quantiles(timings, n=20)[-1]:7.1f} ms"
+        )
+    print(f"Speedup (mean): {statistics.mean(looped) / statistics.mean(batched):.2f}x")
+
+if __name__ == "__main__":
+    main()
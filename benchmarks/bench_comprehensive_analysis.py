@@ -0,0 +1,90 @@
+"""
+get_comprehensive_analysis on hub nodes with high fan-out.
+
+Loads one synthetic hub per fan-out into the configured Neo4j (label
+:BenchSynthetic, removed afterwards), each with `fan-out` prerequisites,
+subtopics, related concepts and easier alternatives, and times the old
+chained OPTIONAL MATCH query (fan-out^4 rows before deduplication) against
+the per-relationship subqueries:
+    python -m benchmarks.bench_comprehensive_analysis --fan-outs 5 10 20 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.schemas.concept import Neo4jConcept
+from app.services.concept_resolver import bootstrap_concept_schema
+from app.services.knowledge_graph import CONCEPT_PROJECTION, analysis_subqueries
+
+OLD_QUERY = """
+MATCH (c:Concept {id: $concept_id})
+WITH c LIMIT 1
+OPTIONAL MATCH (p)-[:PREREQUISITE_FOR]->(c)
+OPTIONAL MATCH (c)-[:HAS_SUBTOPIC]->(sub)
+OPTIONAL MATCH (c)-[:USED_WITH]->(related)
+OPTIONAL MATCH (easier)-[:EASIER_THAN]->(c)
+RETURN c as concept,
+       collect(DISTINCT p) as prerequisites,
+       collect(DISTINCT sub) as subtopics,
+       collect(DISTINCT related) as related_concepts,
+       collect(DISTINCT easier) as easier_alternatives
+"""
+
+def new_query(limit=None) -> str:
+    return (
+        "MATCH (c:Concept {id: $concept_id}) WITH c LIMIT 1"
+        + analysis_subqueries(limit)
+        + f"RETURN c {CONCEPT_PROJECTION} AS concept, prerequisites, subtopics, related_concepts, easier_alternatives"
+    )
+
+CREATE_HUB = """
+CREATE (hub:Subtopic:Concept:BenchSynthetic {id: $hub, name: $hub, name_normalized: $hub})
+WITH hub
+UNWIND range(1, $fan_out) AS i
+CREATE (:Subtopic:Concept:BenchSynthetic {id: $hub + '-p' + i, name: 'Prerequisite ' + i, description: $padding})-[:PREREQUISITE_FOR]->(hub)
+CREATE (hub)-[:HAS_SUBTOPIC]->(:Subtopic:Concept:BenchSynthetic {id: $hub + '-s' + i, name: 'Subtopic ' + i, description: $padding})
+CREATE (hub)-[:USED_WITH]->(:Subtopic:Concept:BenchSynthetic {id: $hub + '-r' + i, name: 'Related ' + i, description: $padding})
+CREATE (:Subtopic:Concept:BenchSynthetic {id: $hub + '-e' + i, name: 'Easier ' + i, description: $padding})-[:EASIER_THAN]->(hub)
+"""
+
+async def time_query(session, query, concept_id, repeat) -> float:
+    """Median milliseconds, including building the Neo4jConcept models."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        record = await (await session.run(query, concept_id=concept_id)).single()
+        for column in ("prerequisites", "subtopics", "related_concepts", "easier_alternatives"):
+            [Neo4jConcept.model_validate(node) for node in record[column]]
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+async def run(args):
+    from app.db.neo4j_driver import neo4j_driver
+
+    async with neo4j_driver.write_session() as session:
+        await bootstrap_concept_schema(session)
+        try:
+            print(f"{'fan-out':>8} {'old rows':>12} {'old ms':>10} {'new ms':>10} {'new ms, limit ' + str(args.limit):>18}")
+            for fan_out in args.fan_outs:
+                hub = f"bench-hub-{fan_out}"
+                await (await session.run(CREATE_HUB, hub=hub, fan_out=fan_out, padding="x" * 500)).consume()
+                old = await time_query(session, OLD_QUERY, hub, args.repeat)
+                new = await time_query(session, new_query(), hub, args.repeat)
+                limited = await time_query(session, new_query(args.limit), hub, args.repeat)
+                print(f"{fan_out:>8} {fan_out ** 4:>12} {old:>10.2f} {new:>10.2f} {limited:>18.2f}")
+        finally:
+            await (await session.run(
+                "MATCH (c:BenchSynthetic) CALL { WITH c DETACH DELETE c } IN TRANSACTIONS OF 10000 ROWS"
+            )).consume()
+    await neo4j_driver.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fan-outs", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Concept resolution on a synthetic 100k-node graph.
+
+In-process mode (default) compares the ConceptResolver with a linear
+lower-cased CONTAINS scan, i.e. the work the old Cypher query did per request:
+    python -m benchmarks.bench_concept_resolution --nodes 100000
+
+--neo4j additionally loads the synthetic nodes into the configured Neo4j
+(label :BenchSynthetic, removed afterwards) and times the old scan query
+against the indexed id lookup:
+    python -m benchmarks.bench_concept_resolution --neo4j
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from app.services.concept_resolver import ConceptResolver, bootstrap_concept_schema
+
+WORDS = [
+    "binary", "search", "tree", "heap", "graph", "dynamic", "programming", "greedy", "sort", "merge",
+    "quick", "hash", "table", "linked", "list", "stack", "queue", "trie", "segment", "fenwick",
+    "shortest", "path", "spanning", "union", "find", "bit", "manipulation", "window", "pointer", "matrix",
+]
+
+def synthetic_names(count: int, seed: int = 7) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [
+        (f"bench-{i}", f"{' '.join(rng.sample(WORDS, 3)).title()} {i}")
+        for i in range(count)
+    ]
+
+def timed(fn, queries, repeat: int = 3) -> float:
+    """Mean milliseconds per query."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            fn(query)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(queries))
+
+def run_in_process(rows, queries):
+    resolver = ConceptResolver()
+    start = time.perf_counter()
+    resolver.load_names(rows)
+    print(f"Resolver load: {(time.perf_counter() - start) * 1000:.0f} ms for {len(rows)} names")
+
+    def linear_contains(query):
+        needle = query.lower()
+        return next((concept_id for concept_id, name in rows if needle in name.lower()), None)
+
+    exact = [name for _, name in random.Random(1).sample(rows, len(queries))]
+    print(f"  linear CONTAINS scan : {timed(linear_contains, queries, repeat=1):9.3f} ms/query")
+    print(f"  resolver, exact name : {timed(resolver.resolve, exact):9.4f} ms/query")
+    print(f"  resolver, substring  : {timed(resolver.resolve, queries):9.4f} ms/query (memoized after first pass)")
+
+async def run_neo4j(rows, queries):
+    from app.db.neo4j_driver import neo4j_driver
+
+    async with neo4j_driver.write_session() as session:
+        print("Loading synthetic nodes into Neo4j...")
+        for offset in range(0, len(rows), 10000):
+            batch = [{"id": concept_id, "name": name} for concept_id, name in rows[offset:offset + 10000]]
+            await (await session.run(
+                "UNWIND $rows AS row CREATE (:Subtopic:BenchSynthetic {id: row.id, name: row.name})", rows=batch
+            )).consume()
+        await bootstrap_concept_schema(session)
+        await (await session.run("CALL db.awaitIndexes(300)")).consume()
+
+        old_query = """
+        MATCH (c) WHERE (c:Topic OR c:Subtopic) AND toLower(c.name) CONTAINS toLower($concept_name)
+        WITH c LIMIT 1 RETURN c.id
+        """
+        new_query = "MATCH (c:Concept {id: $concept_id}) RETURN c.id"
+        resolver = ConceptResolver()
+        resolver.load_names(rows)
+
+        async def time_query(query, param_name, values):
+            timings = []
+            for value in values:
+                start = time.perf_counter()
+                await (await session.run(query, **{param_name: value})).consume()
+                timings.append((time.perf_counter() - start) * 1000)
+            return statistics.mean(timings)
+
+        print(f"  old CONTAINS query   : {await time_query(old_query, 'concept_name', queries):9.2f} ms/query")
+        ids = [resolver.resolve(query) for query in queries]
+        print(f"  indexed id lookup    : {await time_query(new_query, 'concept_id', ids):9.2f} ms/query")
+
+        print("Removing synthetic nodes...")
+        await (await session.run(
+            "MATCH (c:BenchSynthetic) CALL { WITH c DETACH DELETE c } IN TRANSACTIONS OF 10000 ROWS"
+        )).consume()
+    await neo4j_driver.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--neo4j", action="store_true")
+    args = parser.parse_args()
+
+    rows = synthetic_names(args.nodes)
+    # Partial names, like the ones typed into /concept/{name}/...: "tree heap 99123"
+    rng = random.Random(3)
+    queries = [name.lower().split(" ", 1)[1] for _, name in rng.sample(rows, args.queries)]
+
+    run_in_process(rows, queries)
+    if args.neo4j:
+        asyncio.run(run_neo4j(rows, queries))
+
+if __name__ == "__main__":
+    main()
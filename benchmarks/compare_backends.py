@@ -0,0 +1,87 @@
+"""
+Accuracy-vs-latency comparison of the cognitive classifier backends over a
+fixed prompt corpus. Accuracy is agreement with the full-precision "torch"
+backend, per dimension.
+
+The ONNX backends need the artifacts from download_model.py:
+    ML_BACKEND=onnx python download_model.py
+    python -m benchmarks.compare_backends --backends torch torch-int8 onnx onnx-int8
+"""
+import argparse
+import gc
+import resource
+import statistics
+import time
+
+from app.services.zero_shot_classifier import ZeroShotClassifier
+
+CORPUS = [
+    "Can you explain how a binary search tree works step by step?",
+    "Show me a diagram of how quicksort partitions the array.",
+    "I just want the big picture of dynamic programming, skip the details.",
+    "Give me a simple example of a stack, I'm new to this.",
+    "Let me try implementing Dijkstra myself first, just give me hints.",
+    "What is the time complexity of inserting into a heap and why?",
+    "Explain again, but with a picture this time.",
+    "Walk me through the proof that merge sort is O(n log n).",
+    "How do hash tables handle collisions? Keep it short.",
+    "Draw the recursion tree for fibonacci(5).",
+    "I'm confused, can you go slower and break BFS into small steps?",
+    "Compare AVL trees and red-black trees in depth, including rotations.",
+    "Just tell me what to read next, I'll figure out linked lists on my own.",
+    "What's the intuition behind amortized analysis?",
+    "Give me a visual of how a trie stores words.",
+    "Explain topological sort with a real-world analogy.",
+]
+
+def max_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_backend(backend: str, runs: int):
+    rss_before = max_rss_mb()
+    classifier = ZeroShotClassifier(backend=backend)
+    load_rss = max_rss_mb() - rss_before
+
+    classifier.classify(CORPUS[0])  # warm-up
+    predictions = [classifier.classify(prompt) for prompt in CORPUS]
+
+    timings = []
+    for _ in range(runs):
+        for prompt in CORPUS:
+            start = time.perf_counter()
+            classifier.classify(prompt)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    del classifier
+    gc.collect()
+    return predictions, timings, load_rss
+
+def agreement(reference: list, predictions: list) -> float:
+    matches = total = 0
+    for ref, pred in zip(reference, predictions):
+        for dim, (label, _) in ref.items():
+            matches += pred[dim][0] == label
+            total += 1
+    return matches / total
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8"], choices=ZeroShotClassifier.BACKENDS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = args.backends if args.backends[0] == "torch" else ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {backend: run_backend(backend, args.runs) for backend in backends}
+    reference = results["torch"][0]
+
+    print(f"\n{'backend':>11} | {'agreement':>9} | {'mean ms':>8} | {'p95 ms':>8} | {'RSS growth MB':>13}")
+    for backend, (predictions, timings, load_rss) in results.items():
+        print(
+            f"{backend:>11} | {agreement(reference, predictions):9.1%} | "
+            f"{statistics.mean(timings):8.1f} | {statistics.quantiles(timings, n=20)[-1]:8.1f} | {load_rss:13.0f}"
+        )
+    print("\nRSS growth is the peak-RSS increase while loading; later backends reuse freed memory, so run one backend per process for exact numbers.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Saturates one endpoint while probing another, and reports the probe's latency
+percentiles with and without the background load. Used to check that heavy
+endpoints (cognitive analysis, login) don't stall the rest of the worker.
+
+Run against a live server from the repository root, e.g.:
+    python -m benchmarks.load_test --token $TOKEN \
+        --saturate POST:/api/v1/student/me/analyze/preview \
+        --probe GET:/api/v1/student/me --concurrency 32 --duration 30
+
+Login throughput, and what a login storm does to a non-auth endpoint:
+    python -m benchmarks.load_test \
+        --saturate POST:/api/v1/login/access-token \
+        --form username=student@example.com --form password=secret \
+        --probe GET:/ --concurrency 16 --duration 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+def parse_target(target: str) -> tuple[str, str]:
+    method, _, path = target.partition(":")
+    return method.upper(), path
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def saturate(client, method, path, body, form, stop: asyncio.Event, counters: dict):
+    while not stop.is_set():
+        try:
+            if form:
+                response = await client.request(method, path, data=form)
+            else:
+                response = await client.request(method, path, json=body)
+            counters[response.status_code] = counters.get(response.status_code, 0) + 1
+        except httpx.HTTPError:
+            counters["error"] = counters.get("error", 0) + 1
+
+async def probe(client, method, path, duration: float, interval: float) -> list[float]:
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.request(method, path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+def report(name: str, latencies: list[float]):
+    print(
+        f"{name:>12}: n={len(latencies):5d}  p50 {statistics.median(latencies):7.1f} ms  "
+        f"p99 {percentile(latencies, 99):7.1f} ms  max {max(latencies):7.1f} ms"
+    )
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    sat_method, sat_path = parse_target(args.saturate)
+    probe_method, probe_path = parse_target(args.probe)
+    body = {"prompt": args.prompt} if sat_method == "POST" else None
+    form = dict(field.split("=", 1) for field in args.form)
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=60, limits=limits) as client:
+        print(f"Baseline: probing {probe_method} {probe_path} for {args.baseline}s with no load...")
+        baseline = await probe(client, probe_method, probe_path, args.baseline, args.interval)
+
+        print(f"Loaded: {args.concurrency} clients on {sat_method} {sat_path} for {args.duration}s...")
+        stop = asyncio.Event()
+        counters: dict = {}
+        started = time.perf_counter()
+        workers = [
+            asyncio.create_task(saturate(client, sat_method, sat_path, body, form, stop, counters))
+            for _ in range(args.concurrency)
+        ]
+        loaded = await probe(client, probe_method, probe_path, args.duration, args.interval)
+        stop.set()
+        await asyncio.gather(*workers, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+
+    report("baseline", baseline)
+    report("under load", loaded)
+    print(f"Saturating endpoint responses: {counters}")
+    print(f"Saturating endpoint throughput: {counters.get(200, 0) / elapsed:.1f} successful req/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--saturate", default="POST:/api/v1/student/me/analyze/preview")
+    parser.add_argument("--probe", default="GET:/api/v1/student/me")
+    parser.add_argument("--prompt", default="Can you show me a diagram of how a heap works?")
+    parser.add_argument("--form", action="append", default=[], metavar="KEY=VALUE",
+                        help="Send the saturating request as form data instead of JSON (repeatable).")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--baseline", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,35 @@
+import os
+
 from transformers import pipeline
 
+MODEL_NAME = "MoritzLaurer/deberta-v3-base-zeroshot-v1"
+
 print("Downloading and caching the zero-shot classification model...")
 # Use the correct, fine-tuned model here as well
-pipeline("zero-shot-classification", model="MoritzLaurer/deberta-v3-base-zeroshot-v1")
-print("Model download complete.")
\ No newline at end of file
+pipeline("zero-shot-classification", model=MODEL_NAME)
+print("Model download complete.")
+
+# --- OPTIONAL: BUILD THE OPTIMIZED ONNX ARTIFACTS ---
+# Only runs when the image is built for an ONNX backend (see ML_BACKEND in
+# app/core/config.py), so the export happens once at build time, not at boot.
+backend = os.environ.get("ML_BACKEND", "torch")
+onnx_dir = os.environ.get("ML_ONNX_MODEL_DIR", "onnx_model")
+
+if backend.startswith("onnx"):
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    print(f"Exporting the model to ONNX in '{onnx_dir}'...")
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    model.save_pretrained(onnx_dir)
+    AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(onnx_dir)
+
+    # Writes model_quantized.onnx next to model.onnx, used by ML_BACKEND=onnx-int8
+    print("Quantizing the ONNX model to int8 (dynamic quantization)...")
+    quantizer = ORTQuantizer.from_pretrained(onnx_dir, file_name="model.onnx")
+    quantizer.quantize(
+        save_dir=onnx_dir,
+        quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False),
+    )
+    print("ONNX export complete.")
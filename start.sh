@@ -3,10 +3,17 @@
 # Find and kill any old Gunicorn processes to ensure a clean start
 echo "--- Stopping any running Gunicorn processes... ---"
 pkill -f gunicorn
+pkill -f app.services.model_server
 
 # Give the OS a moment to release the port
 sleep 1
 
+# Optionally start the shared model server, so the workers don't each load the model
+if [ -n "$ML_MODEL_SERVER_SOCKET" ]; then
+    echo "--- Starting shared model server on $ML_MODEL_SERVER_SOCKET... ---"
+    python -m app.services.model_server &
+fi
+
 # Start the new Gunicorn server
 echo "--- Starting new Gunicorn server... ---"
 gunicorn -w 4 -k uvicorn.workers.UvicornWorker app.main:app -b 0.0.0.0:8000
\ No newline at end of file
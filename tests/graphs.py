@@ -0,0 +1,18 @@
+"""Small in-memory graphs for the snapshot-based tests."""
+from app.services.graph_snapshot import GraphSnapshot
+
+def make_snapshot(concepts, edges, topics=()):
+    """
+    `concepts` maps id -> name or id -> property dict; `edges` are
+    (src, type, dst) triples, type defaulting to PREREQUISITE_FOR for pairs.
+    Every concept is a Subtopic except those listed in `topics`.
+    """
+    rows = []
+    for concept_id, props in concepts.items():
+        props = {"name": props} if isinstance(props, str) else dict(props)
+        rows.append({"id": concept_id, "is_subtopic": concept_id not in topics, "props": {"id": concept_id, **props}})
+    edge_rows = [
+        {"src": e[0], "type": e[1] if len(e) == 3 else "PREREQUISITE_FOR", "dst": e[-1]}
+        for e in edges
+    ]
+    return GraphSnapshot(rows, edge_rows, version=("test",))
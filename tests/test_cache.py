@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import LRUTTLCache, SQLiteCacheStore, TieredCache
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+def row_count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+
+# --- LRUTTLCache ---
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = LRUTTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_lru_entries_expire_after_ttl(clock):
+    cache = LRUTTLCache(max_size=8, ttl_seconds=30)
+    cache.set("a", 1)
+    clock.now += 29.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.evictions == 1
+
+def test_lru_set_refreshes_ttl(clock):
+    cache = LRUTTLCache(max_size=8, ttl_seconds=30)
+    cache.set("a", 1)
+    clock.now += 20
+    cache.set("a", 2)
+    clock.now += 20
+    assert cache.get("a") == 2
+
+def test_lru_size_zero_disables_caching(clock):
+    cache = LRUTTLCache(max_size=0, ttl_seconds=30)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+def test_lru_delete_prefix_only_drops_matching_keys(clock):
+    cache = LRUTTLCache(max_size=8, ttl_seconds=30)
+    for key in ("uid:1:100", "uid:1:200", "uid:10:100", "sub:a:0"):
+        cache.set(key, key)
+    cache.delete_prefix("uid:1:")
+    assert sorted(cache._data) == ["sub:a:0", "uid:10:100"]
+
+def test_lru_is_safe_under_concurrent_writers():
+    cache = LRUTTLCache(max_size=50, ttl_seconds=60)
+
+    def writer(offset):
+        for i in range(2000):
+            cache.set(f"{offset}:{i % 100}", i)
+            cache.get(f"{offset}:{(i * 7) % 100}")
+
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
+
+# --- SQLiteCacheStore ---
+
+def test_sqlite_round_trips_json_values(tmp_path, clock):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"), ttl_seconds=60, max_rows=10)
+    store.set("k", {"instruction_flow": ["global", 0.9]})
+    assert store.get("k") == {"instruction_flow": ["global", 0.9]}
+    assert store.get("missing") is None
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_sqlite_expired_entries_are_not_served(tmp_path, clock):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"), ttl_seconds=60, max_rows=10)
+    store.set("k", 1)
+    clock.now += 60
+    assert store.get("k") is None
+
+def test_sqlite_is_shared_between_stores_on_one_file(tmp_path, clock):
+    path = str(tmp_path / "nested" / "cache.db")
+    writer = SQLiteCacheStore(path, ttl_seconds=60, max_rows=10)
+    reader = SQLiteCacheStore(path, ttl_seconds=60, max_rows=10)
+    writer.set("k", "v")
+    assert reader.get("k") == "v"
+    writer.delete("k")
+    assert reader.get("k") is None
+
+def test_sqlite_connections_are_per_thread(tmp_path, clock):
+    store = SQLiteCacheStore(str(tmp_path / "cache.db"), ttl_seconds=60, max_rows=10)
+    store.set("k", "v")
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append((store.get("k"), store._conn())))
+    thread.start()
+    thread.join()
+    assert seen[0][0] == "v"
+    assert seen[0][1] is not store._conn()
+
+def test_sqlite_prune_drops_expired_rows_then_oldest_over_capacity(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCacheStore(path, ttl_seconds=100, max_rows=3)
+    store.PRUNE_EVERY = 10**9  # prune explicitly below
+    store.set("expired", 0)
+    clock.now += 100
+    for i in range(5):
+        store.set(f"k{i}", i)
+        clock.now += 1
+
+    store._prune(store._conn())
+
+    assert row_count(path) == 3
+    assert [store.get(f"k{i}") for i in range(5)] == [None, None, 2, 3, 4]
+    assert store.evictions == 3
+
+def test_sqlite_prunes_every_prune_every_writes(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCacheStore(path, ttl_seconds=100, max_rows=2)
+    store.PRUNE_EVERY = 4
+    for i in range(3):
+        store.set(f"k{i}", i)
+        clock.now += 1
+    assert row_count(path) == 3
+
+    store.set("k3", 3)
+    assert row_count(path) == 2
+    assert store.get("k2") == 2 and store.get("k3") == 3
+
+def test_sqlite_without_a_row_cap_only_prunes_expired_rows(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    store = SQLiteCacheStore(path, ttl_seconds=100, max_rows=0)
+    store.set("expired", 0)
+    clock.now += 100
+    for i in range(3):
+        store.set(f"k{i}", i)
+
+    store._prune(store._conn())
+
+    assert row_count(path) == 3
+    assert [store.get(f"k{i}") for i in range(3)] == [0, 1, 2]
+    assert store.evictions == 1
+
+# --- TieredCache ---
+
+def test_tiered_shared_hit_fills_the_local_tier(tmp_path, clock):
+    shared = SQLiteCacheStore(str(tmp_path / "cache.db"), ttl_seconds=60, max_rows=10)
+    shared.set("k", "v")
+    cache = TieredCache(LRUTTLCache(max_size=8, ttl_seconds=60), shared)
+
+    assert cache.get("k") == "v"
+    assert cache.local.get("k") == "v"
+    cache.delete("k")
+    assert cache.get("k") is None
+    assert shared.get("k") is None
+
+def test_tiered_without_shared_store(clock):
+    cache = TieredCache(LRUTTLCache(max_size=8, ttl_seconds=60))
+    cache.set("k", [1, 2])
+    assert cache.get("k") == [1, 2]
+    assert "shared" not in cache.stats()
@@ -0,0 +1,49 @@
+from langchain.memory import ConversationBufferWindowMemory
+
+from app.schemas.chat import ChatMessage
+from app.services.chat_service import MEMORY_TURNS, coalescing_key
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history.append(ChatMessage(role="user", content=f"question {i}"))
+        history.append(ChatMessage(role="assistant", content=f"answer {i}"))
+    return history
+
+def test_key_window_is_what_the_memory_sends():
+    history = conversation(MEMORY_TURNS + 3)
+    memory = ConversationBufferWindowMemory(k=MEMORY_TURNS, return_messages=True, memory_key="history")
+    for msg in history:
+        if msg.role == "user":
+            memory.chat_memory.add_user_message(msg.content)
+        else:
+            memory.chat_memory.add_ai_message(msg.content)
+
+    sent = [m.content for m in memory.load_memory_variables({})["history"]]
+    assert sent == [m.content for m in history[-2 * MEMORY_TURNS:]]
+
+def test_messages_outside_the_window_do_not_change_the_key():
+    history = conversation(MEMORY_TURNS + 2)
+    edited = [msg.model_copy() for msg in history]
+    edited[0].content = "a different opening question"
+
+    assert coalescing_key(history, "input", "model") == coalescing_key(edited, "input", "model")
+
+def test_messages_inside_the_window_change_the_key():
+    history = conversation(MEMORY_TURNS + 2)
+    edited = [msg.model_copy() for msg in history]
+    edited[-2 * MEMORY_TURNS].content = "the oldest question the model still sees"
+
+    assert coalescing_key(history, "input", "model") != coalescing_key(edited, "input", "model")
+
+def test_key_depends_on_input_model_and_roles():
+    history = conversation(2)
+    key = coalescing_key(history, "input", "model")
+    assert key != coalescing_key(history, "other input", "model")
+    assert key != coalescing_key(history, "input", "other-model")
+
+    swapped = [ChatMessage(role="assistant" if m.role == "user" else "user", content=m.content) for m in history]
+    assert key != coalescing_key(swapped, "input", "model")
+
+def test_zero_turns_ignores_history():
+    assert coalescing_key(conversation(3), "input", "model", turns=0) == coalescing_key([], "input", "model", turns=0)
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.cache import LRUTTLCache, TieredCache
+from app.schemas.cognitive_profile import ANALYZED_DIMENSIONS, InstructionFlow, InputPreference
+from app.services.cognitive_analyzer import MLCognitiveAnalyzerService
+
+def make_profile(style_scores=None, **styles):
+    defaults = {dim: options[0] for dim, options in ANALYZED_DIMENSIONS.items()}
+    return SimpleNamespace(style_scores=style_scores, **{**defaults, **styles})
+
+def classification(confidence=0.9, **labels):
+    """Top label and confidence per dimension; the first option unless overridden."""
+    return {
+        dim: (labels.get(dim, options[0].value), confidence)
+        for dim, options in ANALYZED_DIMENSIONS.items()
+    }
+
+def reference_adapt(scores, result, slots, adaptation_rate, decay_rate):
+    """The adaptation rule written out one dimension at a time."""
+    scores = [s * (1 - decay_rate) for s in scores]
+    for dim, (label, confidence) in result.items():
+        slot = slots[(dim, label)]
+        scores[slot] = min(1.0, scores[slot] + confidence * adaptation_rate)
+    return scores
+
+@pytest.fixture
+def analyzer():
+    return MLCognitiveAnalyzerService(adaptation_rate=0.1, decay_rate=0.05)
+
+def test_score_layout_follows_analyzed_dimensions(analyzer):
+    expected = [(dim, opt.value) for dim, options in ANALYZED_DIMENSIONS.items() for opt in options]
+    assert analyzer.num_scores == len(expected)
+    assert [analyzer._slot[key] for key in expected] == list(range(len(expected)))
+
+def test_initial_scores_favour_current_styles(analyzer):
+    profile = make_profile(instruction_flow=InstructionFlow.global_)
+    scores = analyzer._initial_scores(profile)
+
+    favoured = {analyzer._slot[(dim, getattr(profile, dim).value)] for dim in ANALYZED_DIMENSIONS}
+    for slot, score in enumerate(scores):
+        assert score == pytest.approx(0.55 if slot in favoured else 0.5)
+
+def test_initial_scores_ignore_stored_scores_of_another_layout(analyzer):
+    stored = [0.9] * (analyzer.num_scores + 1)
+    scores = analyzer._initial_scores(make_profile(style_scores=stored))
+    assert scores.max() == pytest.approx(0.55)
+
+    assert analyzer._initial_scores(None).tolist() == [0.5] * analyzer.num_scores
+
+def test_adaptation_matches_reference_rule(analyzer):
+    rng = np.random.default_rng(7)
+    stored = rng.uniform(0, 1, analyzer.num_scores).round(3).tolist()
+    result = classification(confidence=0.8, instruction_flow="global", input_preference="visual")
+
+    _, _, scores = analyzer._adapt_profile(result, make_profile(style_scores=stored))
+
+    expected = reference_adapt(stored, result, analyzer._slot, 0.1, 0.05)
+    assert scores == pytest.approx(expected, abs=1e-6)
+
+def test_adaptation_caps_scores_at_one(analyzer):
+    stored = [1.0] * analyzer.num_scores
+    _, _, scores = analyzer._adapt_profile(classification(confidence=1.0), make_profile(style_scores=stored))
+    assert max(scores) == pytest.approx(1.0)
+    assert min(scores) == pytest.approx(0.95)
+
+def test_low_confidence_evidence_needs_repeating_to_flip_a_style(analyzer):
+    profile = make_profile(instruction_flow=InstructionFlow.sequential)
+    result = classification(confidence=0.4, instruction_flow="global")
+
+    update, _, scores = analyzer._adapt_profile(result, profile)
+    assert update.instruction_flow == InstructionFlow.sequential
+
+    profile.style_scores = scores
+    update, _, _ = analyzer._adapt_profile(result, profile)
+    assert update.instruction_flow == InstructionFlow.global_
+
+def test_dominant_styles_and_confidence(analyzer):
+    result = classification(confidence=0.9, input_preference="visual")
+    update, confidence, scores = analyzer._adapt_profile(result, make_profile())
+
+    assert update.input_preference == InputPreference.visual
+    dominant = [analyzer._slot[(dim, getattr(update, dim).value)] for dim in ANALYZED_DIMENSIONS]
+    for dim, options in ANALYZED_DIMENSIONS.items():
+        slots = [analyzer._slot[(dim, opt.value)] for opt in options]
+        assert analyzer._slot[(dim, getattr(update, dim).value)] == max(slots, key=lambda s: scores[s])
+    assert confidence == pytest.approx(np.mean([scores[s] for s in dominant]))
+
+def test_adaptation_leaves_the_profile_untouched(analyzer):
+    stored = [0.5] * analyzer.num_scores
+    profile = make_profile(style_scores=list(stored))
+    analyzer._adapt_profile(classification(), profile)
+    assert profile.style_scores == stored
+
+def test_cache_key_normalizes_whitespace_case_and_trailing_punctuation(analyzer):
+    assert analyzer._cache_key("Explain again.") == analyzer._cache_key("  explain   AGAIN ")
+    assert analyzer._cache_key("Explain again.") != analyzer._cache_key("Explain it again.")
+
+def test_classify_reuses_cached_classifications(analyzer):
+    calls = []
+
+    class CountingClassifier:
+        def classify(self, prompt):
+            calls.append(prompt)
+            return classification()
+
+    analyzer.classifier = CountingClassifier()
+    analyzer.cache = TieredCache(LRUTTLCache(max_size=16, ttl_seconds=60))
+
+    first = analyzer.classify("What is a heap?")
+    second = analyzer.classify("what is a heap")
+    assert first == second
+    assert calls == ["What is a heap?"]
@@ -0,0 +1,61 @@
+from app.schemas.concept import Neo4jConcept
+from app.services.knowledge_graph import ANALYSIS_RELATIONSHIPS, CONCEPT_PROJECTION, analysis_subqueries
+from tests.graphs import make_snapshot
+
+def names(concepts):
+    return [c.name for c in concepts]
+
+def hub(fan_out):
+    """One hub with `fan_out` neighbours per relationship, every edge stored twice."""
+    concepts = {"hub": "Hub"}
+    edges = []
+    for i in range(fan_out):
+        for prefix, edge in (
+            ("p", lambda n: (n, "PREREQUISITE_FOR", "hub")),
+            ("s", lambda n: ("hub", "HAS_SUBTOPIC", n)),
+            ("r", lambda n: ("hub", "USED_WITH", n)),
+            ("e", lambda n: (n, "EASIER_THAN", "hub")),
+        ):
+            concept_id = f"{prefix}{i}"
+            concepts[concept_id] = f"{prefix.upper()} {fan_out - i:02d}"
+            edges += [edge(concept_id), edge(concept_id)]
+    return make_snapshot(concepts, edges)
+
+def test_snapshot_analysis_collects_each_relationship_once():
+    snapshot = hub(4)
+    analysis = snapshot.comprehensive_analysis(snapshot.index_of["hub"])
+
+    assert analysis["target_concept"].id == "hub"
+    for column, prefix in (("prerequisites", "p"), ("subtopics", "s"), ("related_concepts", "r"), ("easier_alternatives", "e")):
+        assert sorted(c.id for c in analysis[column]) == [f"{prefix}{i}" for i in range(4)]
+
+def test_snapshot_analysis_limit_keeps_the_first_names():
+    snapshot = hub(5)
+    analysis = snapshot.comprehensive_analysis(snapshot.index_of["hub"], limit=2)
+    assert names(analysis["prerequisites"]) == ["P 01", "P 02"]
+    assert names(analysis["easier_alternatives"]) == ["E 01", "E 02"]
+
+def test_snapshot_analysis_ignores_reverse_direction_edges():
+    snapshot = make_snapshot(
+        {"hub": "Hub", "next": "Next", "parent": "Parent"},
+        [("hub", "PREREQUISITE_FOR", "next"), ("parent", "HAS_SUBTOPIC", "hub")],
+    )
+    analysis = snapshot.comprehensive_analysis(snapshot.index_of["hub"])
+    assert analysis["prerequisites"] == []
+    assert analysis["subtopics"] == []
+
+def test_one_subquery_per_relationship():
+    query = analysis_subqueries()
+    assert query.count("CALL {") == len(ANALYSIS_RELATIONSHIPS)
+    for column, pattern in ANALYSIS_RELATIONSHIPS.items():
+        assert f"OPTIONAL MATCH {pattern} WITH DISTINCT n" in query
+        assert f"AS {column} }}" in query
+    assert "LIMIT" not in query
+
+def test_subquery_limit_is_an_integer_per_relationship():
+    query = analysis_subqueries(limit="3")
+    assert query.count("ORDER BY n.name LIMIT 3 ") == len(ANALYSIS_RELATIONSHIPS)
+
+def test_projection_covers_exactly_the_model_fields():
+    fields = CONCEPT_PROJECTION.strip("{}").split(", ")
+    assert fields == [f".{field}" for field in Neo4jConcept.model_fields]
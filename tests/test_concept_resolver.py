@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services import concept_resolver as resolver_module
+from app.services.concept_resolver import ConceptResolver, normalize_name
+
+NAMES = [
+    ("bst", "Binary Search Tree"),
+    ("stack", "Stack"),
+    ("stack-machine", "Stack Machine"),
+    ("dijkstra", "Dijkstra's Algorithm"),
+    ("heap", "Heap"),
+]
+
+class FakeGraph:
+    """
+    Answers the resolver's exact-name, CONTAINS and full-text queries from a
+    dict (full text: shortest name containing the first search term); records every query.
+    """
+    def __init__(self, names):
+        self.by_name = {normalize_name(name): (concept_id, name) for concept_id, name in names}
+        self.queries = []
+
+    async def read_single(self, session, query, **params):
+        self.queries.append(query)
+        if "{name_normalized: $name}" in query:
+            match = self.by_name.get(params["name"])
+        elif "CONTAINS" in query:
+            candidates = sorted((n for n in self.by_name if params["name"] in n), key=len)
+            match = self.by_name[candidates[0]] if candidates else None
+        elif "fulltext" in query:
+            term = params["search"].split()[0].rstrip("~")
+            candidates = sorted((n for n in self.by_name if term in n), key=len)
+            match = self.by_name[candidates[0]] if candidates else None
+        else:
+            match = None
+        return {"id": match[0], "name": match[1]} if match else None
+
+@pytest.fixture
+def resolver():
+    resolver = ConceptResolver()
+    resolver.load_names(NAMES)
+    return resolver
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = FakeGraph(NAMES + [("binary-search", "Binary Search")])
+    monkeypatch.setattr(resolver_module, "read_single", graph.read_single)
+    return graph
+
+def test_normalize_name():
+    assert normalize_name("  Binary   Search\tTree ") == "binary search tree"
+
+def test_load_names_keeps_the_first_id_per_name_and_skips_blanks():
+    resolver = ConceptResolver()
+    resolver.load_names([("a", "Heap"), ("b", " heap "), (None, "Stack"), ("c", "")])
+    assert resolver.lookup_exact("HEAP") == "a"
+    assert resolver.lookup_exact("stack") is None
+
+def test_exact_match_wins_over_substring(resolver):
+    assert resolver.resolve("stack") == "stack"
+    assert resolver.resolve(" STACK ") == "stack"
+
+def test_substring_prefers_the_shortest_name(resolver):
+    assert resolver.resolve("search") == "bst"
+    assert resolver.resolve("machine") == "stack-machine"
+
+def test_fuzzy_match_on_typos(resolver):
+    assert resolver.resolve("dijkstras algoritm") == "dijkstra"
+    assert resolver.resolve("completely unrelated") is None
+    assert resolver.resolve("   ") is None
+
+def test_approximate_matches_are_memoized_until_reload(resolver):
+    assert resolver.resolve("search") == "bst"
+    resolver._names = []  # a memo hit doesn't need the name list
+    assert resolver.resolve("search") == "bst"
+
+    resolver.load_names([("linear-search", "Linear Search")])
+    assert resolver.resolve("search") == "linear-search"
+
+def test_graph_exact_match_beats_an_approximate_in_process_match(resolver, graph):
+    # In process, "binary search" would resolve to the tree by substring
+    assert resolver.resolve("binary search") == "bst"
+
+    assert asyncio.run(resolver.resolve_with_graph(None, "Binary Search")) == "binary-search"
+    # Learned: now an in-process exact match, with the stale memo entry dropped
+    assert resolver.lookup_exact("binary search") == "binary-search"
+    assert resolver.resolve("binary search") == "binary-search"
+
+def test_in_process_exact_match_skips_the_graph(resolver, graph):
+    assert asyncio.run(resolver.resolve_with_graph(None, "heap")) == "heap"
+    assert graph.queries == []
+
+def test_approximate_match_after_one_exact_graph_lookup(resolver, graph):
+    assert asyncio.run(resolver.resolve_with_graph(None, "machine")) == "stack-machine"
+    assert len(graph.queries) == 1
+
+def test_falls_back_to_graph_search_for_unknown_names(graph):
+    resolver = ConceptResolver()
+    assert asyncio.run(resolver.resolve_with_graph(None, "search tree")) == "bst"
+    assert resolver.lookup_exact("binary search tree") == "bst"
+    assert asyncio.run(resolver.resolve_with_graph(None, "nothing like it")) is None
+
+def test_full_text_fallback_for_misspelled_names(graph):
+    resolver = ConceptResolver()
+    assert asyncio.run(resolver.resolve_with_graph(None, "Dijkstra algoritm")) == "dijkstra"
+    assert "fulltext" in graph.queries[-1]
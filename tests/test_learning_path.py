@@ -0,0 +1,97 @@
+from app.services.learning_path import PrerequisiteGraph
+from tests.graphs import make_snapshot
+
+def ids(concepts):
+    return [c.id for c in concepts]
+
+def study_graph(**kwargs):
+    # target <- a (5h); target <- b <- c (1h each)
+    snapshot = make_snapshot(
+        {
+            "target": {"name": "Target", "estimated_hours": 1},
+            "a": {"name": "Expensive", "estimated_hours": 5},
+            "b": {"name": "Cheap", "estimated_hours": 1},
+            "c": {"name": "Cheap Basics", "estimated_hours": 1},
+            "unrelated": "Unrelated",
+        },
+        [("a", "target"), ("b", "target"), ("c", "b")],
+    )
+    return PrerequisiteGraph.from_snapshot(snapshot, snapshot.index_of["target"], **kwargs)
+
+def test_closure_depths_and_parents():
+    graph = study_graph()
+    assert set(graph.concepts) == {"target", "a", "b", "c"}
+    assert graph.depth == {"target": 0, "a": 1, "b": 1, "c": 2}
+    assert sorted(graph.parents["target"]) == ["a", "b"]
+
+def test_max_depth_bounds_the_closure():
+    assert set(study_graph(max_depth=1).concepts) == {"target", "a", "b"}
+
+def test_mastered_concepts_and_what_only_they_need_are_left_out():
+    graph = study_graph(mastered={"b"})
+    assert set(graph.concepts) == {"target", "a"}
+    assert ids(graph.shortest_study_plan()) == ["a", "target"]
+
+def test_shortest_plan_covers_every_prerequisite_cheapest_first():
+    # a is needed too, even though the chain through it costs more; c -> b fit in before it
+    assert ids(study_graph().shortest_study_plan()) == ["c", "b", "a", "target"]
+
+def test_shortest_plan_uses_default_hours_when_unset():
+    snapshot = make_snapshot(
+        {"t": "Target", "x": "No Estimate", "y": {"name": "Long", "estimated_hours": 3}},
+        [("x", "t"), ("y", "t")],
+    )
+    graph = PrerequisiteGraph.from_snapshot(snapshot, snapshot.index_of["t"])
+    assert ids(graph.shortest_study_plan(default_hours=1.0)) == ["x", "y", "t"]
+    assert ids(graph.shortest_study_plan(default_hours=10.0)) == ["y", "x", "t"]
+
+def test_shortest_plan_waits_for_every_parent_in_a_diamond():
+    # base -> {left, right} -> target; right also needs the expensive extra
+    snapshot = make_snapshot(
+        {
+            "target": {"name": "Target", "estimated_hours": 1},
+            "left": {"name": "Left", "estimated_hours": 4},
+            "right": {"name": "Right", "estimated_hours": 1},
+            "base": {"name": "Base", "estimated_hours": 2},
+            "extra": {"name": "Extra", "estimated_hours": 6},
+        },
+        [("base", "left"), ("base", "right"), ("extra", "right"), ("left", "target"), ("right", "target")],
+    )
+    graph = PrerequisiteGraph.from_snapshot(snapshot, snapshot.index_of["target"])
+    plan = ids(graph.shortest_study_plan())
+    # right is the cheapest, but only once both base and extra are done
+    assert plan == ["base", "left", "extra", "right", "target"]
+    assert sorted(plan) == sorted(ids(graph.topological_order()))
+
+def test_shortest_plan_for_a_concept_without_prerequisites():
+    snapshot = make_snapshot({"t": "Target"}, [])
+    graph = PrerequisiteGraph.from_snapshot(snapshot, 0)
+    assert ids(graph.shortest_study_plan()) == ["t"]
+
+def diamond():
+    # base -> {left, right} -> target, plus the shortcut base -> target;
+    # names sort the middle level opposite to its ids
+    return make_snapshot(
+        {"target": "Target", "left": "Zeta", "right": "Alpha", "base": "Base", "extra": "Extra"},
+        [("base", "left"), ("base", "right"), ("left", "target"), ("right", "target"), ("base", "target"),
+         ("extra", "right")],
+    )
+
+def test_topological_order_sorts_by_level_then_name():
+    snapshot = diamond()
+    graph = PrerequisiteGraph.from_snapshot(snapshot, snapshot.index_of["target"])
+    assert ids(graph.topological_order()) == ["base", "extra", "right", "left", "target"]
+
+def test_topological_order_matches_the_snapshot_learning_path():
+    snapshot = diamond()
+    for concept_id in ("target", "right", "left"):
+        index = snapshot.index_of[concept_id]
+        graph = PrerequisiteGraph.from_snapshot(snapshot, index)
+        assert ids(graph.topological_order()) == ids(snapshot.learning_path(index))
+
+def test_topological_order_puts_every_concept_after_its_prerequisites():
+    snapshot = diamond()
+    graph = PrerequisiteGraph.from_snapshot(snapshot, snapshot.index_of["target"])
+    position = {c: i for i, c in enumerate(ids(graph.topological_order()))}
+    for child, parents in graph.parents.items():
+        assert all(position[p] < position[child] for p in parents)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from app.services.prerequisite_index import PrerequisiteIndex
+
+IDS = ["base", "left", "right", "target", "extra"]
+# base -> {left, right} -> target, the shortcut base -> target, extra -> right
+EDGES = [("base", "left"), ("base", "right"), ("left", "target"), ("right", "target"), ("base", "target"), ("extra", "right")]
+
+def snapshot_of(index):
+    return index.rows(index.ids)
+
+def test_closure_levels_and_study_order():
+    index = PrerequisiteIndex.from_edges(IDS, EDGES)
+    assert index.prerequisite_ids("target") == ["base", "extra", "left", "right"]
+    assert index.prerequisite_ids("base") == []
+    assert [index.level[index.position[c]] for c in IDS] == [0, 1, 1, 2, 0]
+
+    order = [index.ids[p] for p in index.prerequisite_positions(index.position["target"])]
+    assert order == ["base", "extra", "left", "right"]
+
+def test_next_drops_shortcut_edges():
+    index = PrerequisiteIndex.from_edges(IDS, EDGES)
+    rows = {row["id"]: row for row in snapshot_of(index)}
+    # base -> target is implied by base -> left -> target
+    assert rows["base"]["next_ids"] == ["left", "right"]
+    assert rows["left"]["next_ids"] == ["target"]
+    assert rows["target"]["next_ids"] == []
+
+def test_from_edges_ignores_unknown_concepts():
+    index = PrerequisiteIndex.from_edges(["a", "b"], [("a", "b"), ("ghost", "b"), ("a", "ghost")])
+    assert index.prerequisite_ids("b") == ["a"]
+
+def test_duplicate_edges_count_once():
+    index = PrerequisiteIndex.from_edges(["a", "b"], [("a", "b"), ("a", "b")])
+    assert index.parents[1] == {0}
+    assert index.level == [0, 1]
+
+def test_add_edge_returns_the_concepts_to_rewrite():
+    index = PrerequisiteIndex.from_edges(IDS, EDGES)
+    changed = index.add_edge("extra", "base")
+    # base and everything depending on it, plus extra as the new prerequisite
+    assert changed == sorted(["base", "left", "right", "target", "extra"], key=index.position.get)
+    assert index.prerequisite_ids("target") == ["base", "extra", "left", "right"]
+    assert index.level[index.position["target"]] == 3
+
+def test_remove_edge_updates_dependents():
+    index = PrerequisiteIndex.from_edges(IDS, EDGES)
+    index.remove_edge("base", "left")
+    assert index.prerequisite_ids("left") == []
+    # base -> target is still implied, now only through right
+    assert index.prerequisite_ids("target") == ["base", "extra", "left", "right"]
+    assert {row["id"]: row for row in snapshot_of(index)}["base"]["next_ids"] == ["right"]
+
+def random_dag_edges(rng, n, count):
+    """Edges only from lower to higher position, so the graph stays acyclic."""
+    edges = set()
+    while len(edges) < count:
+        a, b = sorted(rng.sample(range(n), 2))
+        edges.add((f"c{a}", f"c{b}"))
+    return edges
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_updates_equal_a_full_rebuild(seed):
+    rng = random.Random(seed)
+    n = 30
+    ids = [f"c{i}" for i in range(n)]
+    # Shuffled so node positions don't follow the topological order
+    rng.shuffle(ids)
+    edges = random_dag_edges(rng, n, 45)
+    index = PrerequisiteIndex.from_edges(ids, edges)
+
+    for _ in range(60):
+        before = {row["id"]: row for row in snapshot_of(index)}
+        if edges and rng.random() < 0.4:
+            edge = rng.choice(sorted(edges))
+            edges.discard(edge)
+            changed = index.remove_edge(*edge)
+        else:
+            a, b = sorted(rng.sample(range(n), 2))
+            edge = (f"c{a}", f"c{b}")
+            edges.add(edge)
+            changed = index.add_edge(*edge)
+
+        rebuilt = PrerequisiteIndex.from_edges(ids, edges)
+        assert index.closure == rebuilt.closure
+        assert index.level == rebuilt.level
+        assert snapshot_of(index) == snapshot_of(rebuilt)
+        # Every concept whose stored values differ is in the rewrite set
+        after = {row["id"]: row for row in snapshot_of(index)}
+        assert {c for c in ids if before[c] != after[c]} <= set(changed)
+
+def test_unknown_ids_are_rejected_without_changing_the_index():
+    index = PrerequisiteIndex.from_edges(IDS, EDGES)
+    before = snapshot_of(index)
+    with pytest.raises(ValueError, match="ghost"):
+        index.add_edge("ghost", "target")
+    with pytest.raises(ValueError, match="ghost"):
+        index.remove_edge("base", "ghost")
+    assert snapshot_of(index) == before
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import app.models.progress  # noqa: F401  (configures User.progress)
+from app.models.cognitive_profile import CognitiveProfile
+from app.models.user import User
+from app.schemas.cognitive_profile import InputPreference
+from app.schemas.token import TokenPayload
+from app.services import principal_cache as principal_cache_module
+from app.services import write_behind as write_behind_module
+from app.services.principal_cache import PrincipalCache
+from app.services.write_behind import write_behind
+
+class Database:
+    """
+    The profile row as Postgres holds it. Stands in for the request session
+    (user lookups) and for SessionLocal (write-behind flushes).
+    """
+    def __init__(self):
+        self.profile = {"id": 7, "user_id": 1, "input_preference": InputPreference.verbal, "style_scores": [0.5, 0.5]}
+        self.loads = 0
+
+    async def get_with_profile(self, db, *, id):
+        self.loads += 1
+        user = User(id=id, email="student@example.com", hashed_password="x")
+        user.cognitive_profile = CognitiveProfile(**self.profile)
+        return user
+
+    def expunge(self, instance):
+        pass
+
+    # --- SessionLocal ---
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        for row in params or []:
+            if row["id"] == self.profile["id"]:
+                self.profile.update({k: v for k, v in row.items() if k != "id"})
+
+    async def commit(self):
+        pass
+
+@pytest.fixture
+def database(monkeypatch):
+    database = Database()
+    monkeypatch.setattr(principal_cache_module.crud_user, "get_with_profile", database.get_with_profile)
+    monkeypatch.setattr(write_behind_module, "SessionLocal", database)
+    yield database
+    write_behind._profiles.clear()
+
+TOKEN = TokenPayload(sub="student@example.com", uid=1, iat=1000)
+
+def test_profile_read_after_a_write_behind_flush_is_current(database):
+    cache = PrincipalCache()
+    user = asyncio.run(cache.get(database, TOKEN))
+    write_behind.update_profile(
+        user.cognitive_profile, {"input_preference": InputPreference.visual, "style_scores": [0.3, 0.8]}
+    )
+
+    # Before the flush: the cached row plus the pending overlay
+    profile = asyncio.run(cache.get(database, TOKEN)).cognitive_profile
+    assert profile.input_preference == InputPreference.visual
+    assert database.loads == 1
+
+    asyncio.run(write_behind.flush())
+    assert database.profile["input_preference"] == InputPreference.visual
+
+    # After it: the overlay is gone and the entry cached before the write was dropped
+    profile = asyncio.run(cache.get(database, TOKEN)).cognitive_profile
+    assert profile.input_preference == InputPreference.visual
+    assert profile.style_scores == [0.3, 0.8]
+    assert database.loads == 2
+
+def test_requests_get_their_own_copies(database):
+    cache = PrincipalCache()
+    first = asyncio.run(cache.get(database, TOKEN))
+    first.cognitive_profile.style_scores.append(1.0)
+    second = asyncio.run(cache.get(database, TOKEN))
+    assert second.cognitive_profile.style_scores == [0.5, 0.5]
+    assert database.loads == 1
+
+def test_a_reissued_token_reloads(database):
+    cache = PrincipalCache()
+    asyncio.run(cache.get(database, TOKEN))
+    asyncio.run(cache.get(database, TokenPayload(sub=TOKEN.sub, uid=1, iat=2000)))
+    assert database.loads == 2
@@ -0,0 +1,111 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.v1.endpoints.progress import read_my_progress, read_my_progress_summary
+from app.services.write_behind import write_behind
+
+STUDENT = SimpleNamespace(id=1, email="student@example.com")
+NAMES = {1: "Arrays", 2: "Linked Lists", 3: "Hashing", 5: "Stacks", 7: "Sets"}
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+class Database:
+    """Returns the scripted results in order and records every statement and its parameters."""
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    async def execute(self, statement, params=None):
+        self.calls.append((statement, params))
+        return Result(self.results.pop(0))
+
+def names_for(statement):
+    """Rows for the concept-name lookup, from the ids bound in its IN clause."""
+    ids = statement.compile().params
+    concept_ids = next(v for v in ids.values() if isinstance(v, list))
+    return [(concept_id, NAMES[concept_id]) for concept_id in concept_ids]
+
+class NamingDatabase(Database):
+    """Serves the page query from `page_rows`, then answers concept-name lookups."""
+    def __init__(self, page_rows):
+        super().__init__(page_rows)
+
+    async def execute(self, statement, params=None):
+        if not self.calls:
+            return await super().execute(statement, params)
+        self.calls.append((statement, params))
+        return Result(names_for(statement))
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    write_behind._progress.clear()
+    yield
+    write_behind._progress.clear()
+
+def page(**kwargs):
+    response = asyncio.run(read_my_progress(**{"after": None, "limit": 50, "current_user": STUDENT, **kwargs}))
+    return [(i.concept_id, i.concept, i.mastery_level) for i in response.items], response.next_cursor
+
+def test_progress_page_includes_buffered_updates():
+    write_behind.add_progress(STUDENT.id, 2, 90)
+    write_behind.add_progress(STUDENT.id, 3, 70)
+    write_behind.add_progress(2, 5, 100)  # another student's
+    db = NamingDatabase([(1, "Arrays", 50), (3, "Hashing", None)])
+
+    assert page(db=db) == ([(1, "Arrays", 50), (2, "Linked Lists", 90), (3, "Hashing", 70)], None)
+    # Only the concept with no stored row needed its name looked up
+    assert names_for(db.calls[1][0]) == [(2, "Linked Lists")]
+
+def test_progress_page_keeps_keyset_paging_with_buffered_updates():
+    write_behind.add_progress(STUDENT.id, 2, 90)
+    write_behind.add_progress(STUDENT.id, 7, 10)
+    # limit 2: three stored rows come back, so another page follows
+    db = NamingDatabase([(1, "Arrays", 50), (3, "Hashing", 20), (5, "Stacks", 0)])
+    assert page(db=db, limit=2) == ([(1, "Arrays", 50), (2, "Linked Lists", 90)], 2)
+
+    db = NamingDatabase([(3, "Hashing", 20), (5, "Stacks", 0)])
+    assert page(db=db, after=2, limit=2) == ([(3, "Hashing", 20), (5, "Stacks", 0)], 5)
+
+    db = NamingDatabase([])
+    assert page(db=db, after=5, limit=2) == ([(7, "Sets", 10)], None)
+
+def test_progress_page_without_buffered_updates_is_one_query():
+    db = Database([(1, "Arrays", 50)])
+    assert page(db=db) == ([(1, "Arrays", 50)], None)
+    assert len(db.calls) == 1
+
+def summary_row(**overrides):
+    values = {
+        "concepts_started": 2, "mastered": 1, "average_mastery": 70.0,
+        "histogram": {"5": 1, "9": 1}, "weakest_prerequisites": [],
+    }
+    return SimpleNamespace(**{**values, **overrides})
+
+def test_summary_overlays_buffered_updates_in_the_query():
+    write_behind.add_progress(STUDENT.id, 2, 90)
+    write_behind.add_progress(2, 5, 100)
+    db = Database([summary_row()])
+
+    summary = asyncio.run(read_my_progress_summary(target_concept_id=None, weakest=5, db=db, current_user=STUDENT))
+
+    statement, params = db.calls[0]
+    assert json.loads(params["pending"]) == {"2": 90}
+    assert "json_each_text(CAST(:pending AS json))" in str(statement)
+    assert summary["mastered"] == 1
+    assert [b["count"] for b in summary["histogram"]][5:] == [1, 0, 0, 0, 1]
+
+def test_summary_without_buffered_updates_passes_an_empty_overlay():
+    db = Database([summary_row()])
+    asyncio.run(read_my_progress_summary(target_concept_id=None, weakest=5, db=db, current_user=STUDENT))
+    assert json.loads(db.calls[0][1]["pending"]) == {}
@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.recommendation_engine import ConceptIdMap, ReadinessModel, StudentState
+from tests.graphs import make_snapshot
+
+THRESHOLD = 80
+
+def course():
+    # arrays -> {lists, hashing}; lists -> {stacks, queues}; hashing + lists -> sets.
+    # "course" is a Topic without prerequisites; arrays -> lists is stored twice.
+    snapshot = make_snapshot(
+        {
+            "arrays": "Arrays", "lists": "Linked Lists", "hashing": "Hashing", "stacks": "Stacks",
+            "queues": "Queues", "sets": "Sets", "course": "Data Structures",
+        },
+        [("arrays", "lists"), ("arrays", "lists"), ("arrays", "hashing"), ("lists", "stacks"),
+         ("lists", "queues"), ("hashing", "sets"), ("lists", "sets")],
+        topics={"course"},
+    )
+    rows = [(1, "Arrays", "arrays"), (2, "linked  lists", None), (3, "Hashing", "hashing"), (4, "Stacks", "stacks"),
+            (5, "Queues", None), (6, "Sets", "sets"), (9, "Not In The Graph", None)]
+    return snapshot, ConceptIdMap(snapshot, rows)
+
+@pytest.fixture
+def model():
+    snapshot, id_map = course()
+    return ReadinessModel(snapshot, id_map, THRESHOLD)
+
+def state_for(model, levels):
+    mastery = np.zeros((1, len(model.snapshot)), dtype=np.float32)
+    for concept_id, level in levels.items():
+        mastery[0, model.snapshot.index_of[concept_id]] = level
+    return StudentState(mastery[0], model.unmet_counts(mastery)[0])
+
+def ranked_ids(model, state, limit=10):
+    return [model.snapshot.ids[p] for p in model.rank(state, limit)]
+
+def brute_force_unmet(model, mastery_row):
+    return [
+        sum(mastery_row[p] < THRESHOLD for p in parents)
+        for parents in model.snapshot.prerequisites.parents
+    ]
+
+def test_id_map_prefers_graph_id_then_normalized_name():
+    snapshot, id_map = course()
+    assert id_map.position_of[1] == snapshot.index_of["arrays"]
+    assert id_map.position_of[2] == snapshot.index_of["lists"]
+    assert id_map.name_matches == {2: "lists", 5: "queues"}
+    assert id_map.unmatched == 1
+    assert id_map.pg_id[snapshot.index_of["course"]] == -1
+
+def test_id_map_positions_handle_unknown_ids():
+    snapshot, id_map = course()
+    positions = id_map.positions(np.array([3, 9, 100, -1, 0], dtype=np.int64))
+    assert positions.tolist() == [snapshot.index_of["hashing"], -1, -1, -1, -1]
+
+def test_unmet_counts_match_a_brute_force_count(model):
+    rng = np.random.default_rng(3)
+    mastery = rng.choice([0, 40, 80, 100], size=(6, len(model.snapshot))).astype(np.float32)
+    unmet = model.unmet_counts(mastery)
+    for row in range(len(mastery)):
+        assert unmet[row].tolist() == brute_force_unmet(model, mastery[row])
+
+def test_duplicate_edges_count_once(model):
+    state = state_for(model, {})
+    assert state.unmet[model.snapshot.index_of["lists"]] == 1
+
+def test_new_student_starts_with_the_roots(model):
+    # "course" has no prerequisites either, but only Subtopics are recommended
+    assert ranked_ids(model, state_for(model, {})) == ["arrays"]
+
+def test_ready_concepts_need_every_prerequisite_mastered(model):
+    state = state_for(model, {"arrays": 90, "lists": 85, "hashing": 50})
+    assert ranked_ids(model, state) == ["hashing", "stacks", "queues"]
+
+def test_rank_prefers_started_then_shallow_then_unlocking_more(model):
+    state = state_for(model, {"arrays": 100})
+    # Both level 1; lists unlocks three concepts, hashing one
+    assert ranked_ids(model, state) == ["lists", "hashing"]
+
+    state = state_for(model, {"arrays": 100, "hashing": 20})
+    assert ranked_ids(model, state) == ["hashing", "lists"]
+    assert ranked_ids(model, state, limit=1) == ["hashing"]
+
+def test_apply_matches_a_full_recompute(model):
+    rng = random.Random(11)
+    state = state_for(model, {})
+    for _ in range(200):
+        position = rng.randrange(len(model.snapshot))
+        model.apply(state, position, rng.choice([0, 30, 79, 80, 95]))
+        assert state.unmet.tolist() == model.unmet_counts(state.mastery[None, :])[0].tolist()
+
+def test_recommendations_carry_postgres_ids(model):
+    state = state_for(model, {"arrays": 100, "lists": 100, "hashing": 100, "queues": 10})
+    recommendations = model.recommendations(state, limit=5)
+    assert [(r["concept"].id, r["concept_id"], r["mastery_level"]) for r in recommendations] == [
+        ("queues", 5, 10), ("stacks", 4, 0), ("sets", 6, 0),
+    ]
@@ -0,0 +1,181 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+class Upstream:
+    """A call whose completion the test controls."""
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is None:
+            self.release = asyncio.Event()
+        await self.release.wait()
+        return f"result {self.calls}"
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_concurrent_calls_share_one_upstream_call():
+    async def scenario():
+        flight, upstream = SingleFlight("test"), Upstream()
+        waiters = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+        await settle()
+        upstream.release.set()
+        return await asyncio.gather(*waiters), flight, upstream
+
+    results, flight, upstream = asyncio.run(scenario())
+    assert results == ["result 1"] * 3
+    assert upstream.calls == 1
+    assert flight.stats() == {
+        "requests": 3, "upstream_calls": 1, "coalesced": 2, "coalescing_ratio": 2 / 3, "in_flight": 0,
+    }
+
+def test_different_keys_and_later_calls_are_not_coalesced():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def fn(value):
+            calls.append(value)
+            return value
+
+        first = await asyncio.gather(flight.do("a", lambda: fn("a")), flight.do("b", lambda: fn("b")))
+        again = await flight.do("a", lambda: fn("a again"))
+        return first, again, calls
+
+    first, again, calls = asyncio.run(scenario())
+    assert first == ["a", "b"]
+    assert again == "a again"
+    assert calls == ["a", "b", "a again"]
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise ValueError("upstream failed")
+
+        waiters = [asyncio.create_task(flight.do("k", failing)) for _ in range(2)]
+        await settle()
+        gate.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        retry = await flight.do("k", lambda: asyncio.sleep(0, result="ok"))
+        return results, retry, flight
+
+    results, retry, flight = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert retry == "ok"
+    assert flight.stats()["in_flight"] == 0
+
+def test_cancelling_one_waiter_leaves_the_call_running_for_the_others():
+    async def scenario():
+        flight, upstream = SingleFlight("test"), Upstream()
+        cancelled = asyncio.create_task(flight.do("k", upstream))
+        kept = asyncio.create_task(flight.do("k", upstream))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        upstream.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await kept, upstream
+
+    result, upstream = asyncio.run(scenario())
+    assert result == "result 1"
+    assert upstream.calls == 1
+
+# --- Streams ---
+
+def token_source(tokens, gate=None, closed=None, error=None):
+    async def generate():
+        try:
+            for i, token in enumerate(tokens):
+                if gate is not None and i == 1:
+                    await gate.wait()
+                yield token
+            if error is not None:
+                raise error
+        finally:
+            if closed is not None:
+                closed.append(True)
+    return generate
+
+async def collect(stream):
+    return [token async for token in stream]
+
+def test_stream_is_shared_and_replayed_to_late_subscribers():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+        source = token_source(["a", "b", "c"], gate=gate)
+        early = asyncio.create_task(collect(flight.stream("k", source)))
+        await settle()
+        # Joins after "a" was produced and still gets it
+        late = asyncio.create_task(collect(flight.stream("k", source)))
+        await settle()
+        gate.set()
+        return await asyncio.gather(early, late), flight
+
+    (early, late), flight = asyncio.run(scenario())
+    assert early == late == ["a", "b", "c"]
+    assert (flight.requests, flight.upstream_calls) == (2, 1)
+    assert flight.stats()["in_flight"] == 0
+
+def test_stream_errors_reach_every_subscriber():
+    async def scenario():
+        flight = SingleFlight("test")
+        source = token_source(["a"], error=RuntimeError("stream broke"))
+        streams = [flight.stream("k", source) for _ in range(2)]
+        return await asyncio.gather(*(collect(s) for s in streams), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_stream_upstream_is_cancelled_once_every_subscriber_leaves():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate, closed = asyncio.Event(), []
+        subscribers = [flight.stream("k", token_source(["a", "b"], gate=gate, closed=closed)) for _ in range(2)]
+
+        assert await subscribers[0].__anext__() == "a"
+        assert await subscribers[1].__anext__() == "a"
+        await subscribers[0].aclose()
+        await settle()
+        still_open = not closed
+        await subscribers[1].aclose()
+        await settle()
+        return still_open, closed, flight
+
+    still_open, closed, flight = asyncio.run(scenario())
+    assert still_open
+    assert closed == [True]
+    assert flight.stats()["in_flight"] == 0
+
+def test_a_cancelled_stream_is_recorded_as_failed_and_never_rejoined():
+    async def scenario():
+        flight = SingleFlight("test")
+        gate = asyncio.Event()
+        source = token_source(["a", "b"], gate=gate)
+        first = flight.stream("k", source)
+        assert await first.__anext__() == "a"
+        cancelled = flight._streams["k"]
+        await first.aclose()
+        # Joins before the cancellation has been processed: gets a fresh upstream, not a truncated stream
+        second = asyncio.create_task(collect(flight.stream("k", source)))
+        await settle()
+        gate.set()
+        return cancelled, await second, flight
+
+    cancelled, tokens, flight = asyncio.run(scenario())
+    assert cancelled.done and isinstance(cancelled.error, asyncio.CancelledError)
+    assert tokens == ["a", "b"]
+    assert flight.upstream_calls == 2
+    assert flight.stats()["in_flight"] == 0
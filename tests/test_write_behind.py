@@ -0,0 +1,175 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import app.models.user  # noqa: F401  (configures CognitiveProfile.user)
+from app.models.cognitive_profile import CognitiveProfile
+from app.schemas.cognitive_profile import InputPreference, InstructionFlow
+from app.services import write_behind as write_behind_module
+from app.services.write_behind import WriteBehindBuffer
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def integrity_error():
+    return IntegrityError("INSERT INTO progress ...", {}, Exception("violates foreign key constraint"))
+
+class FakeDatabase:
+    """
+    Stands in for SessionLocal. Each execute() takes the next scripted
+    outcome: None succeeds, an exception is raised, a callable runs first
+    (e.g. to write to the buffer mid-flush).
+    """
+    def __init__(self, *script):
+        self.script = list(script)
+        self.executed = 0
+        self.commits = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.executed += 1
+        outcome = self.script.pop(0) if self.script else None
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, BaseException):
+            raise outcome
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+@pytest.fixture
+def buffer():
+    return WriteBehindBuffer()
+
+@pytest.fixture
+def database(monkeypatch):
+    def install(*script):
+        db = FakeDatabase(*script)
+        monkeypatch.setattr(write_behind_module, "SessionLocal", db)
+        return db
+    return install
+
+def profile(**columns):
+    return CognitiveProfile(id=7, user_id=1, **columns)
+
+def test_successful_flush_writes_everything_once(buffer, database):
+    db = database()
+    buffer.add_progress(1, 10, 50, T0)
+    buffer.add_progress(1, 10, 60, T0 + timedelta(seconds=1))
+    buffer.add_progress(2, 10, 70, T0)
+
+    assert asyncio.run(buffer.flush()) == 2
+    assert buffer.pending == 0
+    assert (db.executed, db.commits) == (1, 1)
+    assert buffer.stats()["merged"] == 1
+
+def test_failed_flush_requeues_pending_writes(buffer, database):
+    database(ConnectionError("connection reset"))
+    buffer.add_progress(1, 10, 50, T0)
+    buffer.update_profile(profile(instruction_flow=InstructionFlow.sequential), {"instruction_flow": InstructionFlow.global_})
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    assert buffer.pending_progress(1) == {10: 50}
+    assert buffer._profiles == {7: {"instruction_flow": InstructionFlow.global_}}
+    assert (buffer.flushes, buffer.rows_written) == (0, 0)
+
+def test_failed_row_by_row_retry_requeues_pending_writes(buffer, database):
+    # The batch hits a bad row, then the connection drops during the retry
+    database(integrity_error(), ConnectionError("connection reset"))
+    buffer.add_progress(1, 10, 50, T0)
+    buffer.add_progress(1, 11, 40, T0)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    assert buffer.pending_progress(1) == {10: 50, 11: 40}
+
+def test_row_by_row_retry_drops_only_the_bad_rows(buffer, database):
+    db = database(integrity_error(), None, integrity_error())
+    buffer.add_progress(1, 10, 50, T0)
+    buffer.add_progress(1, 999, 40, T0)
+
+    assert asyncio.run(buffer.flush()) == 2
+    assert buffer.pending == 0
+    assert buffer.dropped == 1
+    assert db.commits == 1
+
+def test_cancelled_flush_requeues_pending_writes(buffer, database):
+    database(asyncio.CancelledError())
+    buffer.add_progress(1, 10, 50, T0)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(buffer.flush())
+    assert buffer.pending_progress(1) == {10: 50}
+
+def test_requeue_keeps_writes_made_during_the_failed_flush(buffer, database):
+    loaded = profile(instruction_flow=InstructionFlow.sequential, input_preference=InputPreference.verbal)
+
+    def newer_writes_then_fail():
+        buffer.add_progress(1, 10, 90, T0 + timedelta(seconds=5))
+        buffer.update_profile(loaded, {"input_preference": InputPreference.verbal})
+        return ConnectionError("connection reset")
+
+    database(newer_writes_then_fail)
+    buffer.add_progress(1, 10, 50, T0)
+    buffer.add_progress(1, 11, 40, T0)
+    buffer.update_profile(loaded, {"instruction_flow": InstructionFlow.global_, "input_preference": InputPreference.visual})
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    # The failed batch comes back, except where a newer value was written meanwhile
+    assert buffer.pending_progress(1) == {10: 90, 11: 40}
+    assert buffer._profiles[7] == {"instruction_flow": InstructionFlow.global_, "input_preference": InputPreference.verbal}
+
+def test_requeued_writes_go_out_with_the_next_flush(buffer, database):
+    database(ConnectionError("connection reset"))
+    buffer.add_progress(1, 10, 50, T0)
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    db = database()
+    assert asyncio.run(buffer.flush()) == 1
+    assert buffer.pending == 0
+    assert db.commits == 1
+
+def test_older_write_does_not_replace_a_newer_pending_one(buffer):
+    buffer.add_progress(1, 10, 90, T0 + timedelta(seconds=5))
+    buffer.add_progress(1, 10, 50, T0)
+    assert buffer.pending_progress(1) == {10: 90}
+
+def test_concept_exists_remembers_known_ids(buffer):
+    class Result:
+        def __init__(self, value):
+            self.value = value
+
+        def scalar(self):
+            return self.value
+
+    class Lookup:
+        def __init__(self):
+            self.queries = 0
+
+        async def execute(self, statement):
+            self.queries += 1
+            return Result(5 if self.queries == 1 else None)
+
+    db = Lookup()
+    assert asyncio.run(buffer.concept_exists(db, 5)) is True
+    assert asyncio.run(buffer.concept_exists(db, 5)) is True
+    assert asyncio.run(buffer.concept_exists(db, 6)) is False
+    assert db.queries == 2
@@ -0,0 +1,52 @@
+import pytest
+import torch
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizer, pipeline
+from transformers.models.bert.tokenization_bert import BasicTokenizer
+
+from app.schemas.cognitive_profile import ANALYZED_DIMENSIONS
+from app.services.zero_shot_classifier import ZeroShotClassifier
+
+PROMPTS = [
+    "show me a diagram of how this works",
+    "explain it step by step in words please",
+    # Longer than the stub model's max length, so the prompt gets truncated
+    " ".join(["why does the example keep failing when i run it again and again"] * 4),
+]
+
+def stub_pipeline(tmp_path):
+    """A real zero-shot pipeline around a tiny, randomly initialized BERT; nothing is downloaded."""
+    words = BasicTokenizer().tokenize(
+        " ".join([ZeroShotClassifier.HYPOTHESIS_TEMPLATE] + PROMPTS)
+        + " " + " ".join(opt.value for options in ANALYZED_DIMENSIONS.values() for opt in options)
+    )
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(words))))
+    tokenizer = BertTokenizer(str(vocab_file), model_max_length=24)
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=64,
+        id2label={0: "entailment", 1: "neutral", 2: "contradiction"},
+        label2id={"entailment": 0, "neutral": 1, "contradiction": 2},
+    )
+    model = BertForSequenceClassification(config).eval()
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+@pytest.fixture
+def classifier(tmp_path, monkeypatch):
+    pipe = stub_pipeline(tmp_path)
+    monkeypatch.setattr(ZeroShotClassifier, "_load_pipeline", lambda self, backend: pipe)
+    return ZeroShotClassifier(backend="torch")
+
+def test_batched_classification_matches_the_pipeline(classifier):
+    batched = classifier.classify_batch(PROMPTS)
+    for prompt, result in zip(PROMPTS, batched):
+        expected = classifier.classify_with_pipeline(prompt)
+        assert result.keys() == expected.keys()
+        for dim, (label, score) in expected.items():
+            assert result[dim][0] == label
+            assert result[dim][1] == pytest.approx(score, abs=1e-5)
+
+def test_classify_is_a_batch_of_one(classifier):
+    assert classifier.classify(PROMPTS[0]) == classifier.classify_batch(PROMPTS[:1])[0]